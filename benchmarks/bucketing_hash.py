@@ -0,0 +1,93 @@
+"""
+Compares ways of computing the bucketing hash (first 8 bytes of the SHA-256 of the hash input,
+read as a big-endian unsigned 64 bit int) that give output identical to utils.sha256_hash,
+and what the per-evaluation hash memo saves for an experiment whose targeting ladder hashes
+the same unit id repeatedly.
+
+Run from the repository root:
+    python -m benchmarks.bucketing_hash
+"""
+import hashlib
+import json
+import struct
+import timeit
+from struct import unpack
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.utils import sha256_hash
+
+_UNPACK_FROM = struct.Struct(">Q").unpack_from
+_SEEDED = {}
+
+
+def _unpack_slice(key):
+    return unpack(">Q", hashlib.sha256(str(key).encode("utf-8")).digest()[:8])[0]
+
+
+def _int_from_bytes(key):
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+
+
+def _struct_unpack_from(key):
+    return _UNPACK_FROM(hashlib.sha256(key.encode("utf-8")).digest())[0]
+
+
+def _seeded_copy(prefix, unit_id):
+    seeded = _SEEDED.get(prefix)
+    if seeded is None:
+        seeded = _SEEDED[prefix] = hashlib.sha256(prefix.encode("utf-8"))
+    hasher = seeded.copy()
+    hasher.update(unit_id.encode("utf-8"))
+    return _UNPACK_FROM(hasher.digest())[0]
+
+
+def _ladder_specs(rungs):
+    rules = [{
+        "name": f"rung_{i}", "id": f"rung_{i}", "salt": f"rung_{i}", "passPercentage": 100, "idType": "userID",
+        "returnValue": {"rung": i},
+        "conditions": [{"type": "user_bucket", "operator": "lt", "targetValue": 0, "idType": "userID",
+                        "additionalValues": {"salt": "holdout"}}],
+    } for i in range(rungs)]
+    rules.append({"name": "launched", "id": "launched", "salt": "launched", "passPercentage": 50,
+                  "idType": "userID", "returnValue": {"launched": True},
+                  "conditions": [{"type": "public", "idType": "userID", "additionalValues": {}}]})
+    return {"feature_gates": [], "layer_configs": [], "has_updates": True, "time": 1,
+            "dynamic_configs": [{"name": "ladder", "type": "dynamic_config", "salt": "ladder", "enabled": True,
+                                 "defaultValue": {}, "idType": "userID", "entity": "experiment",
+                                 "rules": rules}]}
+
+
+def main():
+    prefix = "2d1bb4b2-4c5f-4b4c-8c4d-7c2b6f6c1a8e.rule_id."
+    keys = [f"{prefix}user_{i}" for i in range(20_000)]
+    for key in keys[:100]:
+        expected = sha256_hash(key)
+        assert _unpack_slice(key) == _int_from_bytes(key) == _struct_unpack_from(key) == expected
+        assert _seeded_copy(prefix, key[len(prefix):]) == expected
+
+    print(f"{'hash':<28}{'ns/hash':>9}")
+    candidates = {
+        "unpack digest[:8]": lambda: [_unpack_slice(key) for key in keys],
+        "int.from_bytes digest[:8]": lambda: [_int_from_bytes(key) for key in keys],
+        "Struct.unpack_from digest": lambda: [_struct_unpack_from(key) for key in keys],
+        "seeded sha256 .copy()": lambda: [_seeded_copy(prefix, key[len(prefix):]) for key in keys],
+        "utils.sha256_hash": lambda: [sha256_hash(key) for key in keys],
+    }
+    for name, run in candidates.items():
+        seconds = min(timeit.repeat(run, number=5, repeat=5)) / 5
+        print(f"{name:<28}{seconds * 1e9 / len(keys):>9.0f}")
+
+    print(f"\n{'ladder rungs':<14}{'us/get_config':>14}")
+    for rungs in (1, 5, 10, 20):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(local_mode=True, bootstrap_values=json.dumps(_ladder_specs(rungs)),
+                                                       disable_diagnostics=True))
+        users = [StatsigUser(f"user_{i}") for i in range(2_000)]
+        seconds = min(timeit.repeat(lambda: [server.get_config(user, "ladder", log_exposure=False) for user in users],
+                                    number=1, repeat=5))
+        print(f"{rungs:<14}{seconds * 1e6 / len(users):>14.1f}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+get_client_initialize_response over testdata/download_config_specs.json scaled up to about
+3,000 gates, configs and layers, with and without the per-snapshot hashed entity name tables.
+
+Run from the repository root:
+    python -m benchmarks.client_initialize [--copies 300] [--users 20]
+"""
+import argparse
+import json
+import os
+import timeit
+from unittest.mock import patch
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.utils import HashingAlgorithm
+
+_SPECS_PATH = os.path.join(os.path.dirname(__file__), "..", "testdata", "download_config_specs.json")
+
+
+def scaled_specs(copies):
+    """Every gate, config and layer of the test specs, copied with a _<i> suffix."""
+    with open(_SPECS_PATH, encoding="utf-8") as file:
+        specs = json.load(file)
+    for key in ("feature_gates", "dynamic_configs", "layer_configs"):
+        scaled = []
+        for spec in specs[key]:
+            spec.setdefault("idType", "userID")
+            scaled.extend(dict(spec, name=f"{spec['name']}_{i}") for i in range(copies))
+        specs[key] = specs[key] + scaled
+    return specs
+
+
+def users(count):
+    return [StatsigUser(f"user_{i}", email=f"user_{i}@statsig.com" if i % 2 else None,
+                        custom_ids={"stableID": f"device_{i}"}) for i in range(count)]
+
+
+def start_server(specs):
+    server = StatsigServer()
+    server.initialize("secret-key", StatsigOptions(local_mode=True, bootstrap_values=json.dumps(specs),
+                                                   disable_diagnostics=True))
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=300)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    specs = scaled_specs(args.copies)
+    entities = sum(len(specs[key]) for key in ("feature_gates", "dynamic_configs", "layer_configs"))
+    server = start_server(specs)
+    run_users = users(args.users)
+    try:
+        print(f"{entities} entities, {len(run_users)} users")
+        print(f"{'hash':<8}{'ms/response (hash every name)':>31}{'ms/response (hashed tables)':>29}")
+        for algorithm in (HashingAlgorithm.SHA256, HashingAlgorithm.DJB2, HashingAlgorithm.NONE):
+            def run():
+                for user in run_users:
+                    server.get_client_initialize_response(user, hash=algorithm)
+
+            with patch("statsig.client_initialize_formatter._hashed_names", return_value={}):
+                uncached = min(timeit.repeat(run, number=1, repeat=3))
+            run()  # builds the table for this snapshot
+            cached = min(timeit.repeat(run, number=1, repeat=3))
+            print(f"{algorithm.value:<8}{uncached * 1e3 / len(run_users):>31.2f}"
+                  f"{cached * 1e3 / len(run_users):>29.2f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
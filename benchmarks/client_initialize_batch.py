@@ -0,0 +1,72 @@
+"""
+Client initialize responses per second, one get_client_initialize_response call per user
+against one get_client_initialize_responses call for the whole batch, at about 1k and 100k
+gates, configs and layers. The specs are testdata/download_config_specs.json copied up to the
+entity count, with a quarter of the copies disabled and a quarter rolled out to everyone, as
+long lived projects accumulate.
+
+Run from the repository root:
+    python -m benchmarks.client_initialize_batch [--entities 1000,100000] [--users 500] [--workers 1]
+
+--users is the batch size at 1k entities, it shrinks in proportion for larger spec sets.
+"""
+import argparse
+import time
+
+from benchmarks.client_initialize import scaled_specs, start_server, users
+
+_PUBLIC_RULE = {"name": "launch", "id": "launch", "salt": "launch", "passPercentage": 100, "returnValue": True,
+                "idType": "userID", "conditions": [{"type": "public", "targetValue": None, "operator": None,
+                                                     "field": None, "additionalValues": {}, "idType": "userID"}]}
+_BASE_ENTITIES = 10
+
+
+def project_specs(entities):
+    specs = scaled_specs(max(entities // _BASE_ENTITIES - 1, 0))
+    for key in ("feature_gates", "dynamic_configs"):
+        for i, spec in enumerate(specs[key]):
+            if i % 4 == 1:
+                spec["enabled"] = False
+            elif i % 4 == 2:
+                spec["rules"] = [dict(_PUBLIC_RULE, returnValue=spec["defaultValue"] or True)]
+    return specs
+
+
+def _users_per_second(run, batch_size):
+    start = time.perf_counter()
+    run()
+    return batch_size / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", default="1000,100000")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print(f"{'entities':>9}{'users':>7}{'users/s (one by one)':>22}{'users/s (batch)':>17}{'speedup':>9}")
+    for entities in (int(count) for count in args.entities.split(",")):
+        specs = project_specs(entities)
+        entity_count = sum(len(specs[key]) for key in ("feature_gates", "dynamic_configs", "layer_configs"))
+        batch = users(max(args.users * 1000 // entity_count, 2))
+        server = start_server(specs)
+        try:
+            server.get_client_initialize_responses(batch[:1])  # builds the hashed name tables
+
+            def one_by_one():
+                for user in batch:
+                    server.get_client_initialize_response(user)
+
+            def batched():
+                server.get_client_initialize_responses(batch, max_workers=args.workers)
+
+            single = max(_users_per_second(one_by_one, len(batch)) for _ in range(3))
+            together = max(_users_per_second(batched, len(batch)) for _ in range(3))
+            print(f"{entity_count:>9}{len(batch):>7}{single:>22.1f}{together:>17.1f}{together / single:>8.2f}x")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
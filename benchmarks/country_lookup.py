@@ -0,0 +1,128 @@
+"""
+Compares ip3country's CountryLookup with the compact array backed table behind the
+compact_country_lookup option: load time and memory of a fresh process, memory each forked
+worker stops sharing with its parent once it starts looking ips up (the gunicorn --preload
+case, Linux only), and lookup throughput with and without the per-ip LRU cache.
+
+Run from the repository root:
+    python -m benchmarks.country_lookup
+"""
+import os
+import random
+import subprocess
+import sys
+import time
+
+from statsig.lru_cache import _LRUCache
+
+BACKENDS = ("ip3country", "compact")
+FORKED_WORKERS = 4
+
+
+def _load(backend):
+    if backend == "compact":
+        from statsig.country_lookup import get_compact_country_lookup  # pylint: disable=import-outside-toplevel
+        return get_compact_country_lookup()
+    from ip3country import CountryLookup  # pylint: disable=import-outside-toplevel
+    return CountryLookup()
+
+
+def _rss_kb():
+    with open("/proc/self/statm", encoding="utf-8") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def _private_kb():
+    """Memory this process no longer shares with any other, from smaps_rollup."""
+    total = 0
+    with open("/proc/self/smaps_rollup", encoding="utf-8") as file:
+        for line in file:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total
+
+
+def _random_ips(count, seed=0):
+    rng = random.Random(seed)
+    return [".".join(str(rng.randrange(256)) for _ in range(4)) for _ in range(count)]
+
+
+def _measure_startup(backend):
+    """Runs in a fresh interpreter so neither backend's table is already loaded."""
+    import statsig  # pylint: disable=import-outside-toplevel,unused-import
+    before = _rss_kb()
+    start = time.perf_counter()
+    lookup = _load(backend)
+    elapsed = time.perf_counter() - start
+    lookup.lookupStr("1.1.1.1")
+    print(f"{elapsed * 1000:.1f} {_rss_kb() - before}")
+
+
+def _measure_forked(backend):
+    lookup = _load(backend)
+    read, write = os.pipe()
+    pids = []
+    for _ in range(FORKED_WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            ips = _random_ips(50_000)
+            before = _private_kb()
+            for ip in ips:
+                lookup.lookupStr(ip)
+            os.write(write, f"{_private_kb() - before}\n".encode())
+            os._exit(0)
+        pids.append(pid)
+    os.close(write)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    with os.fdopen(read) as file:
+        grown = [int(line) for line in file.read().split()]
+    print(sum(grown) // len(grown))
+
+
+def _run(mode, backend):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.country_lookup", mode, backend],
+                            check=True, capture_output=True, text=True).stdout
+    return output.split()
+
+
+def _lookup_throughput(backend, cache_size, ips):
+    lookup = _load(backend)
+    cache = _LRUCache("country_lookup_cache", cache_size) if cache_size else None
+    missing = object()
+    start = time.perf_counter()
+    for ip in ips:
+        if cache is None:
+            lookup.lookupStr(ip)
+            continue
+        country = cache.get(ip, missing)
+        if country is missing:
+            cache.set(ip, lookup.lookupStr(ip))
+    return (time.perf_counter() - start) * 1e6 / len(ips)
+
+
+def main():
+    print(f"forked private kb: memory each of {FORKED_WORKERS} workers forked after loading the table "
+          f"copies out of it during 50k lookups")
+    print(f"{'backend':<12}{'load ms':>9}{'rss kb':>9}{'forked private kb':>19}")
+    for backend in BACKENDS:
+        load_ms, rss_kb = _run("startup", backend)
+        forked = _run("forked", backend)[0] if sys.platform.startswith("linux") else "n/a"
+        print(f"{backend:<12}{load_ms:>9}{rss_kb:>9}{forked:>19}")
+
+    # traffic where most requests come from a few hundred recently seen ips
+    rng = random.Random(1)
+    pool = _random_ips(500, seed=2)
+    ips = [rng.choice(pool) for _ in range(200_000)]
+    print(f"\n{'backend':<12}{'cache':>7}{'us/lookup':>11}")
+    for backend in BACKENDS:
+        for cache_size in (0, 1000):
+            print(f"{backend:<12}{cache_size:>7}{_lookup_throughput(backend, cache_size, ips):>11.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        {"startup": _measure_startup, "forked": _measure_forked}[sys.argv[1]](sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,48 @@
+"""
+Compares the per-condition string matchers with the generic loop over targets for the
+str_starts_with_any / str_ends_with_any / str_contains_any operators.
+
+Run from the repository root:
+    python -m benchmarks.string_matchers
+"""
+import random
+import string
+import timeit
+
+from statsig.compiled_spec import _CompiledCondition
+from statsig.evaluation_operators import OPERATORS
+
+TARGET_COUNTS = (10, 100, 10_000)
+OPERATOR_TARGETS = {
+    "str_starts_with_any": lambda rng: "https://" + _word(rng, 12) + "/",
+    "str_ends_with_any": lambda rng: "@" + _word(rng, 10) + ".com",
+    "str_contains_any": lambda rng: _word(rng, 8),
+}
+
+
+def _word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def main(number=2000):
+    rng = random.Random(0)
+    values = ["https://" + _word(rng, 12) + "/path@" + _word(rng, 10) + ".com" for _ in range(50)]
+    print(f"{'operator':<22}{'targets':>8}{'loop us':>12}{'matcher us':>12}{'speedup':>9}")
+    for operator, make_target in OPERATOR_TARGETS.items():
+        for count in TARGET_COUNTS:
+            targets = [make_target(rng) for _ in range(count)]
+            condition = _CompiledCondition({"type": "user_field", "operator": operator, "targetValue": targets,
+                                            "field": "url"})
+            loop = OPERATORS[operator]
+            compare = condition.compare
+            runs = max(1, number * 10 // count)
+
+            loop_time = timeit.timeit(lambda: [loop(v, condition) for v in values], number=runs)
+            matcher_time = timeit.timeit(lambda: [compare(v, condition) for v in values], number=runs)
+            per_check = 1e6 / (runs * len(values))
+            print(f"{operator:<22}{count:>8}{loop_time * per_check:>12.2f}{matcher_time * per_check:>12.2f}"
+                  f"{loop_time / matcher_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
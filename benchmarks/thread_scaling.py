@@ -0,0 +1,141 @@
+"""
+check_gate throughput of one StatsigServer shared by 1, 2, 4, 8 and 16 threads, with and
+without exposure logging (deduper, sampling set and event queue), and with the UA parse and
+country lookup caches (ua_parse_cache_size, country_lookup_cache_size) off and on. Besides the
+testdata gates, two gates check UA_BASED and IP_BASED conditions, so the caches' locks are on
+the measured path when they are enabled. On free-threaded CPython (3.13t and later) throughput
+should grow with the thread count up to the number of cores; with the GIL it stays flat.
+
+Run from the repository root:
+    python -m benchmarks.thread_scaling [--threads 1,2,4,8,16] [--seconds 2] [--min-efficiency 0.6]
+        [--cache-size 1000]
+
+--min-efficiency exits non-zero when, at any thread count up to the core count, throughput per
+thread falls below that fraction of the single thread throughput, so a change that serializes
+checks fails a free-threaded CI run.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.thread_util import is_free_threaded
+
+_SPECS_PATH = os.path.join(os.path.dirname(__file__), "..", "testdata", "download_config_specs.json")
+_USERS_PER_THREAD = 500
+_USER_AGENTS = [
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+    "Version/17.1 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+]
+
+
+def _gate(name, conditions):
+    return {"name": name, "type": "feature_gate", "salt": name, "enabled": True, "defaultValue": False,
+            "idType": "userID", "rules": [{"name": name, "id": name, "salt": name, "passPercentage": 100,
+                                            "returnValue": True, "idType": "userID", "conditions": conditions}]}
+
+
+def _condition(condition_type, operator, target, field):
+    return {"type": condition_type, "operator": operator, "targetValue": target, "field": field,
+            "additionalValues": {}, "idType": "userID"}
+
+
+def _start_server(cache_size):
+    with open(_SPECS_PATH, encoding="utf-8") as file:
+        specs = json.load(file)
+    specs["feature_gates"] += [
+        _gate("modern_chrome", [_condition("ua_based", "any", ["Chrome"], "browser_name"),
+                                _condition("ua_based", "version_gte", "100.0.0", "browser_version"),
+                                _condition("ua_based", "any", ["Mac OS X", "Windows"], "os_name")]),
+        _gate("in_us_or_nz", [_condition("ip_based", "any", ["US", "NZ"], "country")]),
+    ]
+    server = StatsigServer()
+    server.initialize("secret-key", StatsigOptions(local_mode=True, bootstrap_values=json.dumps(specs),
+                                                   disable_diagnostics=True, ua_parse_cache_size=cache_size,
+                                                   country_lookup_cache_size=cache_size))
+    # local mode drops events before they are queued; let them through to the in memory queue (no
+    # worker threads run in local mode, so nothing is sent) to measure the logging path as well
+    server._logger._local_mode = False
+    server._logger.event_batch_processor._local_mode = False
+    gates = [gate["name"] for gate in specs["feature_gates"]]
+    return server, gates
+
+
+def _run(server, gates, thread_count, seconds, log_exposure):
+    users = [[StatsigUser(f"user_{thread}_{i}", email=f"user_{i}@statsig.com" if i % 2 else None,
+                          user_agent=_USER_AGENTS[i % len(_USER_AGENTS)], ip=f"24.5.{i % 256}.{thread}")
+              for i in range(_USERS_PER_THREAD)] for thread in range(thread_count)]
+    counts = [0] * thread_count
+    barrier = threading.Barrier(thread_count + 1)
+    stop = threading.Event()
+
+    def worker(index):
+        check_gate = server.check_gate
+        thread_users = users[index]
+        count = 0
+        barrier.wait()
+        while not stop.is_set():
+            for user in thread_users:
+                for gate in gates:
+                    check_gate(user, gate, log_exposure)
+            count += len(thread_users) * len(gates)
+        counts[index] = count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", default="1,2,4,8,16")
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--min-efficiency", type=float, default=None)
+    parser.add_argument("--cache-size", type=int, default=1000,
+                        help="ua_parse_cache_size and country_lookup_cache_size of the cached runs")
+    args = parser.parse_args(argv)
+    thread_counts = [int(count) for count in args.threads.split(",")]
+    cores = os.cpu_count() or 1
+
+    print(f"python {sys.version.split()[0]}, free-threaded: {is_free_threaded()}, cores: {cores}")
+    failures = []
+    for cache_size in (0, args.cache_size):
+        server, gates = _start_server(cache_size)
+        try:
+            for log_exposure in (False, True):
+                print(f"\ncache_size={cache_size} log_exposure={log_exposure}")
+                print(f"{'threads':<9}{'checks/s':>12}{'speedup':>9}{'efficiency':>12}")
+                single = None
+                for thread_count in thread_counts:
+                    throughput = _run(server, gates, thread_count, args.seconds, log_exposure)
+                    single = single or throughput / thread_count
+                    speedup = throughput / single
+                    efficiency = speedup / min(thread_count, cores)
+                    print(f"{thread_count:<9}{throughput:>12,.0f}{speedup:>9.2f}{efficiency:>12.2f}")
+                    if (args.min_efficiency is not None and thread_count <= cores
+                            and efficiency < args.min_efficiency):
+                        failures.append((cache_size, log_exposure, thread_count, efficiency))
+        finally:
+            server.shutdown()
+
+    for cache_size, log_exposure, thread_count, efficiency in failures:
+        print(f"scaling regression: cache_size={cache_size} log_exposure={log_exposure} at {thread_count} "
+              f"threads, efficiency {efficiency:.2f} < {args.min_efficiency}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
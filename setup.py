@@ -17,6 +17,7 @@ with open(
 test_deps = ["requests", "user_agents", "semver"]
 extras = {
     "test": test_deps,
+    "columnar": ["numpy"],
 }
 
 setup(
@@ -34,6 +35,7 @@ setup(
         "Intended Audience :: Developers",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: Free Threading :: 2 - Beta",
         "Topic :: Software Development :: Libraries",
     ],
     install_requires=[
@@ -1,3 +1,4 @@
+from .columnar_evaluator import UserColumns
 from .dynamic_config import DynamicConfig
 from .evaluator import _Evaluator
 from .feature_gate import FeatureGate
@@ -12,6 +13,7 @@ from .statsig_logger import _StatsigLogger
 from .statsig_network import _StatsigNetwork
 from .statsig_options import StatsigOptions
 from .statsig_server import StatsigServer
+from .statsig_session import StatsigSession
 from .statsig_user import StatsigUser
 from .utils import HashingAlgorithm
 from .version import __version__
@@ -29,6 +31,8 @@ __all__ = [
     "StatsigEvent",
     "StatsigOptions",
     "StatsigServer",
+    "StatsigSession",
     "StatsigUser",
+    "UserColumns",
     "__version__",
 ]
@@ -1,7 +1,7 @@
 import threading
 from collections import deque
 from dataclasses import dataclass
-from typing import Dict, List, Deque
+from typing import Deque, Dict, List, Optional
 
 from . import globals
 from .diagnostics import Context
@@ -27,7 +27,9 @@ class EventBatchProcessor:
         self._diagnostics = diagnostics
         self._lock = threading.Lock()
         self._batch_size = options.event_queue_size
-        self._event_array: List[Dict] = []
+        # appended to without the lock (deque appends and poplefts are atomic), the lock is only taken
+        # to cut a batch, so logging exposures from many threads doesn't serialize them
+        self._event_array: Deque[Dict] = deque()
         self._batched_events_queue: Deque[BatchEventLogs] = deque(maxlen=options.retry_queue_size)
         self._statsig_metadata = statsig_metadata
         self._shutdown_event = shutdown_event
@@ -60,42 +62,52 @@ class EventBatchProcessor:
         self._add_diagnostics_event(Context.LOG_EVENT)
         with self._lock:
             if len(self._event_array) > 0:
-                batched_event = BatchEventLogs(
-                    payload={
-                        "events": self._event_array.copy(),
-                        "statsigMetadata": self._statsig_metadata
-                    },
-                    headers={"STATSIG-EVENT-COUNT": str(len(self._event_array))},
-                    event_count=len(self._event_array),
-                    retries=0
-                )
-                self._event_array.clear()
+                batched_event = self._take_batch_locked()
         if batched_event is not None and add_to_queue:
             self.add_to_batched_events_queue(batched_event)
         return batched_event
 
     def add_event(self, event):
-        should_batch = False
-        batched_event = None
-        with self._lock:
+        self._event_array.append(event)
+        batch_size = self._check_batch_array_size_interval() or self._batch_size
+        if len(self._event_array) >= batch_size:
+            self.__cut_full_batches(batch_size)
+
+    def add_events(self, events: List[Dict]):
+        """Adds many events, cutting a batch each time the queue fills."""
+        batch_size = self._check_batch_array_size_interval() or self._batch_size
+        for event in events:
             self._event_array.append(event)
-            batch_size = self._check_batch_array_size_interval() or self._batch_size
-            if len(self._event_array) >= batch_size:
-                should_batch = True
-                batched_event = BatchEventLogs(
-                    payload={
-                        "events": self._event_array.copy(),
-                        "statsigMetadata": self._statsig_metadata
-                    },
-                    headers={"STATSIG-EVENT-COUNT": str(len(self._event_array))},
-                    event_count=len(self._event_array),
-                    retries=0
-                )
-                self._event_array.clear()
-
-        if should_batch and batched_event is not None:
+        if len(self._event_array) >= batch_size:
+            self.__cut_full_batches(batch_size)
+
+    def __cut_full_batches(self, batch_size: int):
+        batched_events = []
+        with self._lock:
+            while len(self._event_array) >= batch_size:
+                batched_events.append(self._take_batch_locked(batch_size))
+
+        for batched_event in batched_events:
             self.add_to_batched_events_queue(batched_event)
 
+    def _take_batch_locked(self, max_events: Optional[int] = None) -> BatchEventLogs:
+        events: List[Dict] = []
+        popleft = self._event_array.popleft
+        try:
+            while max_events is None or len(events) < max_events:
+                events.append(popleft())
+        except IndexError:
+            pass
+        return BatchEventLogs(
+            payload={
+                "events": events,
+                "statsigMetadata": self._statsig_metadata
+            },
+            headers={"STATSIG-EVENT-COUNT": str(len(events))},
+            event_count=len(events),
+            retries=0
+        )
+
     def get_all_batched_events(self):
         self.batch_events()
         with self._lock:
@@ -105,8 +117,7 @@ class EventBatchProcessor:
     def _add_diagnostics_event(self, context: Context):
         if self._local_mode or not self._diagnostics.should_log_diagnostics(context):
             return
-        markers = self._diagnostics.get_markers(context)
-        self._diagnostics.clear_context(context)
+        markers = self._diagnostics.take_markers(context)
         if len(markers) == 0:
             return
         metadata = {
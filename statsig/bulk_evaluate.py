@@ -0,0 +1,316 @@
+"""
+Evaluates gates and configs for a file of users without the network.
+
+    python -m statsig.bulk_evaluate --specs dcs.json --users users.jsonl --output results.jsonl \\
+        --gate my_gate --config my_experiment [--id-list list_name=list_file] [--workers 8]
+
+Specs use the bootstrap_values format (a download_config_specs response). Users are read as
+JSONL (one StatsigUser dict per line, keyed like StatsigUser.to_dict) or CSV (userID, email, ip,
+userAgent, country, locale, appVersion columns, plus custom.<key>, privateAttributes.<key> and
+customIDs.<key> columns). Id list files hold the "+id"/"-id" lines served from an id list url.
+Users are evaluated in chunks across a process pool and results are written in input order,
+with a bounded number of chunks in flight. Throughput is reported on stderr.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from .statsig_errors import StatsigValueError
+from .statsig_options import StatsigOptions
+from .statsig_server import StatsigServer
+from .statsig_user import StatsigUser
+
+DEFAULT_CHUNK_SIZE = 1000
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+_USER_FIELDS = {
+    "userID": "user_id",
+    "email": "email",
+    "ip": "ip",
+    "userAgent": "user_agent",
+    "country": "country",
+    "locale": "locale",
+    "appVersion": "app_version",
+}
+_USER_MAPS = {
+    "custom": "custom",
+    "privateAttributes": "private_attributes",
+    "customIDs": "custom_ids",
+}
+
+
+class _Job(NamedTuple):
+    gates: Tuple[str, ...]
+    configs: Tuple[str, ...]
+    input_format: str
+    output_format: str
+
+
+class _ChunkResult(NamedTuple):
+    rows: List[Any]
+    invalid: int
+    pid: int
+    seconds: float
+
+
+_worker_server: Optional[StatsigServer] = None
+
+
+def _init_worker(specs: str, id_lists: Dict[str, str], tier: Optional[str]):
+    # pylint: disable=global-statement
+    global _worker_server
+    server = StatsigServer()
+    server.initialize("secret-bulk-evaluate", StatsigOptions(
+        local_mode=True, bootstrap_values=specs, tier=tier, disable_diagnostics=True))
+    for list_name, content in id_lists.items():
+        server._spec_store.load_local_id_list(list_name, content)
+    _worker_server = server
+
+
+def _user_from_dict(values: Dict[str, Any]) -> StatsigUser:
+    kwargs = {field: values.get(key) for key, field in _USER_FIELDS.items() if values.get(key) is not None}
+    for key, field in _USER_MAPS.items():
+        if isinstance(values.get(key), dict):
+            kwargs[field] = values[key]
+    return StatsigUser(**kwargs)
+
+
+def _user_from_csv_row(row: Dict[str, str]) -> StatsigUser:
+    values: Dict[str, Any] = {}
+    for column, cell in row.items():
+        if cell is None or cell == "":
+            continue
+        prefix, _, key = column.partition(".")
+        if key and prefix in _USER_MAPS:
+            values.setdefault(prefix, {})[key] = cell
+        elif column in _USER_FIELDS:
+            values[column] = cell
+    return _user_from_dict(values)
+
+
+def _parse_user(job: _Job, line: Any) -> StatsigUser:
+    if job.input_format == "csv":
+        return _user_from_csv_row(line)
+    try:
+        values = json.loads(line)
+    except ValueError as e:
+        raise StatsigValueError(f"Invalid JSON user: {e}") from e
+    if not isinstance(values, dict):
+        raise StatsigValueError("Each JSONL line must be a user object")
+    return _user_from_dict(values)
+
+
+def _evaluate_chunk(job: _Job, lines: List[Any]) -> _ChunkResult:
+    start = time.perf_counter()
+    server = _worker_server
+    assert server is not None, "bulk evaluation worker was not initialized"
+    users: List[StatsigUser] = []
+    errors: Dict[int, str] = {}
+    for i, line in enumerate(lines):
+        try:
+            users.append(_parse_user(job, line))
+        except StatsigValueError as e:
+            errors[i] = str(e)
+
+    gates = {gate: server.check_gate_batch(users, gate, log_exposure=False) for gate in job.gates}
+    configs = {config: server.get_config_batch(users, config, log_exposure=False) for config in job.configs}
+
+    rows: List[Any] = []
+    evaluated = 0
+    for i in range(len(lines)):
+        if i in errors:
+            rows.append(_error_row(job, errors[i]))
+            continue
+        rows.append(_result_row(job, users[evaluated], {gate: values[evaluated] for gate, values in gates.items()},
+                                {config: values[evaluated] for config, values in configs.items()}))
+        evaluated += 1
+    return _ChunkResult(rows, len(errors), os.getpid(), time.perf_counter() - start)
+
+
+def _result_row(job: _Job, user: StatsigUser, gates: Dict[str, bool], configs: Dict[str, Any]):
+    if job.output_format == "csv":
+        row = [user.user_id or "", json.dumps(user.custom_ids) if user.custom_ids else ""]
+        row.extend("true" if gates[gate] else "false" for gate in job.gates)
+        for config in job.configs:
+            result = configs[config]
+            row.extend((result.rule_id, result.group_name or "", json.dumps(result.value)))
+        return row
+    return json.dumps({
+        "userID": user.user_id,
+        "customIDs": user.custom_ids,
+        "gates": gates,
+        "configs": {name: {"value": result.value, "rule_id": result.rule_id, "group_name": result.group_name}
+                    for name, result in configs.items()},
+    })
+
+
+def _error_row(job: _Job, error: str):
+    if job.output_format == "csv":
+        return ["", ""] + [""] * (len(job.gates) + 3 * len(job.configs)) + [error]
+    return json.dumps({"error": error})
+
+
+def _csv_header(job: _Job) -> List[str]:
+    header = ["userID", "customIDs"] + list(job.gates)
+    for config in job.configs:
+        header.extend((f"{config}.rule_id", f"{config}.group_name", f"{config}.value"))
+    return header + ["error"]
+
+
+def _read_lines(file: TextIO, input_format: str) -> Iterator[Any]:
+    if input_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Report:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.users = 0
+        self.invalid = 0
+        self.workers: Dict[int, List[float]] = {}  # pid -> [chunks, users, busy seconds]
+
+    def add(self, result: _ChunkResult):
+        self.users += len(result.rows)
+        self.invalid += result.invalid
+        worker = self.workers.setdefault(result.pid, [0, 0, 0.0])
+        worker[0] += 1
+        worker[1] += len(result.rows)
+        worker[2] += result.seconds
+
+    def write(self, out):
+        elapsed = time.perf_counter() - self.start
+        out.write(f"evaluated {self.users} users ({self.invalid} invalid) in {elapsed:.2f}s: "
+                  f"{self.users / elapsed if elapsed else 0:.0f} users/sec\n")
+        out.write(f"{'worker pid':>10}{'chunks':>8}{'users':>10}{'busy s':>9}{'users/sec':>11}\n")
+        for pid, (chunks, users, busy) in sorted(self.workers.items()):
+            out.write(f"{pid:>10}{chunks:>8.0f}{users:>10.0f}{busy:>9.2f}{users / busy if busy else 0:>11.0f}\n")
+
+
+def run(specs: str, users_file: TextIO, output_file: TextIO, job: _Job,
+        id_lists: Optional[Dict[str, str]] = None, tier: Optional[str] = None, workers: int = 1,
+        chunk_size: int = DEFAULT_CHUNK_SIZE, report_file=None) -> _Report:
+    """Evaluates every user in users_file, writing one result per user to output_file in input order"""
+    report = _Report()
+    writer = csv.writer(output_file) if job.output_format == "csv" else None
+    if writer is not None:
+        writer.writerow(_csv_header(job))
+
+    def write(result: _ChunkResult):
+        report.add(result)
+        if writer is not None:
+            writer.writerows(result.rows)
+        else:
+            output_file.writelines(row + "\n" for row in result.rows)
+
+    chunks = _chunks(_read_lines(users_file, job.input_format), chunk_size)
+    init_args = (specs, id_lists or {}, tier)
+    if workers <= 1:
+        _init_worker(*init_args)
+        try:
+            for chunk in chunks:
+                write(_evaluate_chunk(job, chunk))
+        finally:
+            if _worker_server is not None:
+                _worker_server.shutdown()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            in_flight: deque = deque()
+            for chunk in chunks:
+                if len(in_flight) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    write(in_flight.popleft().result())
+                in_flight.append(pool.submit(_evaluate_chunk, job, chunk))
+            while in_flight:
+                write(in_flight.popleft().result())
+
+    if report_file is not None:
+        report.write(report_file)
+    return report
+
+
+def _format(path: str, override: Optional[str]) -> str:
+    if override is not None:
+        return override
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _read_file(path: str) -> str:
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def _parse_args(argv: Optional[Sequence[str]]):
+    parser = argparse.ArgumentParser(prog="python -m statsig.bulk_evaluate",
+                                     description="Evaluate gates and configs for a file of users offline.")
+    parser.add_argument("--specs", required=True, help="download_config_specs JSON file")
+    parser.add_argument("--users", required=True, help="users file (.jsonl or .csv), - for stdin")
+    parser.add_argument("--output", default="-", help="results file (.jsonl or .csv), - for stdout")
+    parser.add_argument("--gate", action="append", default=[], dest="gates", help="gate to check, repeatable")
+    parser.add_argument("--config", "--experiment", action="append", default=[], dest="configs",
+                        help="dynamic config or experiment to get, repeatable")
+    parser.add_argument("--id-list", action="append", default=[], dest="id_lists", metavar="NAME=PATH",
+                        help="id list file, repeatable")
+    parser.add_argument("--tier", help="environment tier to evaluate in")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes, 1 evaluates in this process (default: cpu count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="users per task")
+    parser.add_argument("--input-format", choices=("jsonl", "csv"), help="default: from the --users extension")
+    parser.add_argument("--output-format", choices=("jsonl", "csv"), help="default: from the --output extension")
+    args = parser.parse_args(argv)
+    if not args.gates and not args.configs:
+        parser.error("at least one --gate or --config is required")
+    for id_list in args.id_lists:
+        if "=" not in id_list:
+            parser.error(f"--id-list expects NAME=PATH, got {id_list}")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    job = _Job(tuple(args.gates), tuple(args.configs),
+               _format(args.users, args.input_format), _format(args.output, args.output_format))
+    specs = _read_file(args.specs)
+    try:
+        json.loads(specs)
+    except ValueError as e:
+        # bootstrapping would quietly fall back to default values for every user
+        raise SystemExit(f"Invalid --specs file {args.specs}: {e}") from e
+    id_lists = {}
+    for id_list in args.id_lists:
+        name, _, path = id_list.partition("=")
+        id_lists[name] = _read_file(path)
+
+    with contextlib.ExitStack() as files:
+        users_file = sys.stdin if args.users == "-" else \
+            files.enter_context(open(args.users, encoding="utf-8", newline=""))
+        output_file = sys.stdout if args.output == "-" else \
+            files.enter_context(open(args.output, "w", encoding="utf-8", newline=""))
+        run(specs, users_file, output_file, job, id_lists, args.tier, args.workers, args.chunk_size, sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+from .client_initialize_cache import _ClientInitializeCache, _ClientInitializeEntry, copy_client_initialize_response
+from .client_initialize_formatter import ClientInitializeResponse, ClientInitializeResponseFormatter, \
+    _ClientInitializeBatch, name_hasher
+from .client_initialize_stream import DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE, client_initialize_chunks
+from .spec_snapshot import SpecSnapshot
+from .spec_store import _SpecStore
+from .statsig_user import StatsigUser
+from .utils import HashingAlgorithm
+
+
+class _ClientInitialize:
+    """
+    Builds client initialize responses from the evaluator's results: as dicts, as (cached) JSON
+    bytes, as a stream of JSON chunks, or for a batch of users at once.
+    """
+
+    def __init__(self, spec_store: _SpecStore, evaluator, eval_func, cache_bytes: int = 0):
+        self._spec_store = spec_store
+        self._evaluator = evaluator
+        self._eval_func = eval_func
+        self._cache: Optional[_ClientInitializeCache] = None
+        if cache_bytes > 0:
+            self._cache = _ClientInitializeCache(spec_store, cache_bytes)
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def flush_metrics(self):
+        if self._cache is not None:
+            self._cache.flush_metrics()
+
+    def get_response(
+            self,
+            user: StatsigUser,
+            hash: HashingAlgorithm,
+            client_sdk_key=None,
+            include_local_override=False,
+            target_app_id: Optional[str] = None,
+    ) -> ClientInitializeResponse:
+        if self._cache is None:
+            return self.__format_response(user, hash, client_sdk_key, include_local_override, target_app_id,
+                                          self._spec_store.snapshot())
+        entry = self.__entry(user, hash, client_sdk_key, include_local_override, target_app_id)
+        if entry is None:
+            return None
+        # the cached response stays as built, callers may modify theirs
+        return copy_client_initialize_response(entry.response)
+
+    def get_response_bytes(
+            self,
+            user: StatsigUser,
+            hash: HashingAlgorithm,
+            client_sdk_key=None,
+            include_local_override=False,
+            target_app_id: Optional[str] = None,
+            encoding: Optional[str] = None,
+    ) -> Optional[bytes]:
+        entry = self.__entry(user, hash, client_sdk_key, include_local_override, target_app_id)
+        if entry is None:
+            return None
+        payload, encoded = entry.payload(encoding)
+        if encoded and encoding is not None and self._cache is not None:
+            self._cache.add_payload(entry, encoding, payload)
+        return payload
+
+    def get_responses(
+            self,
+            users: List[StatsigUser],
+            hash: HashingAlgorithm,
+            client_sdk_key=None,
+            include_local_override=False,
+            target_app_id: Optional[str] = None,
+            max_workers: int = 1,
+    ) -> List[ClientInitializeResponse]:
+        snapshot = self._spec_store.snapshot()
+        if not self._spec_store.is_ready_for_checks() or snapshot.time == 0:
+            return [None] * len(users)
+
+        batch = _ClientInitializeBatch(snapshot, hash, client_sdk_key, target_app_id)
+
+        def response(user):
+            return ClientInitializeResponseFormatter.get_formatted_response(
+                self._eval_func, user, self._spec_store, self._evaluator, hash, client_sdk_key,
+                include_local_override, target_app_id, snapshot, batch)
+
+        if max_workers <= 1 or len(users) <= 1:
+            return [response(user) for user in users]
+        # evaluation holds the GIL, so this only runs users in parallel on free-threaded CPython
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Statsig::client_initialize") as executor:
+            return list(executor.map(response, users))
+
+    def stream_response(
+            self,
+            user: StatsigUser,
+            hash: HashingAlgorithm,
+            client_sdk_key=None,
+            include_local_override=False,
+            target_app_id: Optional[str] = None,
+            encoding: Optional[str] = None,
+            chunk_size: int = DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE,
+    ) -> Optional[Iterator[bytes]]:
+        snapshot = self._spec_store.snapshot()
+        if not self._spec_store.is_ready_for_checks() or snapshot.time == 0:
+            return None
+
+        if self._cache is not None:
+            # a cached response is already serialized, responses missing from the cache are streamed as built
+            cached, _ = self._cache.get(user, hash, client_sdk_key, include_local_override, target_app_id, snapshot)
+            if cached is not None:
+                payload, encoded = cached.payload(encoding)
+                if encoded and encoding is not None:
+                    self._cache.add_payload(cached, encoding, payload)
+                return iter((payload,))
+
+        parts = ClientInitializeResponseFormatter.iter_formatted_response(
+            self._eval_func, user, self._spec_store, self._evaluator, hash, client_sdk_key, include_local_override,
+            target_app_id, snapshot, raw_exposures=True)
+        return client_initialize_chunks(parts, name_hasher(snapshot, hash), encoding, chunk_size)
+
+    def __entry(self, user, hash, client_sdk_key, include_local_override,
+                target_app_id) -> Optional[_ClientInitializeEntry]:
+        snapshot = self._spec_store.snapshot()
+        cache_key = None
+        if self._cache is not None:
+            cached, cache_key = self._cache.get(user, hash, client_sdk_key, include_local_override, target_app_id,
+                                                snapshot)
+            if cached is not None:
+                return cached
+
+        response = self.__format_response(user, hash, client_sdk_key, include_local_override, target_app_id,
+                                          snapshot)
+        if response is None:
+            return None
+        entry = _ClientInitializeEntry(response)
+        if self._cache is not None:
+            self._cache.set(cache_key, entry)
+        return entry
+
+    def __format_response(self, user, hash, client_sdk_key, include_local_override, target_app_id,
+                          snapshot: SpecSnapshot) -> ClientInitializeResponse:
+        if not self._spec_store.is_ready_for_checks():
+            return None
+
+        if snapshot.time == 0:
+            return None
+
+        return ClientInitializeResponseFormatter.get_formatted_response(
+            self._eval_func, user, self._spec_store, self._evaluator, hash, client_sdk_key, include_local_override,
+            target_app_id, snapshot)
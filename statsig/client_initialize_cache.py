@@ -0,0 +1,189 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+import brotli
+
+from . import globals
+from .evaluation_cache import current_id_list_state, user_fingerprint
+from .spec_snapshot import SpecSnapshot
+from .spec_store import _SpecStore
+from .statsig_user import StatsigUser
+from .utils import HashingAlgorithm
+
+# Content-Encoding -> encoder, for get_client_initialize_response_bytes
+CLIENT_INITIALIZE_ENCODINGS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda payload: gzip.compress(payload, compresslevel=6),
+    "br": lambda payload: brotli.compress(payload, quality=5),
+}
+
+
+def serialize_client_initialize_response(response: Dict[str, Any]) -> bytes:
+    return json.dumps(response, separators=(",", ":")).encode("utf-8")
+
+
+def copy_client_initialize_response(value):
+    """A copy of the response's dicts and lists, the rest are immutable JSON values."""
+    if isinstance(value, dict):
+        return {key: copy_client_initialize_response(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_client_initialize_response(item) for item in value]
+    return value
+
+
+class _ClientInitializeEntry:
+    """One client initialize response with its JSON bytes, and the encoded copies made so far."""
+    __slots__ = ("response", "payloads", "size", "key")
+
+    def __init__(self, response: Dict[str, Any]):
+        self.response = response
+        payload = serialize_client_initialize_response(response)
+        self.payloads: Dict[Optional[str], bytes] = {None: payload}
+        # the dict is counted as its JSON size, roughly what it takes in memory
+        self.size = 2 * len(payload)
+        # set once the entry is cached
+        self.key: Any = None
+
+    def payload(self, encoding: Optional[str]) -> Tuple[bytes, bool]:
+        """Returns the payload with the encoding applied, and whether it was encoded just now."""
+        if encoding is None:
+            return self.payloads[None], False
+        payload = self.payloads.get(encoding)
+        if payload is not None:
+            return payload, False
+        return CLIENT_INITIALIZE_ENCODINGS[encoding](self.payloads[None]), True
+
+
+class _ClientInitializeCache:
+    """
+    A bounded LRU cache of client initialize responses, keyed by the whole user, the client key
+    or target app, the hashing algorithm and the config specs, and holding the JSON bytes (and
+    gzip/brotli copies, once asked for) next to the response. Entries are evicted least
+    recently used first once their total size passes max_bytes, dropped whenever specs sync,
+    local overrides change or an id list used by the specs changes. Nothing is cached while
+    the specs hold a current_time condition or session replay sampling, since then the response
+    is not a function of the user alone.
+    """
+
+    def __init__(self, spec_store: _SpecStore, max_bytes: int):
+        self._spec_store = spec_store
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[_ClientInitializeEntry, tuple]]" = OrderedDict()
+        self._size = 0
+        self._snapshot: Optional[SpecSnapshot] = None
+        self._cacheable = False
+        self._id_lists: Tuple[str, ...] = ()
+        # bumped on every clear, so responses built before a clear are not stored after it
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, user: StatsigUser, hash_algo: HashingAlgorithm, client_sdk_key: Optional[str],
+            include_local_override: bool, target_app_id: Optional[str], snapshot: SpecSnapshot):
+        """
+        Returns (cached entry or None, key to store the built entry under or None). snapshot
+        is the config specs the response is built from, only the current ones are cached.
+        """
+        if not self._check_snapshot(snapshot):
+            return None, None
+        try:
+            key = (user_fingerprint(user), hash_algo, client_sdk_key, include_local_override, target_app_id)
+            hash(key)
+        except TypeError:
+            return None, None
+
+        state = current_id_list_state(self._spec_store, self._id_lists)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[1] == state:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                entry = cached[0]
+            else:
+                self._misses += 1
+                entry = None
+            generation = self._generation
+        if entry is None:
+            return None, (key, state, generation)
+        return entry, None
+
+    def set(self, cache_key, entry: _ClientInitializeEntry):
+        if cache_key is None or entry.size > self._max_bytes:
+            return
+        key, state, generation = cache_key
+        with self._lock:
+            if generation != self._generation:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[0].size
+            entry.key = key
+            self._entries[key] = (entry, state)
+            self._size += entry.size
+            self.__evict()
+
+    def add_payload(self, entry: _ClientInitializeEntry, encoding: str, payload: bytes):
+        """Keeps an encoded copy of a cached entry's JSON, if the entry is still cached."""
+        with self._lock:
+            cached = self._entries.get(entry.key)
+            if encoding in entry.payloads or cached is None or cached[0] is not entry:
+                return
+            entry.payloads[encoding] = payload
+            entry.size += len(payload)
+            self._size += len(payload)
+            self.__evict()
+
+    def __evict(self):
+        while self._size > self._max_bytes and self._entries:
+            evicted, _ = self._entries.popitem(last=False)[1]
+            self._size -= evicted.size
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._snapshot = None
+            self._generation += 1
+
+    def flush_metrics(self):
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+            self._hits = self._misses = self._evictions = 0
+            size = self._size
+        globals.logger.log_cache_stats("client_initialize_cache", hits, misses, evictions, size)
+
+    def _check_snapshot(self, snapshot: SpecSnapshot) -> bool:
+        current = self._spec_store.snapshot()
+        if current is not self._snapshot:
+            with self._lock:
+                if current is not self._snapshot:
+                    self._entries.clear()
+                    self._size = 0
+                    self._generation += 1
+                    self._cacheable, self._id_lists = _cacheability(current)
+                    self._snapshot = current
+        return snapshot is current and self._cacheable
+
+
+def _cacheability(snapshot: SpecSnapshot) -> Tuple[bool, Tuple[str, ...]]:
+    """Whether responses built from the snapshot can be cached, and the id lists they can read."""
+    id_lists: Set[str] = set()
+    for dependencies in snapshot.spec_dependencies.values():
+        for deps in dependencies.values():
+            if deps.uses_current_time:
+                return False, ()
+            id_lists.update(deps.id_lists)
+    session_replay_info = snapshot.session_replay_info
+    if session_replay_info is not None:
+        if session_replay_info.get("sampling_rate") is not None:
+            return False, ()
+        for triggers in ("session_recording_event_triggers", "session_recording_exposure_triggers"):
+            for trigger in (session_replay_info.get(triggers) or {}).values():
+                if trigger.get("sampling_rate") is not None:
+                    return False, ()
+    return True, tuple(sorted(id_lists))
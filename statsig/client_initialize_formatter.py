@@ -1,10 +1,11 @@
 import base64
 import random
 from hashlib import sha256
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from .config_evaluation import _ConfigEvaluation
 from .evaluation_context import EvaluationContext
+from .spec_snapshot import SpecSnapshot, target_app_for_sdk_key
 from .spec_store import _SpecStore, EntityType
 from .statsig_metadata import _StatsigMetadata
 from .statsig_user import StatsigUser
@@ -20,8 +21,89 @@ def hash_name(name: str, algorithm: HashingAlgorithm):
         sha256(name.encode('utf-8')).digest()).decode('utf-8')
 
 
+def _hashed_names(snapshot: SpecSnapshot, algorithm: HashingAlgorithm) -> Dict[str, str]:
+    """
+    hash_name of every gate, config, layer and session replay exposure trigger in the snapshot,
+    computed the first time a response with this algorithm is built from it.
+    """
+    names = snapshot.hashed_names.get(algorithm)
+    if names is not None:
+        return names
+    if algorithm == HashingAlgorithm.NONE:
+        names = {}
+    else:
+        entities = [*snapshot.gates, *snapshot.configs, *snapshot.layers]
+        exposure_triggers = (snapshot.session_replay_info or {}).get("session_recording_exposure_triggers")
+        if isinstance(exposure_triggers, dict):
+            entities.extend(exposure_triggers)
+        names = {name: hash_name(name, algorithm) for name in dict.fromkeys(entities)}
+    # racing builders compute the same table, keep whichever was published first
+    return snapshot.hashed_names.setdefault(algorithm, names)
+
+
+def name_hasher(snapshot: SpecSnapshot, algorithm: HashingAlgorithm) -> Callable[[str], str]:
+    hashed_names = _hashed_names(snapshot, algorithm)
+
+    def hashed(name: str) -> str:
+        hashed_name = hashed_names.get(name)
+        return hashed_name if hashed_name is not None else hash_name(name, algorithm)
+
+    return hashed
+
+
+def _target_app_id(snapshot: SpecSnapshot, client_sdk_key: Optional[str], target_app_id: Optional[str]):
+    if client_sdk_key is not None:
+        return target_app_for_sdk_key(snapshot, client_sdk_key)
+    return target_app_id
+
+
+def _copy_entity(entity: Dict[str, Any]) -> Dict[str, Any]:
+    copy = dict(entity)
+    for key in ("secondary_exposures", "undelegated_secondary_exposures"):
+        if key in copy:
+            copy[key] = list(copy[key])
+    return copy
+
+
 ClientInitializeResponse = Optional[Dict[str, Any]]
 
+# top level keys whose values iter_formatted_response yields as (hashed name, entity) iterators
+ENTITY_SECTIONS = ("feature_gates", "dynamic_configs", "layer_configs")
+
+
+class _ClientInitializeBatch:
+    """
+    The parts of client initialize responses that every user of a batch shares: hashed names,
+    the gates/configs/layers left once segments, holdouts and other target apps' entities are
+    filtered out, and the responses of entities folded into a constant result, kept the first
+    time one is built.
+    """
+    __slots__ = ("snapshot", "hashed", "sections", "constant_names", "constant_entities")
+
+    def __init__(self, snapshot: SpecSnapshot, hash_algo: HashingAlgorithm, client_sdk_key: Optional[str] = None,
+                 target_app_id: Optional[str] = None):
+        self.snapshot = snapshot
+        self.hashed = name_hasher(snapshot, hash_algo)
+        app_id = _target_app_id(snapshot, client_sdk_key, target_app_id)
+        self.sections: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        self.constant_names: Set[str] = set()
+        for section, specs, compiled in (("feature_gates", snapshot.gates, snapshot.compiled_gates),
+                                         ("dynamic_configs", snapshot.configs, snapshot.compiled_configs),
+                                         ("layer_configs", snapshot.layers, snapshot.compiled_layers)):
+            entries = []
+            for name, spec in specs.items():
+                if app_id is not None and app_id not in spec.get("targetAppIDs", []):
+                    continue
+                if spec["type"] == "feature_gate" and spec["entity"] in ("segment", "holdout"):
+                    continue
+                entries.append((name, spec))
+                compiled_spec = compiled.get(name)
+                if compiled_spec is not None and compiled_spec.constant is not None:
+                    self.constant_names.add(name)
+            self.sections[section] = entries
+        # shared by the batch's threads, racing builders store equal entities
+        self.constant_entities: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+
 
 class ClientInitializeResponseFormatter:
 
@@ -34,17 +116,50 @@ class ClientInitializeResponseFormatter:
             client_sdk_key=None,
             include_local_override=False,
             target_app_id: Optional[str] = None,
+            snapshot: Optional[SpecSnapshot] = None,
+            batch: Optional[_ClientInitializeBatch] = None,
     ) -> ClientInitializeResponse:
+        result: Dict[str, Any] = {}
+        for key, value in ClientInitializeResponseFormatter.iter_formatted_response(
+                eval_func, user, spec_store, evaluator, hash_algo, client_sdk_key, include_local_override,
+                target_app_id, snapshot, batch=batch):
+            result[key] = dict(value) if key in ENTITY_SECTIONS else value
+        return result
+
+    @staticmethod
+    def iter_formatted_response(
+            eval_func, user: StatsigUser,
+            spec_store: _SpecStore,
+            evaluator,
+            hash_algo: HashingAlgorithm,
+            client_sdk_key=None,
+            include_local_override=False,
+            target_app_id: Optional[str] = None,
+            snapshot: Optional[SpecSnapshot] = None,
+            raw_exposures: bool = False,
+            batch: Optional[_ClientInitializeBatch] = None,
+    ) -> Iterator[Tuple[str, Any]]:
+        """
+        Yields the response's top level (key, value) pairs in order. The ENTITY_SECTIONS values are
+        iterators of (hashed name, entity) that evaluate each entity as it is reached, and must be
+        consumed before moving on to the next pair. With raw_exposures, entities keep the evaluator's
+        secondary exposure lists with unhashed gate names, for writers that hash them as they go.
+        batch holds the parts shared with the other responses built for the same snapshot, hashing
+        algorithm and target app.
+        """
+        if batch is not None:
+            snapshot = batch.snapshot
+        elif snapshot is None:
+            snapshot = spec_store.snapshot()
         context = EvaluationContext(
             target_app_id=target_app_id,
-            client_key=client_sdk_key
+            client_key=client_sdk_key,
+            snapshot=snapshot
         )
-        app_id = None
-        if target_app_id is not None:
-            app_id = target_app_id
-        if client_sdk_key is not None:
-            app_id = spec_store.get_target_app_for_sdk_key(client_sdk_key)
-            context.target_app_id = app_id
+        app_id = _target_app_id(snapshot, client_sdk_key, target_app_id)
+        context.target_app_id = app_id
+
+        hashed = batch.hashed if batch is not None else name_hasher(snapshot, hash_algo)
 
         def convert_to_entity_type(entity: str, type: str) -> Optional[EntityType]:
             if entity == "layer":
@@ -55,34 +170,55 @@ class ClientInitializeResponseFormatter:
                 return EntityType.CONFIG
             return None
 
+        # evaluations of the dynamic_configs section, reused for the experiments layers delegate to
+        config_results: Dict[str, _ConfigEvaluation] = {}
+
         def config_to_response(config_name, config_spec):
-            config_target_apps = config_spec.get("targetAppIDs", [])
-            if app_id is not None and app_id not in config_target_apps:
-                return None
+            # a batch's sections are already filtered by target app
+            if batch is None:
+                config_target_apps = config_spec.get("targetAppIDs", [])
+                if app_id is not None and app_id not in config_target_apps:
+                    return None
 
-            eval_result = _ConfigEvaluation()
             local_override = None
             entity = config_spec["entity"]
             type = config_spec["type"]
+            if type == "feature_gate" and entity in ("segment", "holdout"):
+                return None
             if include_local_override:
                 if type == "feature_gate":
                     local_override = evaluator.lookup_gate_override(user, config_name)
                 if type == "dynamic_config":
                     local_override = evaluator.lookup_config_override(user, config_name)
 
+            constant_entities = None
+            if batch is not None and local_override is None and config_name in batch.constant_names:
+                constant_entities = batch.constant_entities
+                built = constant_entities.get(config_name)
+                if built is not None:
+                    return built[0], _copy_entity(built[1])
+
+            eval_result = _ConfigEvaluation()
+            evaluated_type = convert_to_entity_type(entity, type)
             if local_override is not None:
                 eval_result = local_override
+            elif evaluated_type == EntityType.GATE:
+                # gates are often also nested in other entities' conditions, evaluate them once
+                evaluator.eval_gate_with_nested_memo(user, config_name, eval_result, context)
             else:
-                eval_func(user, config_name, convert_to_entity_type(entity, type), eval_result, context)
+                eval_func(user, config_name, evaluated_type, eval_result, context)
+                if evaluated_type == EntityType.CONFIG:
+                    config_results[config_name] = eval_result
 
             if eval_result is None:
                 return None
 
-            hashed_name = hash_name(config_name, hash_algo)
+            hashed_name = hashed(config_name)
             result = {
                 "name": hashed_name,
                 "rule_id": eval_result.rule_id,
-                "secondary_exposures": hash_exposures(eval_result.secondary_exposures, hash_algo),
+                "secondary_exposures": eval_result.secondary_exposures if raw_exposures else hash_exposures(
+                    eval_result.secondary_exposures),
                 "value": False
             }
 
@@ -90,9 +226,6 @@ class ClientInitializeResponseFormatter:
             entity_type = config_spec["entity"]
 
             if category == "feature_gate":
-                if entity_type in ("segment", "holdout"):
-                    return None
-
                 result["value"] = eval_result.boolean_value
                 result["id_type"] = config_spec["idType"]
             elif category == "dynamic_config":
@@ -110,13 +243,15 @@ class ClientInitializeResponseFormatter:
                     populate_experiment_fields(
                         config_name, config_spec, eval_result, result)
                 elif entity_type == "layer":
-                    populate_layer_fields(config_spec, eval_result, result, hash_algo)
+                    populate_layer_fields(config_spec, eval_result, result)
                 elif entity_type == "autotune" and eval_result.group_name:
                     result["group_name"] = eval_result.group_name
 
             else:
                 return None
 
+            if constant_entities is not None:
+                constant_entities[config_name] = (hashed_name, _copy_entity(result))
             return hashed_name, result
 
         def populate_experiment_fields(
@@ -134,11 +269,11 @@ class ClientInitializeResponseFormatter:
             result["explicit_parameters"] = config_spec.get(
                 "explicitParameters", [])
 
-            layer_name = spec_store.get_layer_name_for_experiment(config_name)
-            if layer_name is None or spec_store.get_layer(layer_name) is None:
+            layer_name = snapshot.experiment_to_layer.get(config_name)
+            if layer_name is None or snapshot.layers.get(layer_name) is None:
                 return
 
-            layer = spec_store.get_layer(layer_name)
+            layer = snapshot.layers.get(layer_name)
             if layer is None:
                 return
 
@@ -146,18 +281,20 @@ class ClientInitializeResponseFormatter:
             current_value = result.get("value", {})
             result["value"] = {**layer_value, **current_value}
 
-        def populate_layer_fields(config_spec, eval_result, result, hash_algo):
+        def populate_layer_fields(config_spec, eval_result, result):
             delegate = eval_result.allocated_experiment
             result["explicit_parameters"] = config_spec.get(
                 "explicitParameters", [])
 
             if delegate is not None and delegate != "":
-                delegate_spec = spec_store.get_config(delegate)
-                delegate_result = _ConfigEvaluation()
-                eval_func(user, delegate, EntityType.CONFIG, delegate_result, context)
+                delegate_spec = snapshot.configs.get(delegate)
+                delegate_result = config_results.get(delegate)
+                if delegate_result is None:
+                    delegate_result = config_results[delegate] = _ConfigEvaluation()
+                    eval_func(user, delegate, EntityType.CONFIG, delegate_result, context)
 
                 if delegate_spec is not None:
-                    result["allocated_experiment_name"] = hash_name(delegate, hash_algo)
+                    result["allocated_experiment_name"] = hashed(delegate)
                     result["is_user_in_experiment"] = delegate_result.is_experiment_group
                     result["is_experiment_active"] = delegate_spec.get(
                         "isActive", False) is True
@@ -168,18 +305,34 @@ class ClientInitializeResponseFormatter:
 
             result["undelegated_secondary_exposures"] = eval_result.undelegated_secondary_exposures or []
 
-        def hash_exposures(exposures: list, algo: HashingAlgorithm):
+        def hash_exposures(exposures: list):
             for exposure in exposures:
-                exposure['gate'] = hash_name(exposure['gate'], algo)
+                exposure['gate'] = hashed(exposure['gate'])
             return exposures
 
-        def filter_nones(arr):
-            return dict([i for i in arr if i is not None])
-
-        def map_fnc(entry):
-            name = entry[0]
-            spec = entry[1]
-            return config_to_response(name, spec)
+        session_replay_info = snapshot.session_replay_info
+        targeting_gate_name = session_replay_info.get("targeting_gate", None) \
+            if session_replay_info is not None else None
+        # the targeting gate's value, set as the gates are written, None while it hasn't been
+        passes_targeting: Optional[bool] = None
+
+        def entities(section, specs):
+            for name, spec in batch.sections[section] if batch is not None else specs.items():
+                entry = config_to_response(name, spec)
+                if entry is not None:
+                    yield entry
+
+        def gates():
+            nonlocal passes_targeting
+            targeting_gate = hashed(targeting_gate_name) if targeting_gate_name is not None else None
+            for hashed_name, gate in entities("feature_gates", snapshot.gates):
+                if hashed_name == targeting_gate:
+                    passes_targeting = gate.get("value", False)
+                yield hashed_name, gate
+
+        yield "feature_gates", gates()
+        yield "dynamic_configs", entities("dynamic_configs", snapshot.configs)
+        yield "layer_configs", entities("layer_configs", snapshot.layers)
 
         evaluated_keys: Dict[str, Union[str, Dict[str, str]]] = {}
         if user.user_id is not None:
@@ -189,67 +342,59 @@ class ClientInitializeResponseFormatter:
             evaluated_keys["customIDs"] = user.custom_ids
 
         meta = _StatsigMetadata.get()
-        result = {
-            "feature_gates": filter_nones(map(map_fnc, spec_store.get_all_gates().items())),
-            "dynamic_configs": filter_nones(map(map_fnc, spec_store.get_all_configs().items())),
-            "layer_configs": filter_nones(map(map_fnc, spec_store.get_all_layers().items())),
-            "sdkParams": {},
-            "has_updates": True,
-            "generator": "statsig-python-sdk",
-            "evaluated_keys": evaluated_keys,
-            "time": spec_store.last_update_time(),
-            "user": user.to_dict(),
-            "hash_used": hash_algo.value,
-            "sdkInfo": {
-                "sdkType": meta["sdkType"],
-                "sdkVersion": meta["sdkVersion"],
-            }
+        yield "sdkParams", {}
+        yield "has_updates", True
+        yield "generator", "statsig-python-sdk"
+        yield "evaluated_keys", evaluated_keys
+        yield "time", snapshot.time
+        yield "user", user.to_dict()
+        yield "hash_used", hash_algo.value
+        yield "sdkInfo", {
+            "sdkType": meta["sdkType"],
+            "sdkVersion": meta["sdkVersion"],
         }
-        session_replay_info = spec_store.get_session_replay_info()
-        if session_replay_info is not None:
-            result["recording_blocked"] = session_replay_info.get("recording_blocked", False)
-            can_record = result["recording_blocked"] is False
-            targeting_gate_name = session_replay_info.get("targeting_gate", None)
-            if targeting_gate_name is not None:
-                targeting_gate = result["feature_gates"].get(
-                    hash_name(targeting_gate_name, hash_algo), None)
-                if targeting_gate is not None:
-                    result["passes_session_recording_targeting"] = targeting_gate.get("value", False)
-                    if not result["passes_session_recording_targeting"]:
-                        can_record = False
-            sampling_rate = session_replay_info.get("sampling_rate", None)
-            rand = random.random()
-            if sampling_rate is not None:
-                result["session_recording_rate"] = sampling_rate
-                if rand > sampling_rate:
-                    can_record = False
-            result["can_record_session"] = can_record
-            session_recording_event_triggers: Dict[str, Dict] = session_replay_info.get(
-                "session_recording_event_triggers", None)
-            if session_recording_event_triggers is not None:
-                result["session_recording_event_triggers"] = {}
-                for event in session_recording_event_triggers:
-                    event_trigger = session_recording_event_triggers[event]
-                    result["session_recording_event_triggers"][event] = {}
-                    if event_trigger.get("values", None) is not None:
-                        result["session_recording_event_triggers"][event]["values"] = event_trigger["values"]
-                    event_sampling_rate = event_trigger.get("sampling_rate", None)
-                    if event_sampling_rate is not None:
-                        result["session_recording_event_triggers"][event][
-                            "passes_sampling"] = rand <= event_sampling_rate
-
-            session_recording_exposure_triggers: Dict[str, Dict] = session_replay_info.get(
-                "session_recording_exposure_triggers", None)
-            if session_recording_exposure_triggers is not None:
-                result["session_recording_exposure_triggers"] = {}
-                for exposure in session_recording_exposure_triggers:
-                    exposure_trigger = session_recording_exposure_triggers[exposure]
-                    result["session_recording_exposure_triggers"][hash_name(exposure, hash_algo)] = {}
-                    if exposure_trigger.get("values", None) is not None:
-                        result["session_recording_exposure_triggers"][hash_name(exposure, hash_algo)]["values"] = \
-                            exposure_trigger["values"]
-                    event_sampling_rate = exposure_trigger.get("sampling_rate", None)
-                    if event_sampling_rate is not None:
-                        result["session_recording_exposure_triggers"][hash_name(exposure, hash_algo)][
-                            "passes_sampling"] = rand <= event_sampling_rate
-        return result
+        if session_replay_info is None:
+            return
+
+        recording_blocked = session_replay_info.get("recording_blocked", False)
+        yield "recording_blocked", recording_blocked
+        can_record = recording_blocked is False
+        if passes_targeting is not None:
+            yield "passes_session_recording_targeting", passes_targeting
+            if not passes_targeting:
+                can_record = False
+        sampling_rate = session_replay_info.get("sampling_rate", None)
+        rand = random.random()
+        if sampling_rate is not None:
+            yield "session_recording_rate", sampling_rate
+            if rand > sampling_rate:
+                can_record = False
+        yield "can_record_session", can_record
+        session_recording_event_triggers: Optional[Dict[str, Dict]] = session_replay_info.get(
+            "session_recording_event_triggers", None)
+        if session_recording_event_triggers is not None:
+            event_triggers: Dict[str, Dict[str, Any]] = {}
+            for event in session_recording_event_triggers:
+                event_trigger = session_recording_event_triggers[event]
+                event_triggers[event] = {}
+                if event_trigger.get("values", None) is not None:
+                    event_triggers[event]["values"] = event_trigger["values"]
+                event_sampling_rate = event_trigger.get("sampling_rate", None)
+                if event_sampling_rate is not None:
+                    event_triggers[event]["passes_sampling"] = rand <= event_sampling_rate
+            yield "session_recording_event_triggers", event_triggers
+
+        session_recording_exposure_triggers: Optional[Dict[str, Dict]] = session_replay_info.get(
+            "session_recording_exposure_triggers", None)
+        if session_recording_exposure_triggers is not None:
+            exposure_triggers: Dict[str, Dict[str, Any]] = {}
+            for exposure in session_recording_exposure_triggers:
+                exposure_trigger = session_recording_exposure_triggers[exposure]
+                hashed_exposure = hashed(exposure)
+                exposure_triggers[hashed_exposure] = {}
+                if exposure_trigger.get("values", None) is not None:
+                    exposure_triggers[hashed_exposure]["values"] = exposure_trigger["values"]
+                event_sampling_rate = exposure_trigger.get("sampling_rate", None)
+                if event_sampling_rate is not None:
+                    exposure_triggers[hashed_exposure]["passes_sampling"] = rand <= event_sampling_rate
+            yield "session_recording_exposure_triggers", exposure_triggers
@@ -0,0 +1,108 @@
+import json
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import brotli
+
+from .client_initialize_formatter import ENTITY_SECTIONS
+
+DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE = 16 * 1024
+
+_EXPOSURE_LISTS = ("secondary_exposures", "undelegated_secondary_exposures")
+
+
+class _GzipStreamEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def process(self, data: bytes) -> bytes:
+        # sync flushed, so every chunk can be sent as soon as it is written
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStreamEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+# Content-Encoding -> incremental encoder, for stream_client_initialize_response
+CLIENT_INITIALIZE_STREAM_ENCODERS: Dict[str, Callable[[], Any]] = {
+    "gzip": _GzipStreamEncoder,
+    "br": _BrotliStreamEncoder,
+}
+
+
+def client_initialize_chunks(
+        parts: Iterable[Tuple[str, Any]],
+        hashed: Callable[[str], str],
+        encoding: Optional[str] = None,
+        chunk_size: int = DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Writes the pairs of ClientInitializeResponseFormatter.iter_formatted_response(raw_exposures=True)
+    as compact JSON, yielding about chunk_size bytes at a time (before encoding). Only the entity
+    being written is held in memory, and secondary exposures are written with hashed gate names
+    without touching the evaluator's lists.
+    """
+    encoder = CLIENT_INITIALIZE_STREAM_ENCODERS[encoding]() if encoding is not None else None
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    buffer: List[str] = []
+    buffered = 0
+    for piece in _json_pieces(parts, encode, hashed):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered < chunk_size:
+            continue
+        # JSONEncoder escapes non ascii characters, so lengths are byte counts
+        data = "".join(buffer).encode("utf-8")
+        buffer.clear()
+        buffered = 0
+        if encoder is not None:
+            data = encoder.process(data)
+        if data:
+            yield data
+
+    data = "".join(buffer).encode("utf-8")
+    if encoder is not None:
+        data = encoder.process(data) + encoder.finish()
+    if data:
+        yield data
+
+
+def _json_pieces(parts: Iterable[Tuple[str, Any]], encode: Callable[[Any], str],
+                 hashed: Callable[[str], str]) -> Iterator[str]:
+    separator = "{"
+    for key, value in parts:
+        yield f"{separator}{encode(key)}:"
+        separator = ","
+        if key not in ENTITY_SECTIONS:
+            yield encode(value)
+            continue
+        entity_separator = "{"
+        for name, entity in value:
+            yield f"{entity_separator}{encode(name)}:{_entity_json(entity, encode, hashed)}"
+            entity_separator = ","
+        yield "{}" if entity_separator == "{" else "}"
+    yield "{}" if separator == "{" else "}"
+
+
+def _entity_json(entity: Dict[str, Any], encode: Callable[[Any], str], hashed: Callable[[str], str]) -> str:
+    # one encoder call per entity, the exposure lists are swapped for hashed ones that live only as
+    # long as the entity is being written
+    hashed_entity = entity.copy()
+    for key in _EXPOSURE_LISTS:
+        exposures = entity.get(key)
+        if exposures:
+            hashed_entity[key] = [
+                {"gate": hashed(exposure["gate"]), "gateValue": exposure["gateValue"], "ruleID": exposure["ruleID"]}
+                for exposure in exposures]
+    return encode(hashed_entity)
@@ -0,0 +1,411 @@
+import time
+from hashlib import sha256
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .compiled_spec import GATE_CONDITION_TYPES, IP_FIELD, _CompiledCondition, _CompiledRule, _CompiledSpec, \
+    _UserFieldAccessor
+from .config_evaluation import _ConfigEvaluation
+from .evaluation_context import EvaluationContext
+from .spec_store import EntityType
+from .statsig_errors import StatsigValueError
+from .statsig_user import StatsigUser
+
+has_imported_numpy = False
+try:
+    import numpy as np
+
+    has_imported_numpy = True
+except ImportError:
+    pass
+
+# Outcome of a condition for one user: failed, passed, or has to go through the scalar evaluator
+# (the condition raised, or needs data columns don't carry such as a parsed user agent)
+_FAIL = 0
+_PASS = 1
+_SCALAR = -1
+
+
+class UserColumns:
+    """
+    A batch of users held as columns, one entry per user in each, for evaluating a gate or
+    config over millions of users at once. None marks a user without that value, including
+    a user without that custom field or custom id.
+    """
+
+    def __init__(
+            self,
+            user_ids: Optional[Sequence[Any]] = None,
+            custom_ids: Optional[Mapping[str, Sequence[Any]]] = None,
+            custom: Optional[Mapping[str, Sequence[Any]]] = None,
+            email: Optional[Sequence[Any]] = None,
+            ip: Optional[Sequence[Any]] = None,
+            user_agent: Optional[Sequence[Any]] = None,
+            country: Optional[Sequence[Any]] = None,
+            locale: Optional[Sequence[Any]] = None,
+            app_version: Optional[Sequence[Any]] = None,
+    ):
+        if not has_imported_numpy:
+            raise ImportError("Failed to import numpy, have you installed the columnar extra "
+                              "(pip install statsig[columnar])?")
+
+        attributes = {"user_id": user_ids, "email": email, "ip": ip, "user_agent": user_agent,
+                      "country": country, "locale": locale, "app_version": app_version}
+        lengths = {len(column) for column in attributes.values() if column is not None}
+        lengths.update(len(column) for column in (custom_ids or {}).values())
+        lengths.update(len(column) for column in (custom or {}).values())
+        if len(lengths) > 1:
+            raise StatsigValueError("All UserColumns columns must have one entry per user")
+        self.size = lengths.pop() if lengths else 0
+
+        # ids are strings once they go through StatsigUser.__post_init__, so they are here too
+        self.attributes: Dict[str, "np.ndarray"] = {
+            name: _to_column(column, self.size, stringify=name == "user_id")
+            for name, column in attributes.items() if column is not None
+        }
+        self.custom_ids: Dict[str, "np.ndarray"] = {
+            str(id_type): _to_column(column, self.size, stringify=True)
+            for id_type, column in (custom_ids or {}).items()
+        }
+        self.custom: Dict[str, "np.ndarray"] = {
+            field: _to_column(column, self.size) for field, column in (custom or {}).items()
+        }
+
+        has_id = _present(self.attributes["user_id"]) if "user_id" in self.attributes \
+            else np.zeros(self.size, dtype=bool)
+        for column in self.custom_ids.values():
+            has_id |= _present(column)
+        if not has_id.all():
+            raise StatsigValueError(
+                f"User at index {int(np.argmin(has_id))} has no user_id or custom id. See "
+                "https://docs.statsig.com/messages/serverRequiredUserID"
+            )
+
+    def __len__(self):
+        return self.size
+
+    def user_at(self, index: int, environment: Optional[Dict[str, Any]] = None) -> StatsigUser:
+        fields = {name: column[index] for name, column in self.attributes.items()}
+        custom_ids = {id_type: column[index] for id_type, column in self.custom_ids.items()
+                      if column[index] is not None}
+        custom = {field: column[index] for field, column in self.custom.items() if column[index] is not None}
+        user = StatsigUser(custom_ids=custom_ids or None, custom=custom or None, **fields)
+        user._statsig_environment = environment
+        return user
+
+
+class ColumnarEvaluation(NamedTuple):
+    """
+    Results of one gate/config over UserColumns, one entry per user. value_keys index into
+    values, so each distinct config value is held once.
+    """
+    rule_ids: "np.ndarray"
+    group_names: "np.ndarray"
+    value_keys: "np.ndarray"
+    values: List[Any]
+    passed: "np.ndarray"
+
+
+def default_columnar_evaluation(size: int) -> ColumnarEvaluation:
+    """What every user gets when the evaluation fails, like the defaults check_gate/get_config recover to."""
+    return ColumnarEvaluation(np.full(size, "", dtype=object), np.full(size, None, dtype=object),
+                              np.zeros(size, dtype=np.int32), [{}], np.zeros(size, dtype=bool))
+
+
+def _to_column(values: Sequence[Any], size: int, stringify=False) -> "np.ndarray":
+    column = np.empty(size, dtype=object)
+    # one by one, assigning a list would broadcast values that are themselves lists
+    for index, value in enumerate(values):
+        column[index] = str(value) if stringify and value is not None else value
+    return column
+
+
+def _present(column: "np.ndarray") -> "np.ndarray":
+    return np.fromiter((value is not None for value in column), dtype=bool, count=len(column))
+
+
+def _empty(column: "np.ndarray") -> "np.ndarray":
+    return np.fromiter((value is None or value == "" for value in column), dtype=bool, count=len(column))
+
+
+def _factorize(column: "np.ndarray"):
+    """Codes per row and the distinct values they index, so a condition runs once per distinct value."""
+    index: Dict[Any, int] = {}
+    uniques: List[Any] = []
+    codes = []
+    key: Optional[Tuple[Any, Any]]
+    code: Optional[int]
+    for value in column:
+        try:
+            key = (value.__class__, value)
+            code = index.get(key)
+        except TypeError:  # unhashable, e.g. a list in a custom field
+            key = code = None
+        if code is None:
+            code = len(uniques)
+            uniques.append(value)
+            if key is not None:
+                index[key] = code
+        codes.append(code)
+    return np.array(codes, dtype=np.intp), uniques
+
+
+def _bulk_hash(prefix: str, ids: "np.ndarray") -> "np.ndarray":
+    """utils.sha256_hash of prefix + id for every id, as uint64."""
+    digests = b"".join(sha256(f"{prefix}{unit_id}".encode("utf-8")).digest()[:8] for unit_id in ids)
+    return np.frombuffer(digests, dtype=">u8").astype(np.uint64)
+
+
+def _outcome(compare: Callable[..., Any], *args) -> int:
+    try:
+        return _PASS if compare(*args) else _FAIL
+    except Exception:
+        return _SCALAR
+
+
+class _ColumnarEvaluator:
+    """
+    Evaluates one gate or config for UserColumns with a numpy mask per rule, matching
+    _Evaluator result for result. Conditions run once per distinct value of the field they
+    read, pass percentages and user buckets are hashed in one pass over the unit ids. Users
+    that need something columns can't answer (nested gates, id lists, delegated experiments,
+    country/user agent lookups, a condition raising) go through the scalar evaluator, as do
+    all users of a spec with local overrides or config mappings.
+    """
+
+    def __init__(self, evaluator, spec_store, users: UserColumns, environment: Optional[Dict[str, Any]]):
+        self._evaluator = evaluator
+        # one snapshot for every user, including those sent through the scalar evaluator
+        self._snapshot = spec_store.snapshot()
+        self._users = users
+        self._environment = environment
+        self._global_custom_fields = evaluator._global_custom_fields or {}
+        self._factorized: Dict[str, Any] = {}
+        self._unit_ids: Dict[Any, "np.ndarray"] = {}
+
+    def evaluate(self, name: str, entity_type: EntityType) -> ColumnarEvaluation:
+        size = len(self._users)
+        if entity_type == EntityType.GATE:
+            spec = self._snapshot.compiled_gates.get(name)
+            has_overrides = name in self._evaluator._gate_overrides
+        else:
+            spec = self._snapshot.compiled_configs.get(name)
+            has_overrides = name in self._evaluator._config_overrides
+
+        if size == 0:
+            return default_columnar_evaluation(0)
+
+        overrides = self._snapshot.overrides
+        has_config_mapping = isinstance(overrides, dict) and isinstance(overrides.get(name, None), list)
+        scalar = np.zeros(size, dtype=bool)
+        if has_overrides or has_config_mapping:
+            scalar[:] = True
+            spec = None
+        elif spec is None:
+            # nothing about the user can change an unrecognized spec's result
+            return self.__broadcast(self.__scalar_result(0, name, entity_type), size)
+
+        rule_ids = np.empty(size, dtype=object)
+        group_names = np.full(size, None, dtype=object)
+        value_keys = np.zeros(size, dtype=np.int32)
+        passed = np.zeros(size, dtype=bool)
+        values: List[Any] = []
+
+        if spec is not None:
+            values.append(spec.default_value)
+            rule_ids[:] = "default" if spec.enabled else "disabled"
+            if spec.enabled:
+                self.__evaluate_rules(spec, rule_ids, group_names, value_keys, passed, values, scalar)
+
+        for index in np.flatnonzero(scalar):
+            result = self.__scalar_result(int(index), name, entity_type)
+            rule_ids[index] = result.rule_id
+            group_names[index] = result.group_name
+            passed[index] = result.boolean_value
+            value_keys[index] = self.__value_key(values, result.json_value)
+
+        return ColumnarEvaluation(rule_ids, group_names, value_keys, values, passed)
+
+    def __evaluate_rules(self, spec: _CompiledSpec, rule_ids, group_names, value_keys, passed, values, scalar):
+        remaining = np.ones(len(self._users), dtype=bool)
+        for rule in spec.rules:
+            if not remaining.any():
+                break
+            outcomes = self.__rule_outcomes(rule, remaining)
+            scalar |= remaining & (outcomes == _SCALAR)
+            matched = remaining & (outcomes == _PASS)
+            remaining &= outcomes == _FAIL
+            if not matched.any():
+                continue
+
+            if rule.config_delegate is not None and self._snapshot.compiled_configs.get(rule.config_delegate):
+                scalar |= matched
+                continue
+
+            rows = np.flatnonzero(matched)
+            if not (isinstance(spec.salt, str) and isinstance(rule.salt, str)):
+                scalar[rows] = True  # the scalar evaluator can't concatenate them either
+                continue
+            rule_passed = self.__pass_percentage(rule, spec, rows)
+            rule_ids[rows] = rule.id
+            group_names[rows] = rule.group_name
+            passed[rows] = rule_passed
+            values.append(rule.return_value)
+            value_keys[rows] = np.where(rule_passed, len(values) - 1, 0)
+
+    def __rule_outcomes(self, rule: _CompiledRule, remaining) -> "np.ndarray":
+        """_PASS where every condition passes, _SCALAR where any can't be decided here."""
+        outcomes = np.full(len(self._users), _PASS, dtype=np.int8)
+        for condition in rule.conditions:
+            condition_outcomes = self.__condition_outcomes(condition, remaining)
+            outcomes = np.where((outcomes == _SCALAR) | (condition_outcomes == _SCALAR), _SCALAR,
+                                np.minimum(outcomes, condition_outcomes))
+        return outcomes
+
+    def __condition_outcomes(self, condition: _CompiledCondition, remaining) -> "np.ndarray":
+        size = len(self._users)
+        condition_type = condition.condition_type
+        if condition_type in GATE_CONDITION_TYPES or condition.is_id_list_operator:
+            return np.full(size, _SCALAR, dtype=np.int8)
+
+        if condition_type == "PUBLIC":
+            return np.full(size, _PASS, dtype=np.int8)
+        if condition_type == "CURRENT_TIME":
+            return self.__constant(condition, lambda: round(time.time() * 1000))
+        if condition_type == "ENVIRONMENT_FIELD":
+            return self.__constant(condition, lambda: self.__environment_value(condition.field))
+        if condition_type == "TARGET_APP":
+            return self.__constant(condition, lambda: self._snapshot.app_id)
+        if condition_type == "USER_BUCKET":
+            return self.__user_bucket_outcomes(condition, remaining)
+
+        if condition_type == "UNIT_ID":
+            codes, uniques = self.__factorized(f"unit:{condition.id_type}",
+                                               lambda: self.__unit_ids(condition.id_type, condition.id_type_lower))
+        elif condition_type in ("USER_FIELD", "IP_BASED", "UA_BASED"):
+            codes, uniques = self.__factorized(f"field:{condition.field.field}",
+                                               lambda: self.__field(condition.field))
+        else:
+            return self.__constant(condition, lambda: None)
+
+        per_value = np.array([_outcome(condition.compare, value, condition)
+                              for value in uniques], dtype=np.int8)
+        if condition_type == "IP_BASED":
+            # no value means no match, unless the country has to be looked up from the ip
+            per_value[[i for i, value in enumerate(uniques) if value is None]] = _FAIL
+            outcomes = per_value[codes]
+            if condition.field.field == "country":
+                outcomes[~_present(self.__field(condition.field)) & _present(self.__field(IP_FIELD))] = _SCALAR
+            return outcomes
+        if condition_type == "UA_BASED":
+            per_value[[i for i, value in enumerate(uniques) if value is None]] = _SCALAR
+        return per_value[codes]
+
+    def __constant(self, condition: _CompiledCondition, get_value: Callable[[], Any]) -> "np.ndarray":
+        return np.full(len(self._users), _outcome(lambda: condition.compare(get_value(), condition)), dtype=np.int8)
+
+    def __user_bucket_outcomes(self, condition: _CompiledCondition, remaining) -> "np.ndarray":
+        outcomes = np.full(len(self._users), _FAIL, dtype=np.int8)
+        rows = np.flatnonzero(remaining)
+        unit_ids = self.__unit_ids(condition.id_type, condition.id_type_lower)[rows]
+        buckets = _bulk_hash(condition.bucket_salt, unit_ids) % 1000
+        uniques, codes = np.unique(buckets, return_inverse=True)
+        per_bucket = np.array([_outcome(condition.compare, int(bucket), condition)
+                               for bucket in uniques], dtype=np.int8)
+        outcomes[rows] = per_bucket[codes.reshape(-1)]
+        return outcomes
+
+    def __pass_percentage(self, rule: _CompiledRule, spec: _CompiledSpec, rows) -> "np.ndarray":
+        if rule.pass_percentage == 100.0:
+            return np.ones(len(rows), dtype=bool)
+        if rule.pass_percentage == 0.0:
+            return np.zeros(len(rows), dtype=bool)
+        unit_ids = self.__unit_ids(rule.id_type, rule.id_type_lower)[rows]
+        hashes = _bulk_hash(f"{spec.salt}.{rule.salt}.", unit_ids)
+        return (hashes % 10000) < rule.pass_percentage * 100
+
+    def __unit_ids(self, id_type, id_type_lower) -> "np.ndarray":
+        """_Evaluator.__get_unit_id for every user, with the `or ""` its callers apply."""
+        unit_ids = self._unit_ids.get((id_type, id_type_lower))
+        if unit_ids is not None:
+            return unit_ids
+
+        size = len(self._users)
+        if id_type_lower is None:
+            unit_ids = self._users.attributes.get("user_id", np.full(size, None, dtype=object)).copy()
+        else:
+            unit_ids = np.full(size, None, dtype=object)
+            for name in (id_type, id_type_lower):
+                column = self._users.custom_ids.get(name)
+                if column is not None:
+                    missing = ~_present(unit_ids)
+                    unit_ids[missing] = column[missing]
+        unit_ids[_empty(unit_ids)] = ""
+        self._unit_ids[(id_type, id_type_lower)] = unit_ids
+        return unit_ids
+
+    def __field(self, field: _UserFieldAccessor) -> "np.ndarray":
+        """_Evaluator.__get_from_user for every user."""
+        size = len(self._users)
+        value = self._users.attributes.get(field.user_attribute) if field.user_attribute is not None else None
+        value = np.full(size, None, dtype=object) if value is None else value.copy()
+
+        custom = self._users.custom.get(field.field)
+        casefolded = self._users.custom.get(field.field_casefold) if field.field_casefold != field.field else None
+        if custom is None:
+            custom = casefolded
+        elif casefolded is not None:
+            custom = np.where(_present(custom), custom, casefolded)
+        if custom is not None:
+            take = _empty(value) & _present(custom)
+            value[take] = custom[take]
+
+        global_key = None
+        if field.field in self._global_custom_fields:
+            global_key = field.field
+        elif field.field_casefold in self._global_custom_fields:
+            global_key = field.field_casefold
+        if global_key is not None:
+            for index in np.flatnonzero(_empty(value)):
+                value[index] = self._global_custom_fields[global_key]
+        return value
+
+    def __factorized(self, key: str, get_column: Callable[[], "np.ndarray"]):
+        factorized = self._factorized.get(key)
+        if factorized is None:
+            factorized = self._factorized[key] = _factorize(get_column())
+        return factorized
+
+    def __environment_value(self, field: _UserFieldAccessor):
+        environment = self._environment
+        if environment is None:
+            return None
+        if field.field in environment:
+            return environment[field.field]
+        if field.field_lower in environment:
+            return environment[field.field_lower]
+        return None
+
+    def __scalar_result(self, index: int, name: str, entity_type: EntityType) -> _ConfigEvaluation:
+        user = self._users.user_at(index, self._environment)
+        context = EvaluationContext(snapshot=self._snapshot)
+        if entity_type == EntityType.GATE:
+            return self._evaluator.check_gate(user, name, context=context)
+        return self._evaluator.get_config(user, name, context)
+
+    @staticmethod
+    def __value_key(values: List[Any], value: Any) -> int:
+        for key, existing in enumerate(values):
+            if existing is value or existing == value:
+                return key
+        values.append(value)
+        return len(values) - 1
+
+    @staticmethod
+    def __broadcast(result: _ConfigEvaluation, size: int) -> ColumnarEvaluation:
+        return ColumnarEvaluation(
+            np.full(size, result.rule_id, dtype=object),
+            np.full(size, result.group_name, dtype=object),
+            np.zeros(size, dtype=np.int32),
+            [result.json_value],
+            np.full(size, bool(result.boolean_value), dtype=bool),
+        )
@@ -0,0 +1,413 @@
+import time
+from datetime import datetime
+from typing import Any, Collection, Dict, List, Optional, Tuple, Union
+
+from .evaluation_operators import COMPILED_PATTERN_OPERATORS, DATE_OPERATORS, ID_LIST_OPERATORS, OPERATORS, \
+    PARSED_TARGET_OPERATORS, STRING_MATCHER_OPERATORS, USER_BUCKET_OPERATORS, compile_pattern, unknown_operator
+from .string_matchers import build_string_matcher
+
+_USER_FIELD_ATTRIBUTES = {
+    "userid": "user_id",
+    "user_id": "user_id",
+    "email": "email",
+    "ip": "ip",
+    "ipaddress": "ip",
+    "ip_address": "ip",
+    "useragent": "user_agent",
+    "user_agent": "user_agent",
+    "country": "country",
+    "locale": "locale",
+    "appversion": "app_version",
+    "app_version": "app_version",
+}
+
+
+def _unit_id_type_lower(id_type) -> Optional[str]:
+    """Returns the lowered custom id type, or None when the unit id is the userID."""
+    if not isinstance(id_type, str) or id_type.lower() == "userid":
+        return None
+    return id_type.lower()
+
+
+class _UserFieldAccessor:
+    """
+    A user field name with its lookup variants resolved up front, so evaluation
+    does not have to lower/casefold the field name for every check.
+    """
+    __slots__ = ("field", "field_lower", "field_casefold", "user_attribute")
+
+    def __init__(self, field: Any):
+        if not isinstance(field, str):
+            field = ""
+        self.field = field
+        self.field_lower = field.lower()
+        self.field_casefold = field.casefold()
+        self.user_attribute = _USER_FIELD_ATTRIBUTES.get(self.field_lower)
+
+
+IP_FIELD = _UserFieldAccessor("ip")
+USER_AGENT_FIELD = _UserFieldAccessor("userAgent")
+
+GATE_CONDITION_TYPES = frozenset(("PASS_GATE", "FAIL_GATE", "MULTI_PASS_GATE", "MULTI_FAIL_GATE"))
+
+# Relative cost of checking a condition, used to run cheap conditions first when short-circuiting.
+# Field lookups with set/equality operators are the cheapest; anything that hashes, parses or
+# evaluates another gate is progressively more expensive.
+_CHEAP_OPERATORS = frozenset(("eq", "neq", "any", "none", "any_case_sensitive", "none_case_sensitive"))
+_EXPENSIVE_OPERATORS = frozenset(("str_matches", "in_segment_list", "not_in_segment_list"))
+_CONDITION_TYPE_COSTS = {
+    "PUBLIC": 0,
+    "USER_BUCKET": 4,
+    "IP_BASED": 5,
+    "UA_BASED": 6,
+}
+_GATE_CONDITION_COST = 10
+
+
+def _condition_cost(condition_type: str, operator: Any) -> int:
+    if condition_type in GATE_CONDITION_TYPES:
+        return _GATE_CONDITION_COST
+    cost = _CONDITION_TYPE_COSTS.get(condition_type, 1)
+    if cost == 0:
+        return cost
+    if operator in _EXPENSIVE_OPERATORS:
+        return cost + 3
+    if operator not in _CHEAP_OPERATORS:
+        return cost + 1
+    return cost
+
+
+def _order_conditions_by_cost(conditions: List["_CompiledCondition"]) -> List["_CompiledCondition"]:
+    """
+    Cheapest conditions first. Gate conditions keep their relative order and stay on the same
+    side of the other conditions as the rule's first condition, so secondary exposures and the
+    analytical-gate bookkeeping come out the same as evaluating the rule in its original order.
+    """
+    gates = [c for c in conditions if c.condition_type in GATE_CONDITION_TYPES]
+    others = sorted((c for c in conditions if c.condition_type not in GATE_CONDITION_TYPES),
+                    key=lambda c: c.cost)
+    if conditions and conditions[0].condition_type in GATE_CONDITION_TYPES:
+        return gates + others
+    return others + gates
+
+
+class _CompiledCondition:
+    __slots__ = ("condition", "condition_type", "operator", "target", "field", "id_type", "id_type_lower",
+                 "bucket_salt", "fast_target_value", "user_bucket", "parsed_target", "pattern",
+                 "string_matcher", "compare", "is_id_list_operator", "cost")
+
+    def __init__(self, condition: Dict[str, Any]):
+        self.condition = condition
+        condition_type = condition.get("type", "")
+        self.condition_type = condition_type.upper() if isinstance(condition_type, str) else ""
+        self.operator: Any = condition.get("operator")
+        self.target = condition.get("targetValue")
+        self.field = _UserFieldAccessor(condition.get("field", ""))
+        self.id_type = condition.get("idType", "userID")
+        self.id_type_lower = _unit_id_type_lower(self.id_type)
+        self.fast_target_value = condition.get("fast_target_value")
+        self.user_bucket = condition.get("user_bucket")
+        self.parsed_target = condition.get("parsed_target_value")
+        if self.parsed_target is not None and self.operator in DATE_OPERATORS:
+            self.parsed_target = datetime.fromtimestamp(self.parsed_target)
+        self.pattern = None
+        if self.operator == "str_matches" and self.target is not None:
+            self.pattern = compile_pattern(str(self.target))
+        self.string_matcher = None
+        if self.operator in STRING_MATCHER_OPERATORS:
+            self.string_matcher = build_string_matcher(self.operator, self.target)
+
+        self.bucket_salt = ""
+        if self.condition_type == "USER_BUCKET":
+            additional_values = condition.get("additionalValues") or {}
+            salt = additional_values.get("salt")
+            self.bucket_salt = (str(salt) if salt is not None else "") + "."
+
+        self.is_id_list_operator = self.operator in ID_LIST_OPERATORS
+        if self.user_bucket is not None and self.operator in USER_BUCKET_OPERATORS:
+            self.compare = USER_BUCKET_OPERATORS[self.operator]
+        elif "parsed_target_value" in condition and self.operator in PARSED_TARGET_OPERATORS:
+            self.compare = PARSED_TARGET_OPERATORS[self.operator]
+        elif self.pattern is not None:
+            self.compare = COMPILED_PATTERN_OPERATORS[self.operator]
+        elif self.string_matcher is not None:
+            self.compare = STRING_MATCHER_OPERATORS[self.operator]
+        elif isinstance(self.operator, str):
+            self.compare = OPERATORS.get(self.operator, unknown_operator)
+        else:
+            self.compare = unknown_operator
+        self.cost = _condition_cost(self.condition_type, self.operator)
+
+
+class _CompiledRule:
+    __slots__ = ("rule", "id", "conditions", "cost_ordered_conditions", "pass_percentage", "salt", "id_type",
+                 "id_type_lower", "sampling_rate", "config_delegate", "return_value", "group_name", "is_experiment_group")
+
+    def __init__(self, rule: Dict[str, Any]):
+        self.rule = rule
+        self.id = rule.get("id", "")
+        self.conditions: List[_CompiledCondition] = [
+            _CompiledCondition(condition) for condition in rule.get("conditions", [])
+        ]
+        self.cost_ordered_conditions = _order_conditions_by_cost(self.conditions)
+        self.pass_percentage = rule.get("passPercentage", 0)
+        self.salt = rule.get("salt", rule.get("id", ""))
+        self.id_type = rule.get("idType", "userID")
+        self.id_type_lower = _unit_id_type_lower(self.id_type)
+        self.sampling_rate = rule.get("samplingRate", None)
+        self.config_delegate = rule.get("configDelegate", None)
+        self.return_value = rule.get("returnValue")
+        self.group_name = rule.get("groupName", None)
+        self.is_experiment_group = rule.get("isExperimentGroup", False)
+
+
+USER_BUCKET_COUNT = 1000
+_ALLOCATION_CONDITION_TYPES = frozenset(("PUBLIC", "USER_BUCKET"))
+
+
+class _AllocationTable:
+    """
+    The rule each of the 1000 user buckets is allocated to, for a spec whose rules only hold
+    user_bucket and public conditions over one unit id and bucket salt (the usual shape of a
+    layer's experiment assignment). Finding the matching rule is then one hash and an index
+    instead of walking every rule's bucket lists.
+    """
+    __slots__ = ("bucket_salt", "id_type", "id_type_lower", "rules", "last_rule")
+
+    def __init__(self, bucket_salt: Optional[str], id_type: Any, rules: Tuple[Optional["_CompiledRule"], ...],
+                 last_rule: "_CompiledRule"):
+        # None when no rule has a user_bucket condition, so every bucket lands in the same rule
+        self.bucket_salt = bucket_salt
+        self.id_type = id_type
+        self.id_type_lower = _unit_id_type_lower(id_type)
+        self.rules = rules
+        # the rule whose sampling rate the interpreter leaves behind when no rule matches
+        self.last_rule = last_rule
+
+
+def build_allocation_table(rules: List[_CompiledRule]) -> Optional[_AllocationTable]:
+    """Returns None when a rule has any other shape, leaving the spec to the rule interpreter."""
+    if not rules:
+        return None
+    bucket_conditions = set()
+    for rule in rules:
+        # a rule without conditions never touches analytical_condition, unlike one that matches a condition
+        if not rule.conditions:
+            return None
+        for condition in rule.conditions:
+            if condition.condition_type not in _ALLOCATION_CONDITION_TYPES:
+                return None
+            if condition.condition_type == "USER_BUCKET":
+                bucket_conditions.add((condition.bucket_salt, condition.id_type))
+    if len(bucket_conditions) > 1:
+        return None
+    if not bucket_conditions:
+        return _AllocationTable(None, None, (rules[0],), rules[-1])
+
+    bucket_salt, id_type = bucket_conditions.pop()
+    allocated: List[Optional[_CompiledRule]] = []
+    try:
+        for bucket in range(USER_BUCKET_COUNT):
+            allocated.append(next((rule for rule in rules if all(
+                condition.condition_type == "PUBLIC" or condition.compare(bucket, condition)
+                for condition in rule.conditions)), None))
+    except Exception:
+        return None
+    return _AllocationTable(bucket_salt, id_type, tuple(allocated), rules[-1])
+
+
+_INDEXED_CONDITION_TYPES = frozenset(("UNIT_ID", "USER_FIELD"))
+_INDEXED_OPERATORS = {"any": True, "any_case_sensitive": False}  # operator -> whether it casefolds
+# runs of indexable rules shorter than this are cheaper to scan than to look up
+MIN_INDEXED_RUN = 8
+
+
+class _RuleLookup:
+    """The values of one field (a unit id type or user field, casefolded or not) indexed in a run of rules."""
+    __slots__ = ("condition", "casefold", "positions")
+
+    def __init__(self, condition: "_CompiledCondition", casefold: bool):
+        # any of the run's conditions on this field, used to read the value from the user
+        self.condition = condition
+        self.casefold = casefold
+        # target value -> position in the run of the first rule listing it
+        self.positions: Dict[str, int] = {}
+
+
+class _IndexedRuleRun:
+    """
+    A run of consecutive rules that each hold a single `any` condition on a unit id or user
+    field, e.g. per-customer overrides. The first rule that can match a user is found with one
+    dict lookup per distinct field instead of checking every rule's condition in turn.
+    """
+    __slots__ = ("rules", "lookups", "last_rule")
+
+    def __init__(self, rules: List["_CompiledRule"]):
+        self.rules = tuple(rules)
+        lookups: Dict[Tuple[str, Any, bool], _RuleLookup] = {}
+        for position, rule in enumerate(rules):
+            condition = rule.conditions[0]
+            casefold = _INDEXED_OPERATORS[condition.operator]
+            field = condition.id_type if condition.condition_type == "UNIT_ID" else condition.field.field
+            lookup = lookups.get((condition.condition_type, field, casefold))
+            if lookup is None:
+                lookup = lookups[(condition.condition_type, field, casefold)] = _RuleLookup(condition, casefold)
+            for value in condition.fast_target_value or ():
+                lookup.positions.setdefault(value, position)
+        self.lookups = tuple(lookups.values())
+        # walking the run without a match leaves the context's sampling rate and the result's
+        # analytical condition as this rule's single condition set them
+        self.last_rule = rules[-1]
+
+
+def _is_indexable_rule(rule: _CompiledRule) -> bool:
+    if len(rule.conditions) != 1:
+        return False
+    condition = rule.conditions[0]
+    return condition.condition_type in _INDEXED_CONDITION_TYPES and condition.operator in _INDEXED_OPERATORS \
+        and isinstance(condition.fast_target_value, dict)
+
+
+def _append_rule_run(entries: List[Union[_CompiledRule, _IndexedRuleRun]], run: List[_CompiledRule]):
+    if len(run) >= MIN_INDEXED_RUN:
+        entries.append(_IndexedRuleRun(run))
+    else:
+        entries.extend(run)
+
+
+def build_rule_index(rules: List[_CompiledRule]) -> Optional[Tuple[Union[_CompiledRule, _IndexedRuleRun], ...]]:
+    """
+    The spec's rules with every run of at least MIN_INDEXED_RUN indexable rules replaced by an
+    _IndexedRuleRun, or None when there is no such run.
+    """
+    entries: List[Union[_CompiledRule, _IndexedRuleRun]] = []
+    run: List[_CompiledRule] = []
+    for rule in rules:
+        if _is_indexable_rule(rule):
+            run.append(rule)
+            continue
+        _append_rule_run(entries, run)
+        run = []
+        entries.append(rule)
+    _append_rule_run(entries, run)
+    if not any(isinstance(entry, _IndexedRuleRun) for entry in entries):
+        return None
+    return tuple(entries)
+
+
+# a _ConstantOutcome.sampling_rate for specs whose evaluation leaves the context's sampling rate as it was
+UNCHANGED_SAMPLING_RATE: Any = object()
+_CONSTANT_CONDITION_TYPES = frozenset(("PUBLIC", "CURRENT_TIME"))
+
+
+class _ConstantOutcome:
+    """
+    How evaluating a spec ends for every user: the rule that matched (None for the default
+    value), whether it passed, and the context/analytical-condition state walking the rules
+    leaves behind (None when no condition ran), as the nested gate bookkeeping needs them.
+    """
+    __slots__ = ("rule", "did_pass", "sampling_rate", "analytical_condition", "template")
+
+    def __init__(self, rule: Optional["_CompiledRule"], did_pass: bool, sampling_rate: Any,
+                 analytical_condition: Optional[bool]):
+        self.rule = rule
+        self.did_pass = did_pass
+        self.sampling_rate = sampling_rate
+        self.analytical_condition = analytical_condition
+        # the top level result, filled in by the evaluator on first use
+        self.template: Any = None
+
+
+class _ConstantResult:
+    """
+    The result of a spec that doesn't depend on the user: disabled, or rules with only public
+    and current_time conditions, no delegates and a 0 or 100 pass percentage, ahead of any rule
+    that can't match. Rules with current_time conditions stay as (conditions, outcome) pairs
+    checked against the clock in order; the first match wins, then the fallback outcome.
+    """
+    __slots__ = ("time_rules", "outcome")
+
+    def __init__(self, time_rules: Tuple[Tuple[Tuple["_CompiledCondition", ...], _ConstantOutcome], ...],
+                 outcome: _ConstantOutcome):
+        self.time_rules = time_rules
+        self.outcome = outcome
+
+    def outcome_at(self, now: int) -> _ConstantOutcome:
+        for conditions, outcome in self.time_rules:
+            if all(condition.compare(now, condition) for condition in conditions):
+                return outcome
+        return self.outcome
+
+
+def fold_constant_result(spec: "_CompiledSpec", now: int) -> Optional[_ConstantResult]:
+    """Returns None when the spec's result can depend on the user, or on an unparseable time condition."""
+    if not spec.enabled:
+        return _ConstantResult((), _ConstantOutcome(None, False, UNCHANGED_SAMPLING_RATE, None))
+
+    time_rules: List[Tuple[Tuple[_CompiledCondition, ...], _ConstantOutcome]] = []
+    analytical_condition = None
+    for rule in spec.rules:
+        if rule.config_delegate is not None or rule.pass_percentage not in (0, 100):
+            return None
+        if any(condition.condition_type not in _CONSTANT_CONDITION_TYPES or condition.is_id_list_operator
+               for condition in rule.conditions):
+            return None
+        if rule.conditions:
+            analytical_condition = rule.sampling_rate is None
+        outcome = _ConstantOutcome(rule, rule.pass_percentage == 100, rule.sampling_rate, analytical_condition)
+        time_conditions = tuple(condition for condition in rule.conditions
+                                if condition.condition_type == "CURRENT_TIME")
+        if not time_conditions:
+            return _ConstantResult(tuple(time_rules), outcome)
+        try:
+            for condition in time_conditions:
+                condition.compare(now, condition)
+        except Exception:
+            return None
+        time_rules.append((time_conditions, outcome))
+
+    sampling_rate = spec.rules[-1].sampling_rate if spec.rules else UNCHANGED_SAMPLING_RATE
+    return _ConstantResult(tuple(time_rules), _ConstantOutcome(None, False, sampling_rate, analytical_condition))
+
+
+class _CompiledSpec:
+    """
+    A gate, dynamic config or layer spec with its rules and conditions resolved into
+    objects the evaluator can run directly, built once per config sync.
+    """
+    __slots__ = ("spec", "name", "enabled", "rules", "salt", "id_type", "default_value", "version",
+                 "forward_all_exposures", "explicit_parameters", "allocation", "rule_index", "constant")
+
+    def __init__(self, spec: Dict[str, Any], allocation_table=False, fold_constant=False, now=0):
+        self.spec = spec
+        self.name = spec.get("name")
+        self.enabled = spec.get("enabled", False)
+        self.rules: List[_CompiledRule] = [_CompiledRule(rule) for rule in spec.get("rules", [])]
+        self.salt = spec.get("salt", "")
+        self.id_type = spec.get("idType", "")
+        self.default_value = spec.get("defaultValue", {})
+        self.version = spec.get("version", None)
+        self.forward_all_exposures = spec.get("forwardAllExposures", False)
+        self.explicit_parameters = spec.get("explicitParameters", [])
+        self.allocation = build_allocation_table(self.rules) if allocation_table else None
+        self.rule_index = build_rule_index(self.rules) if self.allocation is None else None
+        self.constant = fold_constant_result(self, now) if fold_constant else None
+
+
+def compile_specs(parsed_specs: Dict[str, Dict[str, Any]], allocation_tables=False,
+                  config_mappings: Optional[Collection[str]] = None) -> Dict[str, _CompiledSpec]:
+    """
+    config_mappings: the names config mapping overrides can redirect. Those are never folded into
+    a constant result, nor is anything when it is None.
+    """
+    if config_mappings is None:
+        return {name: _CompiledSpec(spec, allocation_tables) for name, spec in parsed_specs.items()}
+    now = round(time.time() * 1000)
+    return {name: _CompiledSpec(spec, allocation_tables, name not in config_mappings, now)
+            for name, spec in parsed_specs.items()}
+
+
+def compile_rules(parsed_rules: Optional[Dict[str, Dict[str, Any]]]) -> Optional[Dict[str, _CompiledRule]]:
+    if parsed_rules is None:
+        return None
+    return {name: _CompiledRule(rule) for name, rule in parsed_rules.items()}
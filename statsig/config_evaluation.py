@@ -1,3 +1,5 @@
+from typing import Any, List, Optional, Tuple
+
 from .evaluation_details import EvaluationDetails, EvaluationReason, DataSource
 
 
@@ -73,3 +75,128 @@ class _ConfigEvaluation:
         self.analytical_condition = False
         self.seen_analytical_gates = False
         self.override_config_name = None
+
+
+
+
+_UNSET: Any = object()
+
+# Fields a nested gate evaluation may overwrite on the evaluation it is nested in. Left at _UNSET
+# while recording so that replaying the nested gate only touches the fields it actually wrote.
+_NESTED_GATE_FIELDS = ("json_value", "rule_id", "id_type", "version", "allocated_experiment",
+                       "explicit_parameters", "is_experiment_group", "group_name", "sample_rate", "user",
+                       "forward_all_exposures", "seen_analytical_gates", "override_config_name")
+
+
+def _details_state(evaluation_details: EvaluationDetails):
+    return (evaluation_details.reason in (EvaluationReason.unsupported, EvaluationReason.unrecognized),
+            evaluation_details.source in (DataSource.UA_NOT_LOADED, DataSource.COUNTRY_NOT_LOADED))
+
+
+class _NestedGateEvaluation(_ConfigEvaluation):
+    """
+    Records the effect of evaluating a nested gate on the evaluation it is nested in, so the
+    gate can be applied again to later evaluations for the same user without re-running its rules.
+
+    While recording it stands in for the parent evaluation, starting from the parent state the
+    nested evaluation may read: boolean value, analytical condition and evaluation details.
+    """
+
+    def __init__(self, parent: _ConfigEvaluation, context):
+        # pylint: disable=super-init-not-called
+        self.boolean_value = parent.boolean_value
+        self.json_value = _UNSET
+        self.rule_id = _UNSET
+        self.id_type = _UNSET
+        self.version = _UNSET
+        self.secondary_exposures = []
+        self.undelegated_secondary_exposures = self.secondary_exposures
+        self.allocated_experiment = _UNSET
+        self.explicit_parameters = _UNSET
+        self.is_experiment_group = _UNSET
+        self.evaluation_details = parent.evaluation_details
+        self.group_name = _UNSET
+        self.sample_rate = _UNSET
+        self.user = _UNSET
+        self.forward_all_exposures = _UNSET
+        self.seen_analytical_gates = _UNSET
+        self.override_config_name = _UNSET
+
+        if isinstance(parent, _NestedGateEvaluation):
+            # peek, the parent only depends on its own parent's value if this gate reads it
+            analytical_condition = parent._peek_analytical_condition()
+            self.__parent: Optional[_NestedGateEvaluation] = parent
+        else:
+            analytical_condition = parent.analytical_condition
+            self.__parent = None
+        self.__analytical_condition = analytical_condition
+        self.__analytical_condition_written = False
+        self.__parent_analytical_condition = analytical_condition
+        self.__parent_analytical_condition_read = False
+        self.__parent_details = parent.evaluation_details
+        self.__parent_details_state = _details_state(parent.evaluation_details)
+        self.__parent_sampling_rate = context.sampling_rate
+        context.sampling_rate = _UNSET
+
+        self.was_reset = False
+        self.fields: List[Tuple[str, Any]] = []
+        self.sampling_rate = _UNSET
+
+    @property
+    def analytical_condition(self):
+        if not self.__analytical_condition_written:
+            self.__parent_analytical_condition_read = True
+        return self.__analytical_condition
+
+    @analytical_condition.setter
+    def analytical_condition(self, value):
+        self.__analytical_condition = value
+        self.__analytical_condition_written = True
+
+    def reset(self):
+        super().reset()
+        self.was_reset = True
+
+    def _peek_analytical_condition(self):
+        return self.__analytical_condition
+
+    def _note_analytical_condition_read(self):
+        if not self.__analytical_condition_written:
+            self.__parent_analytical_condition_read = True
+
+    def finish_recording(self, context):
+        if self.__parent is not None:
+            if self.__parent_analytical_condition_read:
+                self.__parent._note_analytical_condition_read()
+            self.__parent = None
+        self.sampling_rate = context.sampling_rate
+        context.sampling_rate = self.__parent_sampling_rate
+        if self.evaluation_details is self.__parent_details:
+            self.evaluation_details = None
+        self.fields = [(field, getattr(self, field)) for field in _NESTED_GATE_FIELDS
+                       if getattr(self, field) is not _UNSET]
+
+    def is_error(self):
+        return self.evaluation_details is not None and self.evaluation_details.reason == EvaluationReason.error
+
+    def matches(self, end_result: _ConfigEvaluation):
+        """Whether applying this evaluation to end_result gives the same result as evaluating the gate."""
+        if self.__parent_analytical_condition_read and \
+                end_result.analytical_condition != self.__parent_analytical_condition:
+            return False
+        return _details_state(end_result.evaluation_details) == self.__parent_details_state
+
+    def apply(self, end_result: _ConfigEvaluation, context):
+        if self.was_reset:
+            end_result.reset()
+        end_result.boolean_value = self.boolean_value
+        if self.__analytical_condition_written:
+            end_result.analytical_condition = self.__analytical_condition
+        for field, value in self.fields:
+            setattr(end_result, field, value)
+        # exposures are copied since callers may rewrite them in place (e.g. hashing gate names)
+        end_result.secondary_exposures.extend(dict(exposure) for exposure in self.secondary_exposures)
+        if self.evaluation_details is not None:
+            end_result.evaluation_details = self.evaluation_details
+        if self.sampling_rate is not _UNSET:
+            context.sampling_rate = self.sampling_rate
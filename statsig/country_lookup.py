@@ -0,0 +1,95 @@
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+import ip3country
+
+_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(ip3country.__file__)), "data", "ip_supalite.table")
+
+
+class _CompactCountryLookup:
+    """
+    The ip3country range table held in two flat arrays instead of lists of Python objects:
+    the end of each IP range (int64) and the index of its country code (uint8). Lookups are a
+    bisect over the range ends.
+
+    The arrays are a few MB of plain memory that is never written after loading, so workers
+    forked after the table is loaded (e.g. gunicorn --preload) keep sharing its pages, whereas
+    lists of ints get copied into every worker as soon as lookups touch their refcounts.
+    """
+
+    def __init__(self, table: bytes):
+        self.country_codes = []
+        index = 0
+        for _ in range(256):
+            code = chr(table[index]) + chr(table[index + 1])
+            index += 2
+            self.country_codes.append(code)
+            if code[0] == "*":
+                break
+
+        range_ends = []
+        range_countries = []
+        last_end_range = 0
+        length = len(table)
+        while index < length:
+            count = 0
+            n1 = table[index]
+            index += 1
+            if n1 < 240:
+                count = n1
+            elif n1 == 242:
+                count = table[index] | (table[index + 1] << 8)
+                index += 2
+            elif n1 == 243:
+                count = table[index] | (table[index + 1] << 8) | (table[index + 2] << 16)
+                index += 3
+
+            last_end_range += count * 256
+            range_ends.append(last_end_range)
+            range_countries.append(table[index])
+            index += 1
+
+        self.range_ends = array("q", range_ends)
+        self.range_countries = array("B", range_countries)
+
+    # pylint: disable=invalid-name
+    # lookupStr/lookupNumeric match ip3country.CountryLookup, so either can back the evaluator
+    def lookupStr(self, ip_address: str) -> Optional[str]:
+        components = ip_address.split(".")
+        if len(components) != 4:
+            return None
+
+        ip_number = (
+            (int(components[0]) << 24)
+            + (int(components[1]) << 16)
+            + (int(components[2]) << 8)
+            + int(components[3])
+        )
+        return self.lookupNumeric(ip_number)
+
+    def lookupNumeric(self, ip_number: int) -> Optional[str]:
+        # the first range ending after the ip, or the last range for ips past the end
+        index = min(bisect_right(self.range_ends, ip_number), len(self.range_ends) - 1)
+        code = self.country_codes[self.range_countries[index]]
+        if code == "--":
+            return None
+        return code
+    # pylint: enable=invalid-name
+
+
+_shared_lookup: Optional[_CompactCountryLookup] = None
+_shared_lookup_lock = threading.Lock()
+
+
+def get_compact_country_lookup() -> _CompactCountryLookup:
+    """The process wide table, loaded on first use and shared by every StatsigServer instance."""
+    global _shared_lookup
+    if _shared_lookup is None:
+        with _shared_lookup_lock:
+            if _shared_lookup is None:
+                with open(_TABLE_PATH, mode="rb") as file:
+                    _shared_lookup = _CompactCountryLookup(file.read())
+    return _shared_lookup
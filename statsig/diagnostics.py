@@ -1,7 +1,8 @@
 import random
+import threading
 import time
 from enum import Enum
-from typing import Optional, Dict
+from typing import Dict, List, Optional
 
 from .interface_network import NetworkProtocol
 from .statsig_options import StatsigOptions
@@ -200,6 +201,9 @@ class Diagnostics:
             Context.LOG_EVENT: [],
             Context.API_CALL: [],
         }
+        # taken only to append or drain markers: once a context holds its max markers, every
+        # further add_marker returns without it, so checks don't queue behind each other
+        self._lock = threading.Lock()
         self.context = Context.INITIALIZE
         self.default_max_markers = 50
         self.maxMarkers = {
@@ -233,10 +237,13 @@ class Diagnostics:
         if self.disabled and context == Context.API_CALL:
             return False
         max_markers = self.maxMarkers.get(context, self.default_max_markers)
-        cur_length = len(self.context_to_markers[context])
-        if max_markers <= cur_length:
+        if max_markers <= len(self.context_to_markers[context]):
             return False
-        self.context_to_markers[context].append(marker)
+        with self._lock:
+            markers = self.context_to_markers[context]
+            if max_markers <= len(markers):
+                return False
+            markers.append(marker)
         return True
 
     def set_max_markers(self, context, max_markers):
@@ -249,7 +256,15 @@ class Diagnostics:
         return self.context_to_markers.get(context, [])
 
     def clear_context(self, context):
-        self.context_to_markers[context] = []
+        with self._lock:
+            self.context_to_markers[context] = []
+
+    def take_markers(self, context) -> List[Marker]:
+        """Returns the context's markers and clears them, without losing markers added concurrently."""
+        with self._lock:
+            markers = self.context_to_markers.get(context, [])
+            self.context_to_markers[context] = []
+        return markers
 
     def log_diagnostics(self, context: Context, key: Optional[Key] = None):
         if self.logger is None or len(self.context_to_markers[context]) == 0:
@@ -257,7 +272,7 @@ class Diagnostics:
 
         metadata = {
             "markers": [
-                marker.to_dict() for marker in self.context_to_markers[context]
+                marker.to_dict() for marker in self.take_markers(context)
             ],
             "context": context,
         }
@@ -267,7 +282,6 @@ class Diagnostics:
                 if isinstance(self.statsig_options, StatsigOptions)
                 else None
             )
-        self.clear_context(context)
 
         if self.should_log_diagnostics(context, key):
             self.logger.log_diagnostics_event(metadata)
@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from . import globals
+from .config_evaluation import _ConfigEvaluation
+from .spec_dependencies import _SpecDependencies
+from .spec_snapshot import SpecSnapshot
+from .spec_store import _SpecStore, EntityType
+from .statsig_user import StatsigUser
+
+
+_PLAIN_TYPES = (str, int, type(None))
+_MISSING = object()
+
+
+def _freeze(value):
+    value_type = type(value)
+    if value_type in _PLAIN_TYPES or value is _MISSING:
+        return value
+    if isinstance(value, dict):
+        items = tuple(value.items())
+        for _, v in items:
+            if type(v) not in _PLAIN_TYPES:
+                return tuple((k, _freeze(v)) for k, v in items)
+        return items
+    if isinstance(value, (list, tuple)):
+        return list, tuple(_freeze(v) for v in value)
+    # keeps True, 1 and 1.0 apart, they compare and hash equal but evaluate differently
+    return value_type, value
+
+
+def user_fingerprint(user: StatsigUser):
+    return (user.user_id, user.email, user.ip, user.user_agent, user.country, user.locale, user.app_version,
+            _freeze(user.custom), _freeze(user.private_attributes), _freeze(user.custom_ids),
+            _freeze(user._statsig_environment))
+
+
+class _UserKeyPlan:
+    """The parts of a user one entity's evaluation can read, sorted once so keys are built in a fixed order."""
+    __slots__ = ("user_fields", "custom_fields", "unit_id_types", "environment_fields", "id_lists")
+
+    def __init__(self, deps: _SpecDependencies):
+        self.user_fields = tuple(sorted(deps.user_fields))
+        self.custom_fields = tuple(sorted(deps.custom_fields))
+        self.unit_id_types = tuple(sorted(deps.unit_id_types))
+        self.environment_fields = tuple(sorted(deps.environment_fields))
+        self.id_lists = tuple(sorted(deps.id_lists))
+
+    def fingerprint(self, user: StatsigUser):
+        return (tuple(_freeze(getattr(user, field)) for field in self.user_fields),
+                _pick(user.custom, self.custom_fields),
+                _pick(user.private_attributes, self.custom_fields),
+                _pick(user.custom_ids, self.unit_id_types),
+                _pick(user._statsig_environment, self.environment_fields))
+
+
+def _pick(values: Optional[Mapping[str, Any]], keys: Tuple[str, ...]):
+    if not keys:
+        return None
+    if not values:
+        return (_MISSING,) * len(keys)
+    return tuple(_freeze(values.get(key, _MISSING)) for key in keys)
+
+
+class _EvaluationCache:
+    """
+    A bounded LRU cache of top level gate, config and layer evaluations. Entries are keyed by
+    the entity, the config sync time and only the user fields the entity can read (see
+    _SpecStore.get_spec_dependencies), and carry the state of every id list the entity can read
+    so they are dropped once one of those lists changes. Entities that read the current time
+    are never cached.
+    """
+
+    def __init__(self, spec_store: _SpecStore, capacity: int):
+        self._spec_store = spec_store
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Any, Tuple[_ConfigEvaluation, tuple]]" = OrderedDict()
+        self._key_plans: Dict[Tuple[EntityType, str], Optional[_UserKeyPlan]] = {}
+        self._lcut: Optional[int] = None
+        # bumped on every clear, so results evaluated before a clear are not stored after it
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, entity_type: EntityType, name: str, user: StatsigUser, snapshot: SpecSnapshot,
+            full_user_key: bool = False):
+        """
+        Returns (cached result or None, key to store the evaluated result under or None).
+        snapshot is the config specs the evaluation reads; evaluations pinned to an older snapshot
+        than the current one are not cached. full_user_key keys on the whole user, for when local
+        overrides can match any of its ids.
+        """
+        if not self._check_spec_version(snapshot):
+            return None, None
+        plan = self._get_key_plan(entity_type, name, snapshot)
+        if plan is None:
+            return None, None
+        try:
+            fingerprint = user_fingerprint(user) if full_user_key else plan.fingerprint(user)
+            key = (entity_type, name, fingerprint, snapshot.time, snapshot.source)
+            hash(key)
+        except TypeError:
+            return None, None
+
+        id_list_state = self._id_list_state(plan)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == id_list_state:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                result = entry[0]
+            else:
+                self._misses += 1
+                result = None
+            generation = self._generation
+        if result is None:
+            return None, (key, id_list_state, generation)
+        return _copy_result(result), None
+
+    def set(self, cache_key, result: _ConfigEvaluation):
+        if cache_key is None or result.rule_id == "error":
+            return
+        key, id_list_state, generation = cache_key
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (_copy_result(result), id_list_state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_plans = {}
+            self._generation += 1
+
+    def flush_metrics(self):
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+            self._hits = self._misses = self._evictions = 0
+            size = len(self._entries)
+        globals.logger.log_cache_stats("evaluation_cache", hits, misses, evictions, size)
+
+    def _check_spec_version(self, snapshot: SpecSnapshot) -> bool:
+        lcut = self._spec_store.snapshot().time
+        if lcut != self._lcut:
+            with self._lock:
+                if lcut != self._lcut:
+                    self._entries.clear()
+                    self._key_plans = {}
+                    self._generation += 1
+                    self._lcut = lcut
+        return snapshot.time == lcut
+
+    def _get_key_plan(self, entity_type: EntityType, name: str, snapshot: SpecSnapshot) -> Optional[_UserKeyPlan]:
+        """None when the entity can't be cached: it is unknown or reads the current time."""
+        key = (entity_type, name)
+        if key in self._key_plans:
+            return self._key_plans[key]
+        deps = snapshot.spec_dependencies.get(entity_type.value, {}).get(name)
+        plan = None
+        if deps is not None and not deps.uses_current_time:
+            plan = _UserKeyPlan(deps)
+        self._key_plans[key] = plan
+        return plan
+
+    def _id_list_state(self, plan: _UserKeyPlan):
+        return current_id_list_state(self._spec_store, plan.id_lists)
+
+
+def current_id_list_state(spec_store: _SpecStore, list_names: Tuple[str, ...]) -> tuple:
+    """A value that changes whenever one of the id lists is replaced or grows."""
+    if not list_names:
+        return ()
+    state: List[Optional[Tuple[int, Any, int]]] = []
+    for list_name in list_names:
+        id_list = spec_store.get_id_list(list_name)
+        if id_list is None:
+            state.append(None)
+        else:
+            state.append((id(id_list), id_list.get("readBytes"), len(id_list.get("ids", ()))))
+    return tuple(state)
+
+
+def _copy_result(result: _ConfigEvaluation) -> _ConfigEvaluation:
+    # callers set fields on returned results (e.g. the user), so never hand out the cached instance
+    copy = _ConfigEvaluation.__new__(_ConfigEvaluation)
+    copy.__dict__.update(result.__dict__)
+    copy.secondary_exposures = list(result.secondary_exposures)
+    copy.undelegated_secondary_exposures = list(result.undelegated_secondary_exposures)
+    return copy
@@ -1,4 +1,7 @@
-from typing import Optional
+from typing import Dict, Optional
+
+from .config_evaluation import _NestedGateEvaluation
+from .spec_snapshot import SpecSnapshot
 
 class EvaluationContext:
     """
@@ -9,7 +12,14 @@ class EvaluationContext:
     def __init__(self,
                  sampling_rate: Optional[float] = None,
                  client_key: Optional[str] = None,
-                 target_app_id: Optional[str] = None):
+                 target_app_id: Optional[str] = None,
+                 snapshot: Optional[SpecSnapshot] = None):
         self.sampling_rate = sampling_rate
         self.client_key = client_key
         self.target_app_id = target_app_id
+        # the config specs the evaluation reads, pinned by the first top level evaluation using the context
+        self.snapshot = snapshot
+        # nested gate evaluations for the current user, by gate name
+        self.nested_gate_evaluations: Dict[str, _NestedGateEvaluation] = {}
+        # bucketing hashes computed for the current user, by hash input
+        self.user_hashes: Dict[str, int] = {}
@@ -0,0 +1,421 @@
+import operator
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse  # type: ignore[attr-defined]  # Python 3.11+
+except ImportError:
+    import sre_constants  # pylint: disable=deprecated-module
+    import sre_parse  # pylint: disable=deprecated-module
+
+# Longest str_matches pattern accepted when StatsigOptions.guard_str_matches_patterns is set
+MAX_GUARDED_PATTERN_LENGTH = 1000
+
+
+def get_value_as_string(input):
+    if input is None:
+        return None
+    return str(input)
+
+
+def get_value_as_float(input):
+    if input is None:
+        return None
+    return float(input)
+
+
+def safe_parse_int(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _numeric_compare(value, target, compare):
+    val = get_value_as_float(value)
+    target = get_value_as_float(target)
+    if val is None or target is None:
+        return False
+    return compare(val, target)
+
+
+def _version_compare(v1, v2, compare):
+    p1 = v1.split(".")
+    p2 = v2.split(".")
+
+    i = 0
+    try:
+        while i < max(len(p1), len(p2)):
+            c1 = 0
+            c2 = 0
+            if i < len(p1):
+                c1 = int(float(p1[i]))
+            if i < len(p2):
+                c2 = int(float(p2[i]))
+            if c1 < c2:
+                return compare(-1)
+            if c1 > c2:
+                return compare(1)
+            i += 1
+    except ValueError:
+        return False
+
+    return compare(0)
+
+
+def parse_version_target(target):
+    """
+    Splits a version target into its numeric parts the way _version_compare reads them, with
+    None for a part that is not a number (comparing against it fails).
+    """
+    target_str = get_value_as_string(target)
+    if target_str is None:
+        return None
+    d = target_str.find('-')
+    if d > 0:
+        target_str = target_str[0:d]
+    parts: List[Optional[int]] = []
+    for part in target_str.split("."):
+        try:
+            parts.append(int(float(part)))
+        except ValueError:
+            parts.append(None)
+    return tuple(parts)
+
+
+def _version_part(part):
+    # int(float(part)) for the common all-digit case, without the float round trip; past 15
+    # digits the float loses precision, so those keep going through it
+    if len(part) < 16 and part.isdecimal():
+        return int(part)
+    return int(float(part))
+
+
+def _version_compare_parsed(value, target_parts, compare):
+    v1_str = get_value_as_string(value)
+    if v1_str is None or target_parts is None:
+        return False
+
+    d1 = v1_str.find('-')
+    if d1 > 0:
+        v1_str = v1_str[0:d1]
+    p1 = v1_str.split(".")
+    n1 = len(p1)
+    n2 = len(target_parts)
+
+    try:
+        for i in range(max(n1, n2)):
+            c1 = _version_part(p1[i]) if i < n1 else 0
+            c2 = 0
+            if i < n2:
+                c2 = target_parts[i]
+                if c2 is None:
+                    return False
+            if c1 < c2:
+                return compare(-1)
+            if c1 > c2:
+                return compare(1)
+    except ValueError:
+        return False
+
+    return compare(0)
+
+
+def _version_compare_helper(v1, v2, compare):
+    v1_str = get_value_as_string(v1)
+    v2_str = get_value_as_string(v2)
+
+    if v1_str is None or v2_str is None:
+        return False
+
+    d1 = v1_str.find('-')
+    if d1 > 0:
+        v1_str = v1_str[0:d1]
+
+    d2 = v2_str.find('-')
+    if d2 > 0:
+        v2_str = v2_str[0:d2]
+
+    return _version_compare(v1_str, v2_str, compare)
+
+
+def _match_string_in_array(value, target, compare):
+    str_value = get_value_as_string(value)
+    if str_value is None or target is None:
+        return False
+    for match in target:
+        str_match = get_value_as_string(match)
+        if str_match is None:
+            continue
+        if compare(str_value, str_match):
+            return True
+    return False
+
+
+def _find_string_in_array(value, condition, case_insensitive):
+    str_value = get_value_as_string(value)
+    target = condition.fast_target_value
+    if str_value is None or target is None:
+        return False
+    if case_insensitive:
+        return str_value.casefold() in target
+    return str_value in target
+
+
+def _lookup_user_bucket(val, lookup):
+    if isinstance(val, int):
+        return val in lookup
+    return False
+
+
+def _arrays_have_common_value(value, condition):
+    for target_val in condition.fast_target_value:
+        int_target_val = safe_parse_int(target_val)
+        if int_target_val and int_target_val in value:
+            return True
+        if target_val in value:
+            return True
+    return False
+
+
+def _arrays_have_all_values(value, condition):
+    for target_val in condition.fast_target_value:
+        int_target_val = safe_parse_int(target_val)
+        if int_target_val not in value and target_val not in value:
+            return False
+    return True
+
+
+def get_epoch_seconds(d):
+    epoch = int(d)
+    if len(str(d)) >= 11:
+        epoch //= 1000
+    return epoch
+
+
+def get_date(d):
+    if d is None:
+        return None
+
+    return datetime.fromtimestamp(get_epoch_seconds(d))
+
+
+def parse_date_target(target):
+    """The target as epoch seconds, raising for targets get_date can't convert."""
+    if target is None:
+        return None
+    epoch = get_epoch_seconds(target)
+    datetime.fromtimestamp(epoch)
+    return epoch
+
+
+def _compare_dates(first, second, compare):
+    if first is None and second is None:
+        return False
+
+    first_date = get_date(first)
+    second_date = get_date(second)
+    if first_date is None or second_date is None:
+        return False
+
+    return compare(first_date, second_date)
+
+
+def _compare_dates_parsed(value, target_date, compare):
+    value_date = get_date(value)
+    if value_date is None or target_date is None:
+        return False
+
+    return compare(value_date, target_date)
+
+
+def _numeric_compare_parsed(value, target, compare):
+    val = get_value_as_float(value)
+    if val is None or target is None:
+        return False
+    return compare(val, target)
+
+
+def _same_day(a, b):
+    return a.date() == b.date()
+
+
+def _starts_with(a, b):
+    return a.casefold().startswith(b.casefold())
+
+
+def _ends_with(a, b):
+    return a.casefold().endswith(b.casefold())
+
+
+def _contains(a, b):
+    return b.casefold() in a.casefold()
+
+
+def _str_matches(value, condition):
+    str_value = get_value_as_string(value)
+    str_target = get_value_as_string(condition.target)
+    if str_value is None or str_target is None:
+        return False
+    return bool(re.search(str_target, str_value))
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern: str):
+    """The compiled str_matches pattern, or None when it isn't a valid regex."""
+    try:
+        return re.compile(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return None
+
+
+def is_unsafe_pattern(pattern: str) -> bool:
+    """
+    Whether a str_matches pattern can backtrack catastrophically: an unbounded repeat nested in
+    another unbounded repeat (e.g. "(a+)+$"), a backreference, or a very long pattern.
+    """
+    if len(pattern) > MAX_GUARDED_PATTERN_LENGTH:
+        return True
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return True
+    return _has_nested_repeat(parsed, False)
+
+
+# the opcodes are generated when the module loads, so pylint can't see them
+# pylint: disable=no-member
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+_BACKREFERENCES = (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS)
+# pylint: enable=no-member
+
+
+def _has_nested_repeat(items, in_unbounded_repeat):
+    for op, av in items:
+        if op in _REPEATS:
+            _, max_count, sub_pattern = av
+            unbounded = max_count == sre_constants.MAXREPEAT
+            if unbounded and in_unbounded_repeat:
+                return True
+            if _has_nested_repeat(sub_pattern, in_unbounded_repeat or unbounded):
+                return True
+        elif op in _BACKREFERENCES:
+            return True
+        elif isinstance(av, (list, tuple)):
+            for child in av:
+                if isinstance(child, list) and all(isinstance(branch, sre_parse.SubPattern) for branch in child):
+                    children = child
+                else:
+                    children = [child]
+                for sub_pattern in children:
+                    if isinstance(sub_pattern, sre_parse.SubPattern) \
+                            and _has_nested_repeat(sub_pattern, in_unbounded_repeat):
+                        return True
+    return False
+
+
+def _match_string_with_matcher(value, condition):
+    str_value = get_value_as_string(value)
+    if str_value is None:
+        return False
+    return condition.string_matcher(str_value.casefold())
+
+
+def _str_matches_compiled(value, condition):
+    str_value = get_value_as_string(value)
+    if str_value is None:
+        return False
+    return condition.pattern.search(str_value) is not None
+
+
+def _array_operator(compare):
+    def evaluate(value, condition):
+        if not isinstance(value, list):
+            return False
+        return compare(value, condition)
+
+    return evaluate
+
+
+def unknown_operator(_value, _condition):
+    return False
+
+
+# Each operator takes the resolved user value and the compiled condition it belongs to.
+# in_segment_list / not_in_segment_list need the id lists held by the spec store and are
+# resolved by the evaluator instead.
+OPERATORS = {
+    "gt": lambda value, c: _numeric_compare(value, c.target, lambda a, b: a > b),
+    "gte": lambda value, c: _numeric_compare(value, c.target, lambda a, b: a >= b),
+    "lt": lambda value, c: _numeric_compare(value, c.target, lambda a, b: a < b),
+    "lte": lambda value, c: _numeric_compare(value, c.target, lambda a, b: a <= b),
+    "version_gt": lambda value, c: _version_compare_helper(value, c.target, lambda r: r > 0),
+    "version_gte": lambda value, c: _version_compare_helper(value, c.target, lambda r: r >= 0),
+    "version_lt": lambda value, c: _version_compare_helper(value, c.target, lambda r: r < 0),
+    "version_lte": lambda value, c: _version_compare_helper(value, c.target, lambda r: r <= 0),
+    "version_eq": lambda value, c: _version_compare_helper(value, c.target, lambda r: r == 0),
+    "version_neq": lambda value, c: _version_compare_helper(value, c.target, lambda r: r != 0),
+    "any": lambda value, c: _find_string_in_array(value, c, True),
+    "none": lambda value, c: not _find_string_in_array(value, c, True),
+    "any_case_sensitive": lambda value, c: _find_string_in_array(value, c, False),
+    "none_case_sensitive": lambda value, c: not _find_string_in_array(value, c, False),
+    "str_starts_with_any": lambda value, c: _match_string_in_array(value, c.target, _starts_with),
+    "str_ends_with_any": lambda value, c: _match_string_in_array(value, c.target, _ends_with),
+    "str_contains_any": lambda value, c: _match_string_in_array(value, c.target, _contains),
+    "str_contains_none": lambda value, c: not _match_string_in_array(value, c.target, _contains),
+    "str_matches": _str_matches,
+    "eq": lambda value, c: value == c.target,
+    "neq": lambda value, c: value != c.target,
+    "before": lambda value, c: _compare_dates(value, c.target, lambda a, b: a < b),
+    "after": lambda value, c: _compare_dates(value, c.target, lambda a, b: a > b),
+    "on": lambda value, c: _compare_dates(value, c.target, lambda a, b: a.date() == b.date()),
+    "array_contains_any": _array_operator(_arrays_have_common_value),
+    "array_contains_none": _array_operator(lambda value, c: not _arrays_have_common_value(value, c)),
+    "array_contains_all": _array_operator(_arrays_have_all_values),
+    "not_array_contains_all": _array_operator(lambda value, c: not _arrays_have_all_values(value, c)),
+}
+
+USER_BUCKET_OPERATORS = {
+    "any": lambda value, c: _lookup_user_bucket(value, c.user_bucket),
+    "none": lambda value, c: not _lookup_user_bucket(value, c.user_bucket),
+}
+
+# Variants of the numeric, version and date operators for conditions whose target was parsed
+# once per config sync (condition.parsed_target), see _SpecStore._parse_target_value_for_condition.
+# Date targets are kept as epoch seconds in the spec and turned into datetimes when compiled.
+NUMERIC_OPERATORS = ("gt", "gte", "lt", "lte")
+VERSION_OPERATORS = ("version_gt", "version_gte", "version_lt", "version_lte", "version_eq", "version_neq")
+DATE_OPERATORS = ("before", "after", "on")
+
+PARSED_TARGET_OPERATORS = {
+    "gt": lambda value, c: _numeric_compare_parsed(value, c.parsed_target, operator.gt),
+    "gte": lambda value, c: _numeric_compare_parsed(value, c.parsed_target, operator.ge),
+    "lt": lambda value, c: _numeric_compare_parsed(value, c.parsed_target, operator.lt),
+    "lte": lambda value, c: _numeric_compare_parsed(value, c.parsed_target, operator.le),
+    "version_gt": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r > 0),
+    "version_gte": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r >= 0),
+    "version_lt": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r < 0),
+    "version_lte": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r <= 0),
+    "version_eq": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r == 0),
+    "version_neq": lambda value, c: _version_compare_parsed(value, c.parsed_target, lambda r: r != 0),
+    "before": lambda value, c: _compare_dates_parsed(value, c.parsed_target, operator.lt),
+    "after": lambda value, c: _compare_dates_parsed(value, c.parsed_target, operator.gt),
+    "on": lambda value, c: _compare_dates_parsed(value, c.parsed_target, _same_day),
+}
+
+# str_matches for conditions whose pattern compiled (condition.pattern)
+COMPILED_PATTERN_OPERATORS = {
+    "str_matches": _str_matches_compiled,
+}
+
+# str_*_any operators for conditions with a matcher built from their targets (condition.string_matcher)
+STRING_MATCHER_OPERATORS = {
+    "str_starts_with_any": _match_string_with_matcher,
+    "str_ends_with_any": _match_string_with_matcher,
+    "str_contains_any": _match_string_with_matcher,
+    "str_contains_none": lambda value, c: not _match_string_with_matcher(value, c),
+}
+
+ID_LIST_OPERATORS = ("in_segment_list", "not_in_segment_list")
@@ -1,22 +1,44 @@
 import base64
-import re
 import time
-from datetime import datetime
 from hashlib import sha256
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
 
 from ip3country import CountryLookup
 
-from .client_initialize_formatter import ClientInitializeResponseFormatter
-from .config_evaluation import _ConfigEvaluation
+from .client_initialize import _ClientInitialize
+from .compiled_spec import GATE_CONDITION_TYPES, IP_FIELD, UNCHANGED_SAMPLING_RATE, USER_AGENT_FIELD, \
+    USER_BUCKET_COUNT, _AllocationTable, _CompiledCondition, _CompiledRule, _CompiledSpec, _ConstantOutcome, \
+    _IndexedRuleRun, _UserFieldAccessor
+from .config_evaluation import _ConfigEvaluation, _NestedGateEvaluation
+from .country_lookup import _CompactCountryLookup, get_compact_country_lookup
+from .evaluation_cache import _EvaluationCache, _copy_result
 from .evaluation_context import EvaluationContext
 from .evaluation_details import EvaluationDetails, EvaluationReason, DataSource
+from .evaluation_operators import safe_parse_int
 from .globals import logger
+from .lru_cache import _LRUCache
+from .spec_snapshot import SpecSnapshot
 from .spec_store import _SpecStore, EntityType
 from .statsig_user import StatsigUser
 from .utils import HashingAlgorithm, JSONValue, sha256_hash
 
 
+class _ParsedUserAgent(NamedTuple):
+    os_name: Optional[str]
+    os_version: Optional[str]
+    browser_name: Optional[str]
+    browser_version: Optional[str]
+
+
+_NOT_CACHED = object()
+
+
+class _ResolvedEntity(NamedTuple):
+    """A gate/config's spec, and whether a config mapping may redirect it, looked up once for a batch."""
+    spec: Optional[_CompiledSpec]
+    has_config_mapping: bool
+
+
 def load_ua_parser():
     try:
         from ua_parser import user_agent_parser  # pylint: disable=import-outside-toplevel
@@ -28,30 +50,83 @@ def load_ua_parser():
 
 class _Evaluator:
     def __init__(self, spec_store: _SpecStore, global_custom_fields: Optional[Dict[str, JSONValue]],
-                 disable_ua_parser: bool = False, disable_country_lookup: bool = False):
+                 disable_ua_parser: bool = False, disable_country_lookup: bool = False,
+                 short_circuit_rule_evaluation: bool = False, order_conditions_by_cost: bool = False,
+                 evaluation_cache_size: int = 0, ua_parse_cache_size: int = 0,
+                 compact_country_lookup: bool = False, country_lookup_cache_size: int = 0,
+                 client_initialize_cache_bytes: int = 0):
         self._spec_store = spec_store
         self._global_custom_fields = global_custom_fields
         self._disable_ua_parser = disable_ua_parser
         self._disable_country_lookup = disable_country_lookup
-
-        self._country_lookup: Optional[CountryLookup] = None
+        self._short_circuit_rule_evaluation = short_circuit_rule_evaluation
+        self._order_conditions_by_cost = short_circuit_rule_evaluation and order_conditions_by_cost
+
+        self._compact_country_lookup = compact_country_lookup
+        self._country_lookup: Optional[Union[CountryLookup, _CompactCountryLookup]] = None
+        self._country_lookup_cache: Optional[_LRUCache] = None
+        if country_lookup_cache_size > 0 and not disable_country_lookup:
+            self._country_lookup_cache = _LRUCache("country_lookup_cache", country_lookup_cache_size)
         self._ua_parser: Optional[Any] = None  # Will be the ua_parser.user_agent_parser module
+        self._ua_parse_cache: Optional[_LRUCache] = None
+        if ua_parse_cache_size > 0 and not disable_ua_parser:
+            self._ua_parse_cache = _LRUCache("ua_parse_cache", ua_parse_cache_size)
         self._gate_overrides: Dict[str, dict] = {}
         self._config_overrides: Dict[str, dict] = {}
         self._layer_overrides: Dict[str, dict] = {}
+        self._evaluation_cache: Optional[_EvaluationCache] = None
+        if evaluation_cache_size > 0:
+            self._evaluation_cache = _EvaluationCache(spec_store, evaluation_cache_size)
+        self.client_initialize = _ClientInitialize(spec_store, self, self.__eval_config, client_initialize_cache_bytes)
+
+        self.__condition_evaluators = {
+            "PUBLIC": self.__evaluate_public_condition,
+            "FAIL_GATE": self.__evaluate_gate_condition,
+            "PASS_GATE": self.__evaluate_gate_condition,
+            "MULTI_PASS_GATE": self.__evaluate_multi_gate_condition,
+            "MULTI_FAIL_GATE": self.__evaluate_multi_gate_condition,
+            "IP_BASED": self.__evaluate_ip_based_condition,
+            "UA_BASED": self.__evaluate_ua_based_condition,
+            "USER_FIELD": self.__evaluate_user_field_condition,
+            "CURRENT_TIME": self.__evaluate_current_time_condition,
+            "ENVIRONMENT_FIELD": self.__evaluate_environment_field_condition,
+            "USER_BUCKET": self.__evaluate_user_bucket_condition,
+            "UNIT_ID": self.__evaluate_unit_id_condition,
+            "TARGET_APP": self.__evaluate_target_app_condition,
+        }
+
+        # Conditions that still run after a rule has already failed when short-circuiting:
+        # nested gates record secondary exposures, and a disabled UA parser / country lookup
+        # marks the evaluation source.
+        always_evaluated = set(GATE_CONDITION_TYPES)
+        if disable_ua_parser:
+            always_evaluated.add("UA_BASED")
+        if disable_country_lookup:
+            always_evaluated.add("IP_BASED")
+        self.__always_evaluated_condition_types = frozenset(always_evaluated)
 
     def initialize(self):
         if not self._disable_country_lookup:
-            self._country_lookup = CountryLookup()
+            self._country_lookup = self.__load_country_lookup()
         if not self._disable_ua_parser:
             self._ua_parser = load_ua_parser()
 
+    def shutdown(self):
+        self.flush_cache_metrics()
+
+    def flush_cache_metrics(self):
+        for cache in (self._evaluation_cache, self._ua_parse_cache, self._country_lookup_cache):
+            if cache is not None:
+                cache.flush_metrics()
+        self.client_initialize.flush_metrics()
+
     def override_gate(self, gate, value, user_id=None):
         gate_overrides = self._gate_overrides.get(gate)
         if gate_overrides is None:
             gate_overrides = {}
         gate_overrides[user_id] = value
         self._gate_overrides[gate] = gate_overrides
+        self.__clear_evaluation_cache()
 
     def override_config(self, config, value, user_id=None):
         config_overrides = self._config_overrides.get(config)
@@ -59,6 +134,7 @@ class _Evaluator:
             config_overrides = {}
         config_overrides[user_id] = value
         self._config_overrides[config] = config_overrides
+        self.__clear_evaluation_cache()
 
     def override_layer(self, layer, value, user_id=None):
         layer_overrides = self._layer_overrides.get(layer)
@@ -66,6 +142,7 @@ class _Evaluator:
             layer_overrides = {}
         layer_overrides[user_id] = value
         self._layer_overrides[layer] = layer_overrides
+        self.__clear_evaluation_cache()
 
     def remove_gate_override(self, gate, user_id=None):
         gate_overrides = self._gate_overrides.get(gate)
@@ -74,6 +151,7 @@ class _Evaluator:
         if user_id in gate_overrides:
             del gate_overrides[user_id]
         self._gate_overrides[gate] = gate_overrides
+        self.__clear_evaluation_cache()
 
     def remove_config_override(self, config, user_id=None):
         config_overrides = self._config_overrides.get(config)
@@ -82,6 +160,7 @@ class _Evaluator:
         if user_id in config_overrides:
             del config_overrides[user_id]
         self._config_overrides[config] = config_overrides
+        self.__clear_evaluation_cache()
 
     def remove_layer_override(self, layer, user_id=None):
         layer_overrides = self._layer_overrides.get(layer)
@@ -90,11 +169,19 @@ class _Evaluator:
         if user_id in layer_overrides:
             del layer_overrides[user_id]
         self._layer_overrides[layer] = layer_overrides
+        self.__clear_evaluation_cache()
 
     def remove_all_overrides(self):
         self._gate_overrides = {}
         self._config_overrides = {}
         self._layer_overrides = {}
+        self.__clear_evaluation_cache()
+
+    def __clear_evaluation_cache(self):
+        # overrides apply to nested gates too, so cached results may no longer hold
+        if self._evaluation_cache is not None:
+            self._evaluation_cache.clear()
+        self.client_initialize.clear_cache()
 
     def clean_exposures(self, exposures):
         seen: Dict[str, bool] = {}
@@ -116,15 +203,7 @@ class _Evaluator:
             include_local_override=False,
             target_app_id: Optional[str] = None,
     ):
-        if not self._spec_store.is_ready_for_checks():
-            return None
-
-        if self._spec_store.last_update_time() == 0:
-            return None
-
-        return ClientInitializeResponseFormatter \
-            .get_formatted_response(self.__eval_config, user, self._spec_store, self, hash, client_sdk_key,
-                                    include_local_override, target_app_id)
+        return self.client_initialize.get_response(user, hash, client_sdk_key, include_local_override, target_app_id)
 
     def _create_evaluation_details(self,
                                    reason: EvaluationReason = EvaluationReason.none,
@@ -220,12 +299,13 @@ class _Evaluator:
     def __lookup_config_mapping(self, user: StatsigUser, config_name: str, spec_type: EntityType,
                                 end_result: _ConfigEvaluation,
                                 context: EvaluationContext,
-                                maybe_config: Union[Dict[str, Any], None] = None,) -> bool:
-        overrides = self._spec_store.get_overrides()
+                                maybe_config: Optional[_CompiledSpec] = None,) -> bool:
+        snapshot = self.__snapshot(context)
+        overrides = snapshot.overrides
         if overrides is None or not isinstance(overrides, dict):
             return False
 
-        override_rules = self._spec_store.get_override_rules()
+        override_rules = snapshot.compiled_override_rules
         if override_rules is None or not isinstance(override_rules, dict):
             return False
 
@@ -235,7 +315,7 @@ class _Evaluator:
 
         spec_salt = ""
         if maybe_config is not None:
-            spec_salt = maybe_config.get("salt", "")
+            spec_salt = maybe_config.salt
 
         for mapping in mapping_list:
             for override_rule in mapping.get("rules", []):
@@ -248,7 +328,7 @@ class _Evaluator:
                     continue
 
                 end_result.reset()
-                context.sampling_rate = rule.get("samplingRate", None)
+                context.sampling_rate = rule.sampling_rate
                 self.__evaluate_rule(user, rule, end_result, context)
                 if not end_result.boolean_value or end_result.evaluation_details.reason in (
                         EvaluationReason.unsupported, EvaluationReason.unrecognized):
@@ -256,9 +336,9 @@ class _Evaluator:
                     continue
                 end_result.reset()
                 override_config_name = mapping.get("new_config_name", None)
-                new_config = self.__get_config_by_entity_type(override_config_name, spec_type)
+                new_config = self.__get_config_by_entity_type(override_config_name, spec_type, snapshot)
 
-                config_pass = self.__eval_pass_percentage(user, rule, new_config, spec_salt)
+                config_pass = self.__eval_pass_percentage(user, rule, new_config, context, spec_salt)
                 if config_pass:
                     end_result.override_config_name = override_config_name
                     self.__evaluate(user, override_config_name, spec_type, end_result, context)
@@ -266,19 +346,35 @@ class _Evaluator:
                         return True
         return False
 
-    def __get_config_by_entity_type(self, entity_name: str, entity_type: EntityType):
+    def __snapshot(self, context: EvaluationContext) -> SpecSnapshot:
+        # pinned on first use, so everything evaluated with the context reads the same config specs
+        snapshot = context.snapshot
+        if snapshot is None:
+            snapshot = context.snapshot = self._spec_store.snapshot()
+        return snapshot
+
+    @staticmethod
+    def __has_config_mapping(config_name: str, snapshot: SpecSnapshot) -> bool:
+        overrides = snapshot.overrides
+        return isinstance(overrides, dict) and isinstance(overrides.get(config_name, None), list)
+
+    @staticmethod
+    def __get_config_by_entity_type(entity_name: str, entity_type: EntityType,
+                                    snapshot: SpecSnapshot) -> Optional[_CompiledSpec]:
         if entity_type == EntityType.GATE:
-            return self._spec_store.get_gate(entity_name)
+            return snapshot.compiled_gates.get(entity_name)
         if entity_type == EntityType.CONFIG:
-            return self._spec_store.get_config(entity_name)
+            return snapshot.compiled_configs.get(entity_name)
         if entity_type == EntityType.LAYER:
-            return self._spec_store.get_layer(entity_name)
+            return snapshot.compiled_layers.get(entity_name)
 
         return None
 
-    def unsupported_or_unrecognized(self, config_name, end_result):
+    def unsupported_or_unrecognized(self, config_name, end_result, snapshot: Optional[SpecSnapshot] = None):
         end_result.reset()
-        if config_name in self._spec_store.unsupported_configs:
+        if snapshot is None:
+            snapshot = self._spec_store.snapshot()
+        if config_name in snapshot.unsupported_configs:
             return self._create_evaluation_details(EvaluationReason.unsupported)
         return self._create_evaluation_details(EvaluationReason.unrecognized)
 
@@ -287,6 +383,9 @@ class _Evaluator:
         if override is not None:
             return override
 
+        if end_result is None and not is_nested:
+            return self.__eval_top_level(user, gate, EntityType.GATE, context)
+
         if end_result is None:
             end_result = _ConfigEvaluation()
         if context is None:
@@ -294,31 +393,139 @@ class _Evaluator:
         self.__eval_config(user, gate, EntityType.GATE, end_result, context, is_nested)
         return end_result
 
-    def get_config(self, user, config_name):
+    def get_config(self, user, config_name, context: Optional[EvaluationContext] = None):
         override = self.__lookup_config_override(user, config_name)
         if override is not None:
             return override
 
-        result = _ConfigEvaluation()
-        self.__eval_config(user, config_name, EntityType.CONFIG, result, EvaluationContext())
-        return result
+        return self.__eval_top_level(user, config_name, EntityType.CONFIG, context)
 
-    def get_layer(self, user, layer_name):
+    def get_layer(self, user, layer_name, context: Optional[EvaluationContext] = None):
         override = self.__lookup_layer_override(user, layer_name)
         if override is not None:
             return override
 
+        return self.__eval_top_level(user, layer_name, EntityType.LAYER, context)
+
+    def check_gate_batch(self, users: Iterable[StatsigUser], gate) -> List[_ConfigEvaluation]:
+        return self.__eval_batch(users, gate, EntityType.GATE, self.__lookup_gate_override,
+                                 gate in self._gate_overrides)
+
+    def get_config_batch(self, users: Iterable[StatsigUser], config_name) -> List[_ConfigEvaluation]:
+        return self.__eval_batch(users, config_name, EntityType.CONFIG, self.__lookup_config_override,
+                                 config_name in self._config_overrides)
+
+    def __eval_batch(self, users, name, entity_type: EntityType, lookup_override, has_overrides: bool):
+        # one spec/mapping lookup for every user, and all of them see the same snapshot even if a sync
+        # lands mid batch. The evaluation cache is skipped, a fan-out over mostly distinct users would
+        # only evict the entries live traffic hits.
+        snapshot = self._spec_store.snapshot()
+        resolved = _ResolvedEntity(self.__get_config_by_entity_type(name, entity_type, snapshot),
+                                   self.__has_config_mapping(name, snapshot))
+        results = []
+        for user in users:
+            if has_overrides:
+                override = lookup_override(user, name)
+                if override is not None:
+                    results.append(override)
+                    continue
+            result = _ConfigEvaluation()
+            self.__eval_config(user, name, entity_type, result, EvaluationContext(snapshot=snapshot),
+                               resolved=resolved)
+            results.append(result)
+        return results
+
+    def __eval_top_level(self, user, name, entity_type: EntityType, context: Optional[EvaluationContext]):
+        if context is None:
+            context = EvaluationContext()
+        snapshot = self.__snapshot(context)
+        spec = self.__get_config_by_entity_type(name, entity_type, snapshot)
+        if spec is not None and spec.constant is not None:
+            return self.__constant_result(spec, spec.constant.outcome_at(round(time.time() * 1000)), context)
+
+        cache_key = None
+        if self._evaluation_cache is not None and context.client_key is None and context.target_app_id is None:
+            # nested gate overrides match on any of the user's ids, so key on the whole user while there are any
+            cached, cache_key = self._evaluation_cache.get(entity_type, name, user, snapshot,
+                                                           bool(self._gate_overrides))
+            if cached is not None:
+                self.__refresh_evaluation_details(cached)
+                return cached
+
         result = _ConfigEvaluation()
-        self.__eval_config(user, layer_name, EntityType.LAYER, result, EvaluationContext())
+        self.__eval_config(user, name, entity_type, result, context, resolved=_ResolvedEntity(spec, True))
+
+        if cache_key is not None and self._evaluation_cache is not None:
+            self._evaluation_cache.set(cache_key, result)
+        return result
+
+    def __refresh_evaluation_details(self, result: _ConfigEvaluation):
+        # a cache hit is a new evaluation, it gets its own details and server time
+        details = result.evaluation_details
+        if details is None:
+            result.evaluation_details = self._create_evaluation_details()
+            return
+        source = details.source if details.source in (DataSource.UA_NOT_LOADED, DataSource.COUNTRY_NOT_LOADED) \
+            else None
+        result.evaluation_details = self._create_evaluation_details(details.reason, source)
+
+    def __constant_result(self, spec: _CompiledSpec, outcome: _ConstantOutcome, context: EvaluationContext):
+        # the same for every user, so finalize it once and hand out copies with fresh evaluation details
+        template = outcome.template
+        if template is None:
+            template = _ConfigEvaluation()
+            self.__apply_constant(spec, outcome, template, context, False)
+            outcome.template = template
+        result = _copy_result(template)
+        result.evaluation_details = self._create_evaluation_details()
         return result
 
-    def __eval_config(self, user, config_name, entity_type: EntityType, end_result, context: EvaluationContext, is_nested=False):
+    def __apply_constant(self, spec: _CompiledSpec, outcome: _ConstantOutcome, end_result,
+                         context: EvaluationContext, is_nested):
+        if outcome.sampling_rate is not UNCHANGED_SAMPLING_RATE:
+            context.sampling_rate = outcome.sampling_rate
+        if outcome.analytical_condition is not None:
+            end_result.analytical_condition = outcome.analytical_condition
+        self.__finalize_eval_result(spec, end_result, outcome.did_pass, outcome.rule, is_nested)
+
+    def eval_gate_with_nested_memo(self, user, gate, end_result, context: EvaluationContext):
+        """
+        Evaluates the gate into end_result as a top level check would, through the context's
+        nested gate memo, so a gate that other entities also reference is evaluated once per
+        context. The memo ignores local overrides, so gates with one are evaluated as usual.
+        """
+        if gate in self._gate_overrides:
+            self.__eval_config(user, gate, EntityType.GATE, end_result, context)
+            return
+        self.__check_nested_gate(user, gate, end_result, context)
+        self.__finalize_exposures(end_result)
+
+    def __check_nested_gate(self, user, gate, end_result, context: EvaluationContext):
+        override = self.__lookup_gate_override(user, gate)
+        if override is not None:
+            return override
+
+        nested = context.nested_gate_evaluations.get(gate)
+        if nested is None or not nested.matches(end_result):
+            nested = _NestedGateEvaluation(end_result, context)
+            try:
+                self.__eval_config(user, gate, EntityType.GATE, nested, context, True)
+            finally:
+                nested.finish_recording(context)
+            if not nested.is_error():
+                context.nested_gate_evaluations[gate] = nested
+
+        nested.apply(end_result, context)
+        return end_result
+
+    def __eval_config(self, user, config_name, entity_type: EntityType, end_result, context: EvaluationContext,
+                      is_nested=False, resolved: Optional[_ResolvedEntity] = None):
         try:
             if not entity_type:
                 logger.warning("invalid entity type in evaluation: %s", config_name)
                 end_result.rule_id = "error"
                 return
-            self.__evaluate(user, config_name, entity_type, end_result, context, is_nested)
+            self.__evaluate(user, config_name, entity_type, end_result, context, is_nested, resolved)
         except RecursionError:
             raise
         except Exception:
@@ -334,42 +541,113 @@ class _Evaluator:
             sha256(str(id).encode('utf-8')).digest()).decode('utf-8')[0:8]
         return hashed in ids
 
-    def __evaluate(self, user, config_name, entity_type, end_result, context: EvaluationContext, is_nested=False):
-        maybe_config_spec = self.__get_config_by_entity_type(config_name, entity_type)
+    def __evaluate(self, user, config_name, entity_type, end_result, context: EvaluationContext, is_nested=False,
+                   resolved: Optional[_ResolvedEntity] = None):
+        if resolved is None:
+            maybe_config_spec = self.__get_config_by_entity_type(config_name, entity_type, self.__snapshot(context))
+            has_config_mapping = True
+        else:
+            maybe_config_spec, has_config_mapping = resolved
+
+        if maybe_config_spec is not None and maybe_config_spec.constant is not None:
+            outcome = maybe_config_spec.constant.outcome_at(round(time.time() * 1000))
+            self.__apply_constant(maybe_config_spec, outcome, end_result, context, is_nested)
+            return
 
-        override_config = self.__lookup_config_mapping(user, config_name, entity_type, end_result, context, maybe_config_spec)
-        if override_config:
+        if has_config_mapping and self.__lookup_config_mapping(user, config_name, entity_type, end_result, context,
+                                                               maybe_config_spec):
             return
 
         if maybe_config_spec is None:
-            end_result.evaluation_details = self.unsupported_or_unrecognized(config_name, end_result)
+            end_result.evaluation_details = self.unsupported_or_unrecognized(config_name, end_result,
+                                                                             self.__snapshot(context))
             return
 
-        if not maybe_config_spec.get("enabled", False):
+        if not maybe_config_spec.enabled:
             self.__finalize_eval_result(maybe_config_spec, end_result, False, None, is_nested)
             return
 
-        for rule in maybe_config_spec.get("rules", []):
-            context.sampling_rate = rule.get("samplingRate", None)
+        if maybe_config_spec.allocation is not None:
+            rule = self.__allocate(user, maybe_config_spec.allocation, end_result, context)
+            if rule is not None:
+                self.__finalize_matched_rule(user, maybe_config_spec, rule, end_result, context, is_nested)
+                return
+            self.__finalize_eval_result(maybe_config_spec, end_result, False, None, is_nested)
+            return
+
+        for rule in maybe_config_spec.rule_index or maybe_config_spec.rules:
+            if rule.__class__ is _IndexedRuleRun:
+                rule = self.__find_indexed_rule(user, rule, end_result, context)
+                if rule is None:
+                    continue
+            context.sampling_rate = rule.sampling_rate
             self.__evaluate_rule(user, rule, end_result, context)
             if end_result.boolean_value:
-                if self.__evaluate_delegate(user, rule, end_result, context) is not None:
-                    self.__finalize_exposures(end_result)
-                    return
-
-                user_passes = self.__eval_pass_percentage(user, rule, maybe_config_spec)
-                self.__finalize_eval_result(maybe_config_spec, end_result, user_passes, rule, is_nested)
+                self.__finalize_matched_rule(user, maybe_config_spec, rule, end_result, context, is_nested)
                 return
 
         self.__finalize_eval_result(maybe_config_spec, end_result, False, None, is_nested)
 
-    def __finalize_eval_result(self, config, end_result, did_pass, rule, is_nested=False):
+    def __find_indexed_rule(self, user, run: _IndexedRuleRun, end_result, context: EvaluationContext):
+        """
+        The first rule of the run whose condition matches the user, or None after leaving
+        end_result and context as checking every rule of the run without a match would.
+        """
+        first = None
+        for lookup in run.lookups:
+            condition = lookup.condition
+            if condition.condition_type == "UNIT_ID":
+                value = self.__get_unit_id(user, condition.id_type, condition.id_type_lower)
+            else:
+                value = self.__get_from_user(user, condition.field)
+            if value is None:
+                continue
+            value = str(value)
+            position = lookup.positions.get(value.casefold() if lookup.casefold else value)
+            if position is not None and (first is None or position < first):
+                first = position
+        if first is not None:
+            return run.rules[first]
+
+        context.sampling_rate = run.last_rule.sampling_rate
+        end_result.analytical_condition = context.sampling_rate is None
+        end_result.boolean_value = False
+        return None
+
+    def __finalize_matched_rule(self, user, config: _CompiledSpec, rule: _CompiledRule, end_result,
+                                context: EvaluationContext, is_nested):
+        if self.__evaluate_delegate(user, rule, end_result, context) is not None:
+            self.__finalize_exposures(end_result)
+            return
+
+        user_passes = self.__eval_pass_percentage(user, rule, config, context)
+        self.__finalize_eval_result(config, end_result, user_passes, rule, is_nested)
+
+    def __allocate(self, user, allocation: _AllocationTable, end_result, context: EvaluationContext):
+        """
+        Picks the rule from the spec's allocation table, leaving end_result and context as walking
+        the rules would: only user_bucket and public conditions ran, the last of them in the
+        matched rule, or in the last rule when none matched.
+        """
+        if allocation.bucket_salt is None:
+            rule = allocation.rules[0]
+        else:
+            unit_id = self.__get_unit_id(user, allocation.id_type, allocation.id_type_lower) or ""
+            rule = allocation.rules[self.__compute_user_hash(allocation.bucket_salt + unit_id, context)
+                                    % USER_BUCKET_COUNT]
+        context.sampling_rate = (rule or allocation.last_rule).sampling_rate
+        end_result.analytical_condition = context.sampling_rate is None
+        end_result.boolean_value = rule is not None
+        return rule
+
+    def __finalize_eval_result(self, config: _CompiledSpec, end_result, did_pass, rule: Optional[_CompiledRule],
+                               is_nested=False):
         end_result.boolean_value = did_pass
-        end_result.id_type = config.get("idType", "")
-        if config.get("forwardAllExposures", False):
+        end_result.id_type = config.id_type
+        if config.forward_all_exposures:
             end_result.forward_all_exposures = True
-        if config.get("version", None) is not None:
-            end_result.version = config.get("version")
+        if config.version is not None:
+            end_result.version = config.version
 
         if end_result.evaluation_details is not None and end_result.evaluation_details.source not in (
         DataSource.UA_NOT_LOADED, DataSource.COUNTRY_NOT_LOADED):
@@ -378,16 +656,16 @@ class _Evaluator:
         self._update_evaluation_details_if_needed(end_result)
 
         if rule is None:
-            end_result.json_value = config.get("defaultValue", {})
+            end_result.json_value = config.default_value
             end_result.group_name = None
             end_result.is_experiment_group = False
-            end_result.rule_id = "default" if config.get("enabled") else "disabled"
+            end_result.rule_id = "default" if config.enabled else "disabled"
         else:
-            end_result.json_value = rule.get("returnValue") if did_pass else config.get("defaultValue", {})
-            end_result.group_name = rule.get("groupName", None)
-            end_result.is_experiment_group = rule.get("isExperimentGroup", False)
-            end_result.rule_id = rule.get("id", "")
-            end_result.sample_rate = rule.get("samplingRate", None)
+            end_result.json_value = rule.return_value if did_pass else config.default_value
+            end_result.group_name = rule.group_name
+            end_result.is_experiment_group = rule.is_experiment_group
+            end_result.rule_id = rule.id
+            end_result.sample_rate = rule.sampling_rate
 
         if not is_nested:
             self.__finalize_exposures(end_result)
@@ -396,444 +674,303 @@ class _Evaluator:
         end_result.secondary_exposures = self.clean_exposures(end_result.secondary_exposures)
         end_result.undelegated_secondary_exposures = self.clean_exposures(end_result.undelegated_secondary_exposures)
 
-    def __evaluate_rule(self, user, rule, end_result, context: EvaluationContext):
+    def __evaluate_rule(self, user, rule: _CompiledRule, end_result, context: EvaluationContext):
         total_eval_result = True
-        for condition in rule.get("conditions", []):
-            eval_result = self.__evaluate_condition(user, condition, end_result, context)
+        conditions = rule.cost_ordered_conditions if self._order_conditions_by_cost else rule.conditions
+        for condition in conditions:
+            if not total_eval_result and self._short_circuit_rule_evaluation \
+                    and condition.condition_type not in self.__always_evaluated_condition_types:
+                continue
+            eval_result = self.__condition_evaluators.get(
+                condition.condition_type, self.__evaluate_value_condition)(user, condition, end_result, context)
             if not eval_result:
                 total_eval_result = False
         end_result.boolean_value = total_eval_result
 
-    def __evaluate_delegate(self, user, rule, end_result, context: EvaluationContext):
-        config_delegate = rule.get("configDelegate", None)
+    def __evaluate_delegate(self, user, rule: _CompiledRule, end_result, context: EvaluationContext):
+        config_delegate = rule.config_delegate
         if config_delegate is None:
             return None
 
-        config = self._spec_store.get_config(config_delegate)
+        config = self.__snapshot(context).compiled_configs.get(config_delegate)
         if config is None:
             return None
 
         end_result.undelegated_secondary_exposures = end_result.secondary_exposures[:]
 
         self.__evaluate(user, config_delegate, EntityType.CONFIG, end_result, context, True)
-        end_result.explicit_parameters = config.get(
-            "explicitParameters", [])
+        end_result.explicit_parameters = config.explicit_parameters
         end_result.allocated_experiment = config_delegate
         return end_result
 
-    def __evaluate_condition(self, user, condition, end_result, context: EvaluationContext):
-        value = None
-        type = condition.get("type", "").upper()
-        target = condition.get("targetValue")
-        field = condition.get("field", "")
-        id_Type = condition.get("idType", "userID")
-        if type == "PUBLIC":
+    def __evaluate_public_condition(self, _user, _condition: _CompiledCondition, end_result,
+                                    context: EvaluationContext):
+        end_result.analytical_condition = context.sampling_rate is None
+        return True
+
+    def __evaluate_gate_condition(self, user, condition: _CompiledCondition, end_result, context: EvaluationContext):
+        target = condition.target
+        delegated_gate = self.__check_nested_gate(user, target, end_result, context)
+
+        new_exposure = {
+            "gate": target,
+            "gateValue": "true" if delegated_gate.boolean_value else "false",
+            "ruleID": delegated_gate.rule_id
+        }
+
+        end_result.secondary_exposures.append(new_exposure)
+        if end_result.analytical_condition and isinstance(target, str) and not target.startswith("segment:"):
+            end_result.seen_analytical_gates = True
+
+        if condition.condition_type == "PASS_GATE":
+            pass_gate = delegated_gate.boolean_value
+        else:
+            pass_gate = not delegated_gate.boolean_value
+
+        end_result.analytical_condition = context.sampling_rate is None
+        return pass_gate
+
+    def __evaluate_multi_gate_condition(self, user, condition: _CompiledCondition, end_result,
+                                        context: EvaluationContext):
+        target = condition.target
+        if target is None or len(target) == 0:
             end_result.analytical_condition = context.sampling_rate is None
-            return True
-        if type in ("FAIL_GATE", "PASS_GATE"):
-            delegated_gate = self.check_gate(user, target, end_result, True, context)
+            return False
+        is_multi_pass = condition.condition_type == "MULTI_PASS_GATE"
+        pass_gate = False
+        for gate in target:
+            other_result = self.__check_nested_gate(user, gate, _ConfigEvaluation(), context)
 
             new_exposure = {
-                "gate": target,
-                "gateValue": "true" if delegated_gate.boolean_value else "false",
-                "ruleID": delegated_gate.rule_id
+                "gate": gate,
+                "gateValue": "true" if other_result.boolean_value else "false",
+                "ruleID": other_result.rule_id
             }
-
             end_result.secondary_exposures.append(new_exposure)
             if end_result.analytical_condition and isinstance(target, str) and not target.startswith("segment:"):
                 end_result.seen_analytical_gates = True
 
-            pass_gate = delegated_gate.boolean_value if type == "PASS_GATE" else not delegated_gate.boolean_value
-
-            end_result.analytical_condition = context.sampling_rate is None
-            return pass_gate
-        if type in ("MULTI_PASS_GATE", "MULTI_FAIL_GATE"):
-            if target is None or len(target) == 0:
-                end_result.analytical_condition = context.sampling_rate is None
-                return False
-            pass_gate = False
-            for gate in target:
-                other_result = self.check_gate(user, gate, context=context)
-
-                new_exposure = {
-                    "gate": gate,
-                    "gateValue": "true" if other_result.boolean_value else "false",
-                    "ruleID": other_result.rule_id
-                }
-                end_result.secondary_exposures.append(new_exposure)
-                if end_result.analytical_condition and isinstance(target, str) and not target.startswith("segment:"):
-                    end_result.seen_analytical_gates = True
-
-                pass_gate = pass_gate or other_result.boolean_value if type == "MULTI_PASS_GATE" else pass_gate or not other_result.boolean_value
-                if pass_gate:
-                    break
+            pass_gate = pass_gate or other_result.boolean_value if is_multi_pass \
+                else pass_gate or not other_result.boolean_value
+            if pass_gate:
+                break
 
+        end_result.analytical_condition = context.sampling_rate is None
+        return pass_gate
+
+    def __evaluate_ip_based_condition(self, user, condition: _CompiledCondition, end_result,
+                                      context: EvaluationContext):
+        value = self.__get_from_user(user, condition.field)
+        if value is None:
+            ip = self.__get_from_user(user, IP_FIELD)
+            if ip is not None and condition.field.field == "country":
+                if self._disable_country_lookup:
+                    logger.warning("Country lookup is disabled but was attempted during evaluation")
+                    end_result.evaluation_details = self._create_evaluation_details(
+                        EvaluationReason.none, DataSource.COUNTRY_NOT_LOADED)
+                    value = None
+                else:
+                    value = self.__lookup_country(ip)
+        if value is None:
             end_result.analytical_condition = context.sampling_rate is None
-            return pass_gate
-        if type == "IP_BASED":
-            value = self.__get_from_user(user, field)
-            if value is None:
-                ip = self.__get_from_user(user, "ip")
-                if ip is not None and field == "country":
-                    if self._disable_country_lookup:
-                        logger.warning("Country lookup is disabled but was attempted during evaluation")
-                        end_result.evaluation_details = self._create_evaluation_details(
-                            EvaluationReason.none, DataSource.COUNTRY_NOT_LOADED)
-                        value = None
-                    else:
-                        if not self._country_lookup:
-                            self._country_lookup = CountryLookup()
-                        value = self._country_lookup.lookupStr(ip)
-            if value is None:
-                end_result.analytical_condition = context.sampling_rate is None
-                return False
-        elif type == "UA_BASED":
-            value = self.__get_from_user(user, field)
-            if value is None:
-                value = self.__get_from_user_agent(user, field, end_result)
-        elif type == "USER_FIELD":
-            value = self.__get_from_user(user, field)
-        elif type == "CURRENT_TIME":
-            value = round(time.time() * 1000)
-        elif type == "ENVIRONMENT_FIELD":
-            value = self.__get_from_environment(user, field)
-        elif type == "USER_BUCKET":
-            salt = condition.get("additionalValues", {
-                "salt": None}).get("salt")
-            salt_str = self.__get_value_as_string(salt) or ""
-            unit_id = self.__get_unit_id(user, id_Type) or ""
-            value = int(self.__compute_user_hash(
-                salt_str + "." + unit_id) % 1000)
-        elif type == "UNIT_ID":
-            value = self.__get_unit_id(user, id_Type)
-        elif type == "TARGET_APP":
-            if context.client_key is not None:
-                value = context.target_app_id
+            return False
+        return self.__compare(value, condition, end_result, context)
+
+    def __load_country_lookup(self) -> Union[CountryLookup, _CompactCountryLookup]:
+        if self._compact_country_lookup:
+            return get_compact_country_lookup()
+        return CountryLookup()
+
+    def __lookup_country(self, ip) -> Optional[str]:
+        cache = self._country_lookup_cache
+        if cache is not None:
+            try:
+                cached = cache.get(ip, _NOT_CACHED)
+            except TypeError:  # unhashable ip from a custom field
+                cache = None
             else:
-                value = self._spec_store.get_app_id()
-
-        end_result.analytical_condition = context.sampling_rate is None
+                if cached is not _NOT_CACHED:
+                    return cached
+
+        if not self._country_lookup:
+            self._country_lookup = self.__load_country_lookup()
+        country = self._country_lookup.lookupStr(ip)
+        if cache is not None:
+            cache.set(ip, country)
+        return country
+
+    def __evaluate_ua_based_condition(self, user, condition: _CompiledCondition, end_result,
+                                      context: EvaluationContext):
+        value = self.__get_from_user(user, condition.field)
+        if value is None:
+            value = self.__get_from_user_agent(user, condition.field, end_result)
+        return self.__compare(value, condition, end_result, context)
+
+    def __evaluate_user_field_condition(self, user, condition: _CompiledCondition, end_result,
+                                        context: EvaluationContext):
+        return self.__compare(self.__get_from_user(user, condition.field), condition, end_result, context)
+
+    def __evaluate_current_time_condition(self, _user, condition: _CompiledCondition, end_result,
+                                          context: EvaluationContext):
+        return self.__compare(round(time.time() * 1000), condition, end_result, context)
+
+    def __evaluate_environment_field_condition(self, user, condition: _CompiledCondition, end_result,
+                                               context: EvaluationContext):
+        return self.__compare(self.__get_from_environment(user, condition.field), condition, end_result, context)
+
+    def __evaluate_user_bucket_condition(self, user, condition: _CompiledCondition, end_result,
+                                         context: EvaluationContext):
+        unit_id = self.__get_unit_id(user, condition.id_type, condition.id_type_lower) or ""
+        value = int(self.__compute_user_hash(condition.bucket_salt + unit_id, context) % 1000)
+        return self.__compare(value, condition, end_result, context)
+
+    def __evaluate_unit_id_condition(self, user, condition: _CompiledCondition, end_result,
+                                     context: EvaluationContext):
+        value = self.__get_unit_id(user, condition.id_type, condition.id_type_lower)
+        return self.__compare(value, condition, end_result, context)
+
+    def __evaluate_target_app_condition(self, _user, condition: _CompiledCondition, end_result,
+                                        context: EvaluationContext):
+        if context.client_key is not None:
+            value = context.target_app_id
+        else:
+            value = self.__snapshot(context).app_id
+        return self.__compare(value, condition, end_result, context)
 
-        op = condition.get("operator")
-        user_bucket = condition.get("user_bucket")
-        if op == "gt":
-            val = self.__get_value_as_float(value)
-            target = self.__get_value_as_float(target)
-            if val is None or target is None:
-                return False
-            return val > target
-        if op == "gte":
-            val = self.__get_value_as_float(value)
-            target = self.__get_value_as_float(target)
-            if val is None or target is None:
-                return False
-            return val >= target
-        if op == "lt":
-            val = self.__get_value_as_float(value)
-            target = self.__get_value_as_float(target)
-            if val is None or target is None:
-                return False
-            return val < target
-        if op == "lte":
-            val = self.__get_value_as_float(value)
-            target = self.__get_value_as_float(target)
-            if val is None or target is None:
-                return False
-            return val <= target
-        if op == "version_gt":
-            return self.__version_compare_helper(
-                value, target, lambda result: result > 0)
-        if op == "version_gte":
-            return self.__version_compare_helper(
-                value, target, lambda result: result >= 0)
-        if op == "version_lt":
-            return self.__version_compare_helper(
-                value, target, lambda result: result < 0)
-        if op == "version_lte":
-            return self.__version_compare_helper(
-                value, target, lambda result: result <= 0)
-        if op == "version_eq":
-            return self.__version_compare_helper(
-                value, target, lambda result: result == 0)
-        if op == "version_neq":
-            return self.__version_compare_helper(
-                value, target, lambda result: result != 0)
-        if op == "any":
-            if user_bucket is not None:
-                return self.__lookup_user_bucket(value, user_bucket)
-            return self.__find_string_in_array(
-                value, condition)
-        if op == "none":
-            if user_bucket is not None:
-                return not self.__lookup_user_bucket(value, user_bucket)
-            return not self.__find_string_in_array(
-                value, condition)
-        if op == "any_case_sensitive":
-            return self.__find_string_in_array(
-                value, condition)
-        if op == "none_case_sensitive":
-            return not self.__find_string_in_array(
-                value, condition)
-        if op == "str_starts_with_any":
-            return self.__match_string_in_array(
-                value, target, lambda a, b: a.casefold().startswith(
-                    b.casefold()))
-        if op == "str_ends_with_any":
-            return self.__match_string_in_array(
-                value, target, lambda a, b: a.casefold().endswith(
-                    b.casefold()))
-        if op == "str_contains_any":
-            return self.__match_string_in_array(
-                value, target, lambda a, b: b.casefold() in a.casefold())
-        if op == "str_contains_none":
-            return not self.__match_string_in_array(
-                value, target, lambda a, b: b.casefold() in a.casefold())
-        if op == "str_matches":
-            str_value = self.__get_value_as_string(value)
-            str_target = self.__get_value_as_string(target)
-            if str_value is None or str_target is None:
-                return False
-            return bool(
-                re.search(str_target, str_value))
-        if op == "eq":
-            return value == target
-        if op == "neq":
-            return value != target
-        if op == "before":
-            return self.__compare_dates(value, target, lambda a, b: a < b)
-        if op == "after":
-            return self.__compare_dates(value, target, lambda a, b: a > b)
-        if op == "on":
-            return self.__compare_dates(
-                value, target, lambda a, b: a.date() == b.date())
-        if op in ("in_segment_list", "not_in_segment_list"):
-            in_list = self.__check_id_in_list(value, target)
-            return in_list if op == "in_segment_list" else not in_list
-        if op == "array_contains_any":
-            if not isinstance(value, list):
-                return False
-            return self.__arrays_have_common_value(value, condition)
-        if op == "array_contains_none":
-            if not isinstance(value, list):
-                return False
-            return not self.__arrays_have_common_value(value, condition)
-        if op == "array_contains_all":
-            if not isinstance(value, list):
-                return False
-            return self.__arrays_have_all_values(value, condition)
-        if op == "not_array_contains_all":
-            if not isinstance(value, list):
-                return False
-            return not self.__arrays_have_all_values(value, condition)
+    def __evaluate_value_condition(self, _user, condition: _CompiledCondition, end_result,
+                                   context: EvaluationContext):
+        return self.__compare(None, condition, end_result, context)
 
-        return False
+    def __compare(self, value, condition: _CompiledCondition, end_result, context: EvaluationContext):
+        end_result.analytical_condition = context.sampling_rate is None
+        if condition.is_id_list_operator:
+            in_list = self.__check_id_in_list(value, condition.target)
+            return in_list if condition.operator == "in_segment_list" else not in_list
+        return condition.compare(value, condition)
 
-    def __get_from_user(self, user, field):
+    def __get_from_user(self, user, field: _UserFieldAccessor):
         value = None
-        lower_field = field.lower()
-        if lower_field in ("userid", "user_id"):
-            value = user.user_id
-        elif lower_field == "email":
-            value = user.email
-        elif lower_field in ("ip", "ipaddress", "ip_address"):
-            value = user.ip
-        elif lower_field in ("useragent", "user_agent"):
-            value = user.user_agent
-        elif lower_field == "country":
-            value = user.country
-        elif lower_field == "locale":
-            value = user.locale
-        elif lower_field in ("appversion", "app_version"):
-            value = user.app_version
+        if field.user_attribute is not None:
+            value = getattr(user, field.user_attribute)
 
         if (value is None or value == "") and user.custom is not None:
-            if field in user.custom:
-                value = user.custom[field]
-            elif field.casefold() in user.custom:
-                value = user.custom[field.casefold()]
+            if field.field in user.custom:
+                value = user.custom[field.field]
+            elif field.field_casefold in user.custom:
+                value = user.custom[field.field_casefold]
 
         if (value is None or value == "") and self._global_custom_fields is not None:
-            if field in self._global_custom_fields:
-                value = self._global_custom_fields[field]
-            elif field.casefold() in self._global_custom_fields:
-                value = self._global_custom_fields[field.casefold()]
+            if field.field in self._global_custom_fields:
+                value = self._global_custom_fields[field.field]
+            elif field.field_casefold in self._global_custom_fields:
+                value = self._global_custom_fields[field.field_casefold]
 
         if (value is None or value == "") and user.private_attributes is not None:
-            if field in user.private_attributes:
-                value = user.private_attributes[field]
-            elif field.lower() in user.private_attributes:
-                value = user.private_attributes[field.lower()]
+            if field.field in user.private_attributes:
+                value = user.private_attributes[field.field]
+            elif field.field_lower in user.private_attributes:
+                value = user.private_attributes[field.field_lower]
 
         return value
 
-    def __get_from_environment(self, user, field):
+    def __get_from_environment(self, user, field: _UserFieldAccessor):
         if user._statsig_environment is None:
             return None
-        if field in user._statsig_environment:
-            return user._statsig_environment[field]
-        if field.lower() in user._statsig_environment:
-            return user._statsig_environment[field]
+        if field.field in user._statsig_environment:
+            return user._statsig_environment[field.field]
+        if field.field_lower in user._statsig_environment:
+            return user._statsig_environment[field.field_lower]
         return None
 
-    def __compute_user_hash(self, input):
-        return sha256_hash(input)
+    def __compute_user_hash(self, input, context: EvaluationContext):
+        # a targeting ladder or holdout can hash the same unit id with the same salt for several rules
+        hash = context.user_hashes.get(input)
+        if hash is None:
+            hash = context.user_hashes[input] = sha256_hash(input)
+        return hash
 
-    def __eval_pass_percentage(self, user, rule, config, salt: Optional[str] = None):
-        if rule.get("passPercentage", 0) == 100.0:
+    def __eval_pass_percentage(self, user, rule: _CompiledRule, config: Optional[_CompiledSpec],
+                               context: EvaluationContext, salt: Optional[str] = None):
+        if rule.pass_percentage == 100.0:
             return True
-        if rule.get("passPercentage", 0) == 0.0:
+        if rule.pass_percentage == 0.0:
             return False
-        rule_salt = rule.get("salt", rule.get("id", ""))
-        id = self.__get_unit_id(user, rule.get("idType", "userID")) or ""
-        config_salt = salt if salt is not None else config.get("salt", "")
+        id = self.__get_unit_id(user, rule.id_type, rule.id_type_lower) or ""
+        config_salt = salt if salt is not None else (config.salt if config is not None else "")
         hash = self.__compute_user_hash(
-            config_salt + "." + rule_salt + "." + str(id)
+            config_salt + "." + rule.salt + "." + str(id), context
         )
-        pass_percentage = rule.get("passPercentage", 0)
-        return (hash % 10000) < pass_percentage * 100
+        return (hash % 10000) < rule.pass_percentage * 100
 
-    def __get_unit_id(self, user, id_type):
-        if id_type is not None and id_type.lower() != "userid":
+    def __get_unit_id(self, user, id_type, id_type_lower):
+        if id_type_lower is not None:
             if user.custom_ids is None:
                 return None
             custom_id = user.custom_ids.get(
                 id_type, None)
             if custom_id is not None:
                 return custom_id
-            return user.custom_ids.get(id_type.lower(), None)
+            return user.custom_ids.get(id_type_lower, None)
         return user.user_id
 
-    def __match_string_in_array(self, value, target, compare):
-        str_value = self.__get_value_as_string(value)
-        if str_value is None or target is None:
-            return False
-        for match in target:
-            str_match = self.__get_value_as_string(match)
-            if str_match is None:
-                continue
-            if compare(str_value, str_match):
-                return True
-        return False
-
-    def __find_string_in_array(self, value, condition):
-        str_value = self.__get_value_as_string(value)
-        target = condition.get("fast_target_value")
-        op = condition.get("operator")
-        if str_value is None or target is None:
-            return False
-        if op in ('any', 'none'):
-            return str_value.casefold() in target
-        return str_value in target
-
-    def __arrays_have_common_value(self, value, condition):
-        fast_target = condition.get("fast_target_value")
-        for target_val in fast_target:
-            int_target_val = self.safe_parse_int(target_val)
-            if int_target_val and int_target_val in value:
-                return True
-            if target_val in value:
-                return True
-        return False
-
-    def __arrays_have_all_values(self, value, condition):
-        fast_target = condition.get("fast_target_value")
-        for target_val in fast_target:
-            int_target_val = self.safe_parse_int(target_val)
-            if int_target_val not in value and target_val not in value:
-                return False
-        return True
-
     def safe_parse_int(self, value):
-        try:
-            return int(value)
-        except (ValueError, TypeError):
-            return None
-
-    def __lookup_user_bucket(self, val, lookup):
-        if isinstance(val, int):
-            return val in lookup
-        return False
-
-    def __version_compare(self, v1, v2, compare):
-        p1 = v1.split(".")
-        p2 = v2.split(".")
-
-        i = 0
-        try:
-            while i < max(len(p1), len(p2)):
-                c1 = 0
-                c2 = 0
-                if i < len(p1):
-                    c1 = int(float(p1[i]))
-                if i < len(p2):
-                    c2 = int(float(p2[i]))
-                if c1 < c2:
-                    return compare(-1)
-                if c1 > c2:
-                    return compare(1)
-                i += 1
-        except ValueError:
-            return False
-
-        return compare(0)
-
-    def __version_compare_helper(self, v1, v2, compare):
-        v1_str = self.__get_value_as_string(v1)
-        v2_str = self.__get_value_as_string(v2)
+        return safe_parse_int(value)
 
-        if v1_str is None or v2_str is None:
-            return False
-
-        d1 = v1_str.find('-')
-        if d1 > 0:
-            v1_str = v1_str[0:d1]
-
-        d2 = v2_str.find('-')
-        if d2 > 0:
-            v2_str = v2_str[0:d2]
-
-        return self.__version_compare(v1_str, v2_str, compare)
-
-    def __get_value_as_string(self, input):
-        if input is None:
-            return None
-        return str(input)
-
-    def __get_value_as_float(self, input):
-        if input is None:
-            return None
-        return float(input)
-
-    def __get_from_user_agent(self, user, field, end_result):
+    def __get_from_user_agent(self, user, field: _UserFieldAccessor, end_result):
         if self._disable_ua_parser:
             logger.warning("UA parser is disabled but was attempted during evaluation")
             end_result.evaluation_details = self._create_evaluation_details(EvaluationReason.none,
                                                                             DataSource.UA_NOT_LOADED)
             return None
-        ua = self.__get_from_user(user, "userAgent")
+        ua = self.__get_from_user(user, USER_AGENT_FIELD)
         if ua is None:
             return None
 
+        parsed = self.__parse_user_agent(ua)
+        if parsed is None:
+            return None
+
+        field = field.field_lower
+        if field in ("osname", "os_name"):
+            return parsed.os_name
+        if field in ("os_version", "osversion"):
+            return parsed.os_version
+        if field in ("browser_name", "browsername"):
+            return parsed.browser_name
+        if field in ("browser_version", "browserversion"):
+            return parsed.browser_version
+        return None
+
+    def __parse_user_agent(self, ua) -> Optional[_ParsedUserAgent]:
+        cache = self._ua_parse_cache
+        if cache is not None:
+            try:
+                cached = cache.get(ua, _NOT_CACHED)
+            except TypeError:  # unhashable user agent from a custom field
+                cache = None
+            else:
+                if cached is not _NOT_CACHED:
+                    return cached
+
         try:
             if self._ua_parser is None:
                 self._ua_parser = load_ua_parser()
             if self._ua_parser is None:
                 return None
-            parsed = self._ua_parser.Parse(ua)
+            result = self._ua_parser.Parse(ua)
+            parsed = _ParsedUserAgent(
+                result.get("os", {"family": None}).get("family"),
+                self.__get_version_string(result.get("os")),
+                result.get("user_agent", {"family": None}).get("family"),
+                self.__get_version_string(result.get("user_agent")),
+            )
         except Exception as e:
             logger.warning(f"Error parsing user agent: {e}")
-            return None
+            parsed = None
 
-        field = field.lower()
-        if field in ("osname", "os_name"):
-            return parsed.get("os", {"family": None}).get("family")
-        if field in ("os_version", "osversion"):
-            return self.__get_version_string(parsed.get("os"))
-        if field in ("browser_name", "browsername"):
-            return parsed.get("user_agent", {"family": None}).get("family")
-        if field in ("browser_version", "browserversion"):
-            return self.__get_version_string(parsed.get("user_agent"))
-        return None
+        if cache is not None:
+            cache.set(ua, parsed)
+        return parsed
 
     def __get_version_string(self, version):
         if version is None:
@@ -859,24 +996,3 @@ class _Evaluator:
             return numeric
         except ValueError:
             return None
-
-    def __compare_dates(self, first, second, compare):
-        if first is None and second is None:
-            return False
-
-        first_date = self.__get_date(first)
-        second_date = self.__get_date(second)
-        if first_date is None or second_date is None:
-            return False
-
-        return compare(first_date, second_date)
-
-    def __get_date(self, d):
-        if d is None:
-            return None
-
-        epoch = int(d)
-        if len(str(d)) >= 11:
-            epoch //= 1000
-
-        return datetime.fromtimestamp(epoch)
@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from . import globals
+
+
+class _LRUCache:
+    """
+    A thread safe, size bounded map that drops the least recently used entry when full and
+    reports its hit/miss/eviction counts as "<name>.*" metrics to the observability client when
+    flush_metrics is called.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self._name = name
+        self._capacity = capacity
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._entries.get(key, default)
+            if value is default:
+                self._misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self._hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def flush_metrics(self):
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+            self._hits = self._misses = self._evictions = 0
+            size = len(self._entries)
+        globals.logger.log_cache_stats(self._name, hits, misses, evictions, size)
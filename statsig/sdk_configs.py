@@ -2,16 +2,20 @@ from typing import Dict, Optional, Union, Any
 
 
 class _SDK_Configs:
+    """
+    Flags and configs from the latest config specs. Each sync publishes fresh dicts with a single
+    assignment and published dicts are never mutated, so reads need no lock.
+    """
     _flags: Dict[str, bool] = {}
     _configs: Dict[str, Any] = {}
 
     @staticmethod
     def set_flags(new_flags):
-        _SDK_Configs._flags = new_flags
+        _SDK_Configs._flags = dict(new_flags) if isinstance(new_flags, dict) else new_flags
 
     @staticmethod
     def set_configs(new_configs):
-        _SDK_Configs._configs = new_configs
+        _SDK_Configs._configs = dict(new_configs) if isinstance(new_configs, dict) else new_configs
 
     @staticmethod
     def on(key):
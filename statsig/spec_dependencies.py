@@ -0,0 +1,207 @@
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .compiled_spec import GATE_CONDITION_TYPES, IP_FIELD, USER_AGENT_FIELD, _CompiledCondition, _CompiledRule, \
+    _CompiledSpec, _UserFieldAccessor
+
+GATES = "feature_gates"
+CONFIGS = "dynamic_configs"
+LAYERS = "layer_configs"
+
+
+class _SpecDependencies:
+    """
+    Everything an evaluation of a gate, config or layer can read, following nested gates,
+    config delegates and override mappings transitively:
+
+    user_fields: StatsigUser attributes (user_id, email, ip, ...)
+    custom_fields: keys looked up in user.custom and user.private_attributes
+    environment_fields: keys looked up in the user's statsig environment
+    unit_id_types: custom id types looked up in user.custom_ids
+    id_lists: id lists used by segment conditions
+    nested_gates: gates evaluated through pass/fail gate conditions
+    delegated_configs: experiments evaluated through rule delegates
+    uses_current_time / uses_target_app: conditions whose result is not a function of the user
+    condition_count: conditions that can run, a rough measure of how expensive evaluation is
+    """
+    __slots__ = ("user_fields", "custom_fields", "environment_fields", "unit_id_types", "id_lists", "nested_gates",
+                 "delegated_configs", "uses_current_time", "uses_target_app", "condition_count")
+
+    def __init__(self):
+        self.user_fields: FrozenSet[str] = frozenset()
+        self.custom_fields: FrozenSet[str] = frozenset()
+        self.environment_fields: FrozenSet[str] = frozenset()
+        self.unit_id_types: FrozenSet[str] = frozenset()
+        self.id_lists: FrozenSet[str] = frozenset()
+        self.nested_gates: FrozenSet[str] = frozenset()
+        self.delegated_configs: FrozenSet[str] = frozenset()
+        self.uses_current_time = False
+        self.uses_target_app = False
+        self.condition_count = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_fields": sorted(self.user_fields),
+            "custom_fields": sorted(self.custom_fields),
+            "environment_fields": sorted(self.environment_fields),
+            "unit_id_types": sorted(self.unit_id_types),
+            "id_lists": sorted(self.id_lists),
+            "nested_gates": sorted(self.nested_gates),
+            "delegated_configs": sorted(self.delegated_configs),
+            "uses_current_time": self.uses_current_time,
+            "uses_target_app": self.uses_target_app,
+            "condition_count": self.condition_count,
+        }
+
+
+class _DirectDependencies:
+    """What a single spec reads itself, plus the specs it hands evaluation to."""
+
+    def __init__(self):
+        self.user_fields: Set[str] = set()
+        self.custom_fields: Set[str] = set()
+        self.environment_fields: Set[str] = set()
+        self.unit_id_types: Set[str] = set()
+        self.id_lists: Set[str] = set()
+        self.uses_current_time = False
+        self.uses_target_app = False
+        self.condition_count = 0
+        self.gates: List[str] = []
+        self.delegates: List[str] = []
+        # specs an override mapping can hand evaluation to, of the same entity type
+        self.mapped_specs: List[str] = []
+
+    def add_field(self, field: _UserFieldAccessor):
+        if field.user_attribute is not None:
+            self.user_fields.add(field.user_attribute)
+        self.custom_fields.update((field.field, field.field_casefold, field.field_lower))
+
+    def add_unit_id(self, id_type: Any, id_type_lower: Optional[str]):
+        if id_type_lower is None:
+            self.user_fields.add("user_id")
+        else:
+            self.unit_id_types.update((id_type, id_type_lower))
+
+    def add_rule(self, rule: _CompiledRule):
+        for condition in rule.conditions:
+            self.add_condition(condition)
+        if rule.pass_percentage not in (0, 100):
+            self.add_unit_id(rule.id_type, rule.id_type_lower)
+        if isinstance(rule.config_delegate, str):
+            self.delegates.append(rule.config_delegate)
+
+    def add_condition(self, condition: _CompiledCondition):
+        self.condition_count += 1
+        condition_type = condition.condition_type
+        if condition_type in GATE_CONDITION_TYPES:
+            targets = condition.target if isinstance(condition.target, list) else [condition.target]
+            self.gates.extend(target for target in targets if isinstance(target, str))
+        elif condition_type in ("USER_FIELD", "IP_BASED", "UA_BASED"):
+            self.add_field(condition.field)
+            if condition_type == "IP_BASED":
+                self.add_field(IP_FIELD)
+            elif condition_type == "UA_BASED":
+                self.add_field(USER_AGENT_FIELD)
+        elif condition_type in ("UNIT_ID", "USER_BUCKET"):
+            self.add_unit_id(condition.id_type, condition.id_type_lower)
+        elif condition_type == "ENVIRONMENT_FIELD":
+            self.environment_fields.update((condition.field.field, condition.field.field_lower))
+        elif condition_type == "CURRENT_TIME":
+            self.uses_current_time = True
+        elif condition_type == "TARGET_APP":
+            self.uses_target_app = True
+        if condition.is_id_list_operator and isinstance(condition.target, str):
+            self.id_lists.add(condition.target)
+
+
+def _direct_dependencies(name: str, spec: Optional[_CompiledSpec],
+                         overrides: Optional[Dict[str, Any]], override_rules: Optional[Dict[str, _CompiledRule]],
+                         now: int) -> _DirectDependencies:
+    deps = _DirectDependencies()
+    if spec is not None and spec.enabled:
+        for rule in spec.rules:
+            deps.add_rule(rule)
+
+    mapping_list = overrides.get(name) if isinstance(overrides, dict) and isinstance(override_rules, dict) else None
+    if isinstance(mapping_list, list):
+        for mapping in mapping_list:
+            for override_rule in mapping.get("rules", []):
+                if override_rule.get("start_time", 0) > now:
+                    # the mapping starts applying once its start time has passed
+                    deps.uses_current_time = True
+                mapped_rule = override_rules.get(override_rule.get("rule_name")) if override_rules else None
+                if mapped_rule is not None:
+                    deps.add_rule(mapped_rule)
+            new_config_name = mapping.get("new_config_name")
+            if isinstance(new_config_name, str):
+                deps.mapped_specs.append(new_config_name)
+    return deps
+
+
+def build_dependency_index(
+        gates: Dict[str, _CompiledSpec],
+        configs: Dict[str, _CompiledSpec],
+        layers: Dict[str, _CompiledSpec],
+        overrides: Optional[Dict[str, Any]],
+        override_rules: Optional[Dict[str, _CompiledRule]],
+) -> Dict[str, Dict[str, _SpecDependencies]]:
+    """Returns {entity type: {spec name: dependencies}} for every gate, config and layer."""
+    specs_by_type = {GATES: gates, CONFIGS: configs, LAYERS: layers}
+    now = int(time.time() * 1000)
+    direct: Dict[Tuple[str, str], _DirectDependencies] = {}
+
+    def get_direct(key: Tuple[str, str]) -> _DirectDependencies:
+        deps = direct.get(key)
+        if deps is None:
+            entity_type, name = key
+            deps = _direct_dependencies(name, specs_by_type[entity_type].get(name), overrides,
+                                        override_rules, now)
+            direct[key] = deps
+        return deps
+
+    def resolve(key: Tuple[str, str]) -> _SpecDependencies:
+        user_fields: Set[str] = set()
+        custom_fields: Set[str] = set()
+        environment_fields: Set[str] = set()
+        unit_id_types: Set[str] = set()
+        id_lists: Set[str] = set()
+        nested_gates: Set[str] = set()
+        delegated_configs: Set[str] = set()
+        result = _SpecDependencies()
+
+        visited = {key}
+        pending = [key]
+        while pending:
+            current = pending.pop()
+            deps = get_direct(current)
+            user_fields |= deps.user_fields
+            custom_fields |= deps.custom_fields
+            environment_fields |= deps.environment_fields
+            unit_id_types |= deps.unit_id_types
+            id_lists |= deps.id_lists
+            result.uses_current_time = result.uses_current_time or deps.uses_current_time
+            result.uses_target_app = result.uses_target_app or deps.uses_target_app
+            result.condition_count += deps.condition_count
+            nested_gates.update(deps.gates)
+            delegated_configs.update(deps.delegates)
+            references = [(GATES, gate) for gate in deps.gates]
+            references.extend((CONFIGS, config) for config in deps.delegates)
+            references.extend((current[0], spec) for spec in deps.mapped_specs)
+            for reference in references:
+                if reference not in visited:
+                    visited.add(reference)
+                    pending.append(reference)
+
+        result.user_fields = frozenset(user_fields)
+        result.custom_fields = frozenset(custom_fields)
+        result.environment_fields = frozenset(environment_fields)
+        result.unit_id_types = frozenset(unit_id_types)
+        result.id_lists = frozenset(id_lists)
+        result.nested_gates = frozenset(nested_gates)
+        result.delegated_configs = frozenset(delegated_configs)
+        return result
+
+    return {
+        entity_type: {name: resolve((entity_type, name)) for name in specs}
+        for entity_type, specs in specs_by_type.items()
+    }
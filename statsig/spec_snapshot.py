@@ -0,0 +1,72 @@
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional
+
+from .compiled_spec import _CompiledRule, _CompiledSpec
+from .evaluation_details import DataSource
+from .spec_dependencies import _SpecDependencies
+from .utils import HashingAlgorithm, djb2_hash
+
+
+class SpecSnapshot(NamedTuple):
+    """
+    Everything parsed from one config specs response. _SpecStore builds a new snapshot off to
+    the side on every sync and publishes it with a single reference assignment, and nothing in
+    a published snapshot is mutated afterwards, so a reader holding one snapshot sees gates,
+    configs, layers and override rules from the same response without taking a lock.
+    Id lists sync separately and are not part of it. The one exception to immutability is
+    hashed_names, a memo of the client initialize response's hashed entity names that gains one
+    complete table per hashing algorithm the first time it is used.
+    """
+    gates: Dict[str, Dict]
+    configs: Dict[str, Dict]
+    layers: Dict[str, Dict]
+    compiled_gates: Dict[str, _CompiledSpec]
+    compiled_configs: Dict[str, _CompiledSpec]
+    compiled_layers: Dict[str, _CompiledSpec]
+    experiment_to_layer: Dict[str, str]
+    sdk_keys_to_app_ids: Dict[str, str]
+    hashed_sdk_keys_to_app_ids: Dict[str, str]
+    default_environment: Optional[str]
+    session_replay_info: Optional[Dict[str, Any]]
+    overrides: Optional[Dict[str, Dict]]
+    override_rules: Optional[Dict[str, Dict]]
+    compiled_override_rules: Optional[Dict[str, _CompiledRule]]
+    spec_dependencies: Dict[str, Dict[str, _SpecDependencies]]
+    app_id: Optional[str]
+    unsupported_configs: FrozenSet[str]
+    # config sync time of the response, and where it came from
+    time: int
+    source: DataSource
+    hashed_names: Dict[HashingAlgorithm, Dict[str, str]]
+
+
+EMPTY_SNAPSHOT = SpecSnapshot(
+    gates={},
+    configs={},
+    layers={},
+    compiled_gates={},
+    compiled_configs={},
+    compiled_layers={},
+    experiment_to_layer={},
+    sdk_keys_to_app_ids={},
+    hashed_sdk_keys_to_app_ids={},
+    default_environment=None,
+    session_replay_info=None,
+    overrides=None,
+    override_rules=None,
+    compiled_override_rules=None,
+    spec_dependencies={},
+    app_id=None,
+    unsupported_configs=frozenset(),
+    time=0,
+    source=DataSource.UNINITIALIZED,
+    hashed_names={},
+)
+
+
+def target_app_for_sdk_key(snapshot: SpecSnapshot, sdk_key: Optional[str] = None) -> Optional[str]:
+    if sdk_key is None:
+        return None
+    target_app_id = snapshot.hashed_sdk_keys_to_app_ids.get(djb2_hash(sdk_key))
+    if target_app_id is not None:
+        return target_app_id
+    return snapshot.sdk_keys_to_app_ids.get(sdk_key)
@@ -1,19 +1,23 @@
 import json
 import threading
 from enum import Enum
-from typing import List, Optional, Dict, Set, Tuple, Union
+from typing import FrozenSet, List, Optional, Dict, Set, Tuple, Union
 
 from . import globals
+from .compiled_spec import _CompiledSpec, compile_rules, compile_specs
 from .constants import Const
 from .diagnostics import Diagnostics, Marker
 from .evaluation_details import EvaluationReason, DataSource
+from .evaluation_operators import DATE_OPERATORS, NUMERIC_OPERATORS, VERSION_OPERATORS, compile_pattern, \
+    get_value_as_float, is_unsafe_pattern, parse_date_target, parse_version_target
 from .sdk_configs import _SDK_Configs
+from .spec_dependencies import _SpecDependencies, build_dependency_index
+from .spec_snapshot import EMPTY_SNAPSHOT, SpecSnapshot, target_app_for_sdk_key
 from .spec_updater import SpecUpdater
 from .statsig_context import InitContext
 from .statsig_error_boundary import _StatsigErrorBoundary
 from .statsig_network import _StatsigNetwork
 from .statsig_options import StatsigOptions
-from .utils import djb2_hash
 
 
 class EntityType(Enum):
@@ -46,20 +50,9 @@ class _SpecStore:
         self._shutdown_event = shutdown_event
         self._diagnostics = diagnostics
 
-        self._configs: Dict[str, Dict] = {}
-        self._gates: Dict[str, Dict] = {}
-        self._layers: Dict[str, Dict] = {}
-        self._experiment_to_layer: Dict[str, str] = {}
-        self._sdk_keys_to_app_ids: Dict[str, str] = {}
-        self._hashed_sdk_keys_to_app_ids: Dict[str, str] = {}
-        self._default_environment: Union[None, str] = None
-        self._session_replay_info: Union[None, Dict[str, Dict]] = None
-        self._overrides: Union[None, Dict[str, Dict]] = None
-        self._override_rules: Union[None, Dict[str, Dict]] = None
-        self._app_id: Union[None, str] = None
+        self._snapshot = EMPTY_SNAPSHOT
 
         self._id_lists: Dict[str, dict] = {}
-        self.unsupported_configs: Set[str] = set()
         self.context = context
 
         self.spec_updater = SpecUpdater(
@@ -99,6 +92,14 @@ class _SpecStore:
     def last_update_time(self):
         return self.spec_updater.last_update_time
 
+    def snapshot(self) -> SpecSnapshot:
+        """The current config specs. Read everything for one evaluation from a single snapshot."""
+        return self._snapshot
+
+    @property
+    def unsupported_configs(self) -> FrozenSet[str]:
+        return self._snapshot.unsupported_configs
+
     def shutdown(self):
         if self._options.local_mode:
             return
@@ -106,25 +107,44 @@ class _SpecStore:
         self.spec_updater.shutdown()
 
     def get_gate(self, name: str):
-        return self._gates.get(name)
+        return self._snapshot.gates.get(name)
 
     def get_all_gates(self):
-        return self._gates
+        return self._snapshot.gates
 
     def get_config(self, name: str):
-        return self._configs.get(name)
+        return self._snapshot.configs.get(name)
 
     def get_all_configs(self):
-        return self._configs
+        return self._snapshot.configs
 
     def get_layer(self, name: str):
-        return self._layers.get(name)
+        return self._snapshot.layers.get(name)
 
     def get_all_layers(self):
-        return self._layers
+        return self._snapshot.layers
+
+    def get_compiled_gate(self, name: str) -> Optional[_CompiledSpec]:
+        return self._snapshot.compiled_gates.get(name)
+
+    def get_compiled_config(self, name: str) -> Optional[_CompiledSpec]:
+        return self._snapshot.compiled_configs.get(name)
+
+    def get_compiled_layer(self, name: str) -> Optional[_CompiledSpec]:
+        return self._snapshot.compiled_layers.get(name)
+
+    def get_spec_dependencies(self, entity_type: EntityType, name: str) -> Optional[_SpecDependencies]:
+        """
+        The user fields, custom fields, unit id types, id lists and nested gates evaluating the
+        given spec can read, or None when the spec is not in the current config specs.
+        """
+        return self._snapshot.spec_dependencies.get(entity_type.value, {}).get(name)
+
+    def get_all_spec_dependencies(self, entity_type: EntityType) -> Dict[str, _SpecDependencies]:
+        return self._snapshot.spec_dependencies.get(entity_type.value, {})
 
     def get_layer_name_for_experiment(self, experiment_name: str):
-        return self._experiment_to_layer.get(experiment_name)
+        return self._snapshot.experiment_to_layer.get(experiment_name)
 
     def get_id_list(self, id_list_name):
         return self._id_lists.get(id_list_name)
@@ -132,28 +152,32 @@ class _SpecStore:
     def get_all_id_lists(self):
         return self._id_lists
 
+    def load_local_id_list(self, list_name: str, content: str):
+        """Applies an id list file ("+id"/"-id" lines, as served from the id list url) without the network"""
+        local_list = self._id_lists.get(list_name) or {"ids": set(), "readBytes": 0, "fileID": "local"}
+        self.spec_updater._apply_downloaded_id_list_content(
+            list_name, local_list, self._id_lists, local_list.get("readBytes", 0), content, len(content))
+
     def get_target_app_for_sdk_key(self, sdk_key=None):
-        if sdk_key is None:
-            return None
-        target_app_id = self._hashed_sdk_keys_to_app_ids.get(djb2_hash(sdk_key))
-        if target_app_id is not None:
-            return target_app_id
-        return self._sdk_keys_to_app_ids.get(sdk_key)
+        return target_app_for_sdk_key(self._snapshot, sdk_key)
 
     def get_app_id(self):
-        return self._app_id
+        return self._snapshot.app_id
 
     def get_default_environment(self):
-        return self._default_environment
+        return self._snapshot.default_environment
 
     def get_session_replay_info(self):
-        return self._session_replay_info
+        return self._snapshot.session_replay_info
 
     def get_overrides(self):
-        return self._overrides
+        return self._snapshot.overrides
 
     def get_override_rules(self):
-        return self._override_rules
+        return self._snapshot.override_rules
+
+    def get_compiled_override_rules(self):
+        return self._snapshot.compiled_override_rules
 
     def _initialize_specs(self):
         initialize_strategies = self._get_initialize_strategy()
@@ -193,6 +217,8 @@ class _SpecStore:
                 parse_target_value_map_from_spec(spec, parsed)
             return parsed
 
+        unsupported_configs: Set[str] = set()
+
         def parse_target_value_map_from_spec(spec, parsed):
             unsupported_specs = set()
             for rule in spec.get("rules", []):
@@ -203,15 +229,17 @@ class _SpecStore:
                     if op is not None:
                         op = op.lower()
                         if op not in Const.SUPPORTED_OPERATORS:
-                            self.unsupported_configs.add(spec.get("name"))
+                            unsupported_configs.add(spec.get("name"))
                             unsupported_specs.add(spec.get("name"))
                     if cond_type is not None:
                         cond_type = cond_type.lower()
                         if cond_type not in Const.SUPPORTED_CONDITION_TYPES:
-                            self.unsupported_configs.add(spec.get("name"))
+                            unsupported_configs.add(spec.get("name"))
                             unsupported_specs.add(spec.get("name"))
 
-                    self._parse_target_value_for_condition(rule, i, op, cond_type, target_value)
+                    if not self._parse_target_value_for_condition(rule, i, op, cond_type, target_value):
+                        unsupported_configs.add(spec.get("name"))
+                        unsupported_specs.add(spec.get("name"))
             for spec_name in unsupported_specs:
                 if spec_name in parsed:
                     del parsed[spec_name]
@@ -221,18 +249,27 @@ class _SpecStore:
                 return None
             parsed = {}
             for rule_name, rule in spec_override_rules.items():
+                supported = True
                 for i, cond in enumerate(rule.get("conditions", [])):
                     op = cond.get("operator", None)
                     cond_type = cond.get("type", None)
                     target_value = cond.get("targetValue", [])
-                    self._parse_target_value_for_condition(rule, i, op, cond_type, target_value)
-                parsed[rule_name] = rule
+                    if not self._parse_target_value_for_condition(rule, i, op, cond_type, target_value):
+                        supported = False
+                if supported:
+                    parsed[rule_name] = rule
             return parsed
 
-        self.unsupported_configs.clear()
         new_gates = get_parsed_specs(EntityType.GATE.value)
         new_configs = get_parsed_specs(EntityType.CONFIG.value)
         new_layers = get_parsed_specs(EntityType.LAYER.value)
+        overrides = specs_json.get("overrides", None)
+        # names a config mapping can redirect evaluate per user, everything else may fold to a constant
+        config_mappings = {name for name, mapping in overrides.items() if isinstance(mapping, list)} \
+            if isinstance(overrides, dict) else set()
+        new_compiled_gates = compile_specs(new_gates, config_mappings=config_mappings)
+        new_compiled_configs = compile_specs(new_configs, config_mappings=config_mappings)
+        new_compiled_layers = compile_specs(new_layers, allocation_tables=True, config_mappings=config_mappings)
 
         new_experiment_to_layer = {}
         layers_dict = specs_json.get("layers", {})
@@ -241,22 +278,36 @@ class _SpecStore:
             for experiment_name in experiments:
                 new_experiment_to_layer[experiment_name] = layer_name
 
-        self._sdk_keys_to_app_ids = specs_json.get("sdk_keys_to_app_ids", {})
-        self._hashed_sdk_keys_to_app_ids = specs_json.get(
-            "hashed_sdk_keys_to_app_ids", {}
+        override_rules = parse_override_rules(specs_json.get("override_rules", None))
+        compiled_override_rules = compile_rules(override_rules)
+        snapshot = SpecSnapshot(
+            gates=new_gates,
+            configs=new_configs,
+            layers=new_layers,
+            compiled_gates=new_compiled_gates,
+            compiled_configs=new_compiled_configs,
+            compiled_layers=new_compiled_layers,
+            experiment_to_layer=new_experiment_to_layer,
+            sdk_keys_to_app_ids=specs_json.get("sdk_keys_to_app_ids", {}),
+            hashed_sdk_keys_to_app_ids=specs_json.get("hashed_sdk_keys_to_app_ids", {}),
+            default_environment=specs_json.get("default_environment", None),
+            session_replay_info=specs_json.get("session_replay_info", None),
+            overrides=overrides,
+            override_rules=override_rules,
+            compiled_override_rules=compiled_override_rules,
+            spec_dependencies=build_dependency_index(new_compiled_gates, new_compiled_configs, new_compiled_layers,
+                                                     overrides, compiled_override_rules),
+            app_id=specs_json.get("app_id", None),
+            unsupported_configs=frozenset(unsupported_configs),
+            time=specs_json.get("time", 0),
+            source=source,
+            hashed_names={},
         )
-        self._gates = new_gates
-        self._configs = new_configs
-        self._layers = new_layers
-        self._experiment_to_layer = new_experiment_to_layer
-        self.spec_updater.last_update_time = specs_json.get("time", 0)
+        # the only place specs are published: evaluations in flight keep reading the snapshot they started with
+        self._snapshot = snapshot
+        self.spec_updater.last_update_time = snapshot.time
         self.init_source = source
         self.context.source = source
-        self._default_environment = specs_json.get("default_environment", None)
-        self._session_replay_info = specs_json.get("session_replay_info", None)
-        self._overrides = specs_json.get("overrides", None)
-        self._override_rules = parse_override_rules(specs_json.get("override_rules", None))
-        self._app_id = specs_json.get("app_id", None)
 
         if self.spec_updater.last_update_time > prev_lcut:
             globals.logger.log_config_sync_update(self.spec_updater.initialized, True,
@@ -410,8 +461,12 @@ class _SpecStore:
             )
             return [DataSource.STATSIG_NETWORK]
 
-    def _parse_target_value_for_condition(self, rule, condition_index, op, cond_type, target_value):
-        """Helper function to parse target values into fast lookup maps for conditions."""
+    def _parse_target_value_for_condition(self, rule, condition_index, op, cond_type, target_value) -> bool:
+        """
+        Helper function to parse target values into fast lookup maps for conditions.
+        Returns False when the condition can't be evaluated (an invalid str_matches pattern, or
+        one rejected by StatsigOptions.guard_str_matches_patterns).
+        """
         if op in ("any", "none") and cond_type == "user_bucket":
             rule["conditions"][condition_index]["user_bucket"] = {}
             for val in target_value:
@@ -435,3 +490,29 @@ class _SpecStore:
             rule["conditions"][condition_index]["fast_target_value"] = {}
             for val in target_value:
                 rule["conditions"][condition_index]["fast_target_value"][str(val)] = True
+
+        if op in NUMERIC_OPERATORS or op in VERSION_OPERATORS or op in DATE_OPERATORS:
+            condition = rule["conditions"][condition_index]
+            target = condition.get("targetValue")
+            try:
+                if op in NUMERIC_OPERATORS:
+                    condition["parsed_target_value"] = get_value_as_float(target)
+                elif op in VERSION_OPERATORS:
+                    condition["parsed_target_value"] = parse_version_target(target)
+                else:
+                    condition["parsed_target_value"] = parse_date_target(target)
+            except (ValueError, TypeError, OverflowError, OSError):
+                # left unparsed, evaluating the condition reports the error as it always has
+                pass
+
+        if op == "str_matches":
+            pattern = rule["conditions"][condition_index].get("targetValue")
+            if pattern is not None:
+                pattern = str(pattern)
+                if compile_pattern(pattern) is None:
+                    return False
+                if self._options.guard_str_matches_patterns and is_unsafe_pattern(pattern):
+                    globals.logger.warning(f"Ignoring specs using the str_matches pattern {pattern!r}, "
+                                           f"it could backtrack excessively")
+                    return False
+        return True
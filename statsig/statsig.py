@@ -1,13 +1,15 @@
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
 from . import FeatureGate
 from .client_initialize_formatter import ClientInitializeResponse
+from .client_initialize_stream import DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE
 from .dynamic_config import DynamicConfig
 from .initialize_details import InitializeDetails
 from .layer import Layer
 from .statsig_event import StatsigEvent
 from .statsig_options import StatsigOptions
 from .statsig_server import StatsigServer
+from .statsig_session import StatsigSession
 from .statsig_user import StatsigUser
 from .utils import HashingAlgorithm
 
@@ -66,6 +68,18 @@ def check_gate_with_exposure_logging_disabled(user: StatsigUser, gate: str) -> b
     return __instance.check_gate(user, gate, log_exposure=False)
 
 
+def check_gate_batch(users: Iterable[StatsigUser], gate: str, log_exposure=True) -> List[bool]:
+    """
+    Checks the value of a Feature Gate for each of the given users
+
+    :param users: The StatsigUser objects used for the evaluations
+    :param gate: The name of the gate being checked
+    :param log_exposure: Boolean flag to optionally disable exposure logging (Default: True)
+    :return: Whether each user passes the gate, in the order of users
+    """
+    return __instance.check_gate_batch(users, gate, log_exposure)
+
+
 def manually_log_gate_exposure(user: StatsigUser, gate: str):
     """
     Logs an exposure event for the gate
@@ -98,6 +112,18 @@ def get_config_with_exposure_logging_disabled(user: StatsigUser, config: str) ->
     return __instance.get_config(user, config, log_exposure=False)
 
 
+def get_config_batch(users: Iterable[StatsigUser], config: str, log_exposure=True) -> List[DynamicConfig]:
+    """
+    Gets the DynamicConfig value for each of the given users
+
+    :param users: The StatsigUser objects used for the evaluations
+    :param config: The name of the dynamic config
+    :param log_exposure: Boolean flag to optionally disable exposure logging (Default: True)
+    :return: A DynamicConfig object per user, in the order of users
+    """
+    return __instance.get_config_batch(users, config, log_exposure)
+
+
 def manually_log_config_exposure(user: StatsigUser, config: str):
     """
     Logs an exposure event for the dynamic config
@@ -171,6 +197,18 @@ def get_layer_with_exposure_logging_disabled(user: StatsigUser, layer: str) -> L
     return __instance.get_layer(user, layer, log_exposure=False)
 
 
+def session(user: StatsigUser) -> StatsigSession:
+    """
+    Starts a session for checking many gates, configs, experiments and layers for the given user,
+    e.g. over one web request. Results are reused within the session and its exposures are logged
+    together when it closes
+
+    :param user: The StatsigUser object used for the evaluations
+    :return: A StatsigSession, usable as a context manager
+    """
+    return __instance.session(user)
+
+
 def manually_log_layer_parameter_exposure(user: StatsigUser, layer: str, parameter: str):
     """
     Logs an exposure event for the parameter in the given layer
@@ -299,6 +337,64 @@ def get_client_initialize_response(user: StatsigUser, client_sdk_key: Optional[s
     return __instance.get_client_initialize_response(user, client_sdk_key, hash, include_local_overrides, target_app_id)
 
 
+def get_client_initialize_response_bytes(user: StatsigUser, client_sdk_key: Optional[str] = None,
+                                         hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+                                         include_local_overrides: Optional[bool] = False,
+                                         target_app_id: Optional[str] = None,
+                                         encoding: Optional[str] = None) -> Optional[bytes]:
+    """
+    Gets the client initialize response for the given user as ready to send JSON bytes.
+    With client_initialize_cache_bytes set, repeat calls for the same user are served from the cache.
+
+    :param user: The StatsigUser object used for evaluation
+    :param client_sdk_key: (Optional) The client sdk key to use for bootstrapping
+    :param encoding: (Optional) "gzip" or "br" to get the bytes compressed for that Content-Encoding
+    :return: The UTF-8 JSON of the initialize response, encoded as asked
+    """
+    return __instance.get_client_initialize_response_bytes(user, client_sdk_key, hash, include_local_overrides,
+                                                           target_app_id, encoding)
+
+
+def get_client_initialize_responses(users: Iterable[StatsigUser], client_sdk_key: Optional[str] = None,
+                                    hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+                                    include_local_overrides: Optional[bool] = False,
+                                    target_app_id: Optional[str] = None,
+                                    max_workers: int = 1) -> List[ClientInitializeResponse]:
+    """
+    Gets the client initialize responses for many users at once, in the same order.
+    Work shared by every user (hashing names, target app filtering, gates/configs that don't
+    depend on the user) is done once for the whole batch.
+
+    :param users: The StatsigUser objects used for evaluation
+    :param client_sdk_key: (Optional) The client sdk key to use for bootstrapping
+    :param max_workers: (Optional) Threads to build responses on, useful on free-threaded CPython
+    :return: An initialize response per user, None for users it could not be built for
+    """
+    return __instance.get_client_initialize_responses(users, client_sdk_key, hash, include_local_overrides,
+                                                      target_app_id, max_workers)
+
+
+def stream_client_initialize_response(user: StatsigUser, client_sdk_key: Optional[str] = None,
+                                      hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+                                      include_local_overrides: Optional[bool] = False,
+                                      target_app_id: Optional[str] = None,
+                                      encoding: Optional[str] = None,
+                                      chunk_size: int = DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE
+                                      ) -> Optional[Iterator[bytes]]:
+    """
+    Gets the client initialize response for the given user as an iterator of JSON byte chunks,
+    evaluating gates/configs/layers as the chunks are read. Suited to streaming HTTP responses.
+
+    :param user: The StatsigUser object used for evaluation
+    :param client_sdk_key: (Optional) The client sdk key to use for bootstrapping
+    :param encoding: (Optional) "gzip" or "br" to compress the chunks for that Content-Encoding
+    :param chunk_size: (Optional) About how many bytes of JSON to write per chunk, before encoding
+    :return: The chunks of the UTF-8 JSON initialize response
+    """
+    return __instance.stream_client_initialize_response(user, client_sdk_key, hash, include_local_overrides,
+                                                        target_app_id, encoding, chunk_size)
+
+
 def evaluate_all(user: StatsigUser):
     """
     Evaluates all Gates, DynamicConfigs, Experiments
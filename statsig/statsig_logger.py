@@ -1,5 +1,5 @@
 import threading
-from typing import Optional, Union, Set, List, Tuple
+from typing import Dict, NamedTuple, Optional, Union, List, Tuple
 
 from . import globals
 from .batch_event_queue import EventBatchProcessor
@@ -26,6 +26,14 @@ _DIAGNOSTICS_EVENT = "statsig::diagnostics"
 _IGNORED_METADATA_KEYS = {"serverTime", "configSyncTime", "initTime", "reason"}
 
 
+class _Exposure(NamedTuple):
+    entity_type: EntityType
+    name: str
+    result: _ConfigEvaluation
+    layer: Optional[Layer] = None
+    parameter_name: str = ""
+
+
 def _safe_add_evaluation_to_event(
         evaluation_details: Union[EvaluationDetails, None], event: StatsigEvent
 ):
@@ -45,7 +53,9 @@ class _StatsigLogger:
                  diagnostics: Diagnostics):
         self._sampling_key_set = TTLSet(shutdown_event)
         self._events: List[StatsigEvent] = []
-        self._deduper: Set[str] = set()
+        # exposure keys seen this logging interval. Checked and added with dict.setdefault, and reset
+        # by publishing a new dict, so concurrent checks dedupe exactly without taking a lock
+        self._deduper: Dict[str, object] = {}
         self._net = net
         self._options = options
         self._statsig_metadata = statsig_metadata
@@ -82,6 +92,11 @@ class _StatsigLogger:
             return
         self.event_batch_processor.add_event(event.to_dict())
 
+    def log_batch(self, events: List[StatsigEvent]):
+        if self._local_mode or self._disabled:
+            return
+        self.event_batch_processor.add_events([event.to_dict() for event in events])
+
     def log_gate_exposure(
             self,
             user: StatsigUser,
@@ -89,10 +104,48 @@ class _StatsigLogger:
             gate_result: _ConfigEvaluation,
             is_manual_exposure=False,
     ):
+        event = self.__gate_exposure_event(user, gate_name, gate_result, is_manual_exposure)
+        if event is not None:
+            self.log(event)
+
+    def log_gate_exposures(self, users: List[StatsigUser], gate_name: str, gate_results: List[_ConfigEvaluation]):
+        """Exposures for one gate evaluated for many users, enqueued together."""
+        if self._local_mode or self._disabled:
+            return
+        events = [self.__gate_exposure_event(user, gate_name, result) for user, result in zip(users, gate_results)]
+        self.log_batch([event for event in events if event is not None])
+
+    def log_config_exposure(
+            self,
+            user: StatsigUser,
+            config_name: str,
+            config_result: _ConfigEvaluation,
+            is_manual_exposure=False,
+    ):
+        event = self.__config_exposure_event(user, config_name, config_result, is_manual_exposure)
+        if event is not None:
+            self.log(event)
+
+    def log_config_exposures(self, users: List[StatsigUser], config_name: str,
+                             config_results: List[_ConfigEvaluation]):
+        """Exposures for one config evaluated for many users, enqueued together."""
+        if self._local_mode or self._disabled:
+            return
+        events = [self.__config_exposure_event(user, config_name, result)
+                  for user, result in zip(users, config_results)]
+        self.log_batch([event for event in events if event is not None])
+
+    def __gate_exposure_event(
+            self,
+            user: StatsigUser,
+            gate_name: str,
+            gate_result: _ConfigEvaluation,
+            is_manual_exposure=False,
+    ) -> Optional[StatsigEvent]:
         should_log, sampling_rate, shadow_logged = self.__determine_sampling(EntityType.GATE, gate_name, gate_result,
                                                                              user)
         if not should_log:
-            return
+            return None
         event = StatsigEvent(user, _GATE_EXPOSURE_EVENT)
         event.metadata = {
             "gate": gate_name,
@@ -106,7 +159,7 @@ class _StatsigLogger:
             event.metadata["overrideConfigName"] = gate_result.override_config_name
         event.statsigMetadata = {}
         if not self._is_unique_exposure(user, _GATE_EXPOSURE_EVENT, event.metadata):
-            return
+            return None
 
         if is_manual_exposure:
             event.metadata["isManualExposure"] = "true"
@@ -120,20 +173,20 @@ class _StatsigLogger:
         event._secondary_exposures = secondary_exposures
 
         _safe_add_evaluation_to_event(gate_result.evaluation_details, event)
-        self.log(event)
+        return event
 
-    def log_config_exposure(
+    def __config_exposure_event(
             self,
             user: StatsigUser,
             config_name: str,
             config_result: _ConfigEvaluation,
             is_manual_exposure=False,
-    ):
+    ) -> Optional[StatsigEvent]:
         should_log, sampling_rate, shadow_logged = self.__determine_sampling(EntityType.CONFIG, config_name,
                                                                              config_result,
                                                                              user)
         if not should_log:
-            return
+            return None
         event = StatsigEvent(user, _CONFIG_EXPOSURE_EVENT)
         event.metadata = {
             "config": config_name,
@@ -147,7 +200,7 @@ class _StatsigLogger:
         event.statsigMetadata = {}
 
         if not self._is_unique_exposure(user, _CONFIG_EXPOSURE_EVENT, event.metadata):
-            return
+            return None
         if is_manual_exposure:
             event.metadata["isManualExposure"] = "true"
         if sampling_rate is not None:
@@ -160,7 +213,7 @@ class _StatsigLogger:
         event._secondary_exposures = secondary_exposures
 
         _safe_add_evaluation_to_event(config_result.evaluation_details, event)
-        self.log(event)
+        return event
 
     def log_layer_exposure(
             self,
@@ -170,10 +223,40 @@ class _StatsigLogger:
             config_evaluation: _ConfigEvaluation,
             is_manual_exposure=False,
     ):
+        event = self.__layer_exposure_event(user, layer, parameter_name, config_evaluation, is_manual_exposure)
+        if event is not None:
+            self.log(event)
+
+    def log_exposures(self, user: StatsigUser, exposures: List["_Exposure"]):
+        """Exposures for one user across gates, configs and layer parameters, enqueued together."""
+        if self._local_mode or self._disabled:
+            return
+        events = []
+        for exposure in exposures:
+            if exposure.entity_type == EntityType.GATE:
+                event = self.__gate_exposure_event(user, exposure.name, exposure.result)
+            elif exposure.entity_type == EntityType.CONFIG:
+                event = self.__config_exposure_event(user, exposure.name, exposure.result)
+            elif exposure.layer is not None:
+                event = self.__layer_exposure_event(user, exposure.layer, exposure.parameter_name, exposure.result)
+            else:
+                event = None
+            if event is not None:
+                events.append(event)
+        self.log_batch(events)
+
+    def __layer_exposure_event(
+            self,
+            user,
+            layer: Layer,
+            parameter_name: str,
+            config_evaluation: _ConfigEvaluation,
+            is_manual_exposure=False,
+    ) -> Optional[StatsigEvent]:
         should_log, sampling_rate, shadow_logged = self.__determine_sampling(
             EntityType.LAYER, layer.name, config_evaluation, user, parameter_name)
         if not should_log:
-            return
+            return None
         event = StatsigEvent(user, _LAYER_EXPOSURE_EVENT)
 
         allocated_experiment = ""
@@ -195,7 +278,7 @@ class _StatsigLogger:
         if config_evaluation.override_config_name is not None:
             metadata["overrideConfigName"] = config_evaluation.override_config_name
         if not self._is_unique_exposure(user, _LAYER_EXPOSURE_EVENT, metadata):
-            return
+            return None
         event.metadata = metadata
         event.statsigMetadata = {}
         if is_manual_exposure:
@@ -209,8 +292,7 @@ class _StatsigLogger:
         event._secondary_exposures = [] if exposures is None else exposures
 
         _safe_add_evaluation_to_event(config_evaluation.evaluation_details, event)
-
-        self.log(event)
+        return event
 
     def flush(self):
         self._logger_worker.force_flush()
@@ -223,7 +305,7 @@ class _StatsigLogger:
             try:
                 if shutdown_event.wait(self._logging_interval):
                     break
-                self._deduper = set()
+                self._deduper = {}
             except Exception as e:
                 self._error_boundary.log_exception("_periodic_exposure_reset", e)
 
@@ -235,8 +317,9 @@ class _StatsigLogger:
     def _is_unique_exposure(self, user, eventName: str, metadata: Optional[dict]) -> bool:
         if user is None:
             return True
-        if len(self._deduper) > 10000:
-            self._deduper = set()
+        deduper = self._deduper
+        if len(deduper) > 10000:
+            deduper = self._deduper = {}
         custom_id_key = ""
         if user.custom_ids and isinstance(user.custom_ids, dict):
             custom_id_key = ",".join(user.custom_ids.values())
@@ -253,11 +336,8 @@ class _StatsigLogger:
             str(item) for item in [user.user_id, custom_id_key, eventName, metadata_key]
         )
 
-        if key in self._deduper:
-            return False
-
-        self._deduper.add(key)
-        return True
+        token = object()
+        return deduper.setdefault(key, token) is token
 
     def __determine_sampling(self, type: EntityType, name: str, result: _ConfigEvaluation, user: StatsigUser,
                              param_name="") -> Tuple[
@@ -279,8 +359,7 @@ class _StatsigLogger:
                 return True, None, None
 
             samplingSetKey = f"{name}_{result.rule_id}"
-            if not self._sampling_key_set.contains(samplingSetKey):
-                self._sampling_key_set.add(samplingSetKey)
+            if self._sampling_key_set.add_if_absent(samplingSetKey):
                 return True, None, None
 
             if result.seen_analytical_gates:
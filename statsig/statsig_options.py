@@ -120,6 +120,33 @@ class StatsigOptions:
             disable_country_lookup: bool = False,
             service_name: Optional[str] = None,
             log_event_connection_reuse: bool = False,
+            # Stop checking a rule's remaining conditions once one fails. Gate conditions still run
+            # so secondary exposures are unchanged, but a later condition that would have raised no
+            # longer turns the evaluation into an error.
+            short_circuit_rule_evaluation: bool = False,
+            # With short_circuit_rule_evaluation, check cheap conditions (e.g. eq/any on user fields)
+            # before expensive ones (UA parsing, id lists, nested gates)
+            order_conditions_by_cost: bool = False,
+            # Max number of gate/config/layer results kept in an LRU cache keyed by the user's fields,
+            # reused until specs or a referenced id list change. 0 disables the cache.
+            evaluation_cache_size: int = 0,
+            # Treat gates/configs whose str_matches patterns could backtrack catastrophically (nested
+            # unbounded repeats like "(a+)+", backreferences, or over 1000 characters) as unsupported
+            guard_str_matches_patterns: bool = False,
+            # Max number of parsed user agents kept in an LRU cache keyed by the user agent string,
+            # shared by all UA_BASED conditions. 0 (the default) parses the user agent for every condition.
+            ua_parse_cache_size: int = 0,
+            # Back IP_BASED country conditions with one process wide table held in flat arrays instead
+            # of ip3country's lists. Loaded before forking (e.g. gunicorn --preload), its pages stay
+            # shared by every worker.
+            compact_country_lookup: bool = False,
+            # Max number of ip -> country results kept in an LRU cache. 0 (the default) looks up the ip for
+            # every condition.
+            country_lookup_cache_size: int = 0,
+            # Max total size in bytes of client initialize responses kept in an LRU cache keyed by the
+            # user, client key and hashing algorithm, along with their JSON (and gzip/br) bytes. Dropped
+            # whenever specs sync. 0 disables the cache.
+            client_initialize_cache_bytes: int = 0,
     ):
         self.data_store = data_store
         self._environment: Union[None, dict] = None
@@ -175,6 +202,14 @@ class StatsigOptions:
         self.disable_country_lookup = disable_country_lookup
         self.service_name = service_name
         self.log_event_connection_reuse = log_event_connection_reuse
+        self.short_circuit_rule_evaluation = short_circuit_rule_evaluation
+        self.order_conditions_by_cost = order_conditions_by_cost
+        self.evaluation_cache_size = evaluation_cache_size
+        self.guard_str_matches_patterns = guard_str_matches_patterns
+        self.ua_parse_cache_size = ua_parse_cache_size
+        self.compact_country_lookup = compact_country_lookup
+        self.country_lookup_cache_size = country_lookup_cache_size
+        self.client_initialize_cache_bytes = client_initialize_cache_bytes
         self._set_logging_copy()
         self._attributes_changed = False
 
@@ -266,5 +301,21 @@ class StatsigOptions:
             logging_copy["service_name"] = self.service_name
         if not self.log_event_connection_reuse:
             logging_copy["log_event_connection_reuse"] = self.log_event_connection_reuse
+        if self.short_circuit_rule_evaluation:
+            logging_copy["short_circuit_rule_evaluation"] = self.short_circuit_rule_evaluation
+        if self.order_conditions_by_cost:
+            logging_copy["order_conditions_by_cost"] = self.order_conditions_by_cost
+        if self.evaluation_cache_size:
+            logging_copy["evaluation_cache_size"] = self.evaluation_cache_size
+        if self.guard_str_matches_patterns:
+            logging_copy["guard_str_matches_patterns"] = self.guard_str_matches_patterns
+        if self.ua_parse_cache_size:
+            logging_copy["ua_parse_cache_size"] = self.ua_parse_cache_size
+        if self.compact_country_lookup:
+            logging_copy["compact_country_lookup"] = self.compact_country_lookup
+        if self.country_lookup_cache_size:
+            logging_copy["country_lookup_cache_size"] = self.country_lookup_cache_size
+        if self.client_initialize_cache_bytes:
+            logging_copy["client_initialize_cache_bytes"] = self.client_initialize_cache_bytes
         self._logging_copy = logging_copy
         self._attributes_changed = False
@@ -1,19 +1,25 @@
+import copy
 import dataclasses
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional, Union
+from typing import Iterable, Iterator, List, Optional, Union
 
 from . import globals
+from .columnar_evaluator import ColumnarEvaluation, UserColumns, _ColumnarEvaluator, default_columnar_evaluation
 from .config_evaluation import _ConfigEvaluation
 from .diagnostics import Context, Diagnostics, Marker
 from .dynamic_config import DynamicConfig
+from .evaluation_context import EvaluationContext
 from .evaluation_details import DataSource
+from .client_initialize_cache import CLIENT_INITIALIZE_ENCODINGS
+from .client_initialize_formatter import ClientInitializeResponse
+from .client_initialize_stream import CLIENT_INITIALIZE_STREAM_ENCODERS, DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE
 from .evaluator import _Evaluator
 from .feature_gate import FeatureGate
 from .initialize_details import InitializeDetails
 from .layer import Layer
-from .spec_store import _SpecStore
+from .spec_store import EntityType, _SpecStore
 from .statsig_context import InitContext
 from .statsig_error_boundary import _StatsigErrorBoundary
 from .statsig_errors import StatsigNameError, StatsigRuntimeError, StatsigValueError, StatsigTimeoutError
@@ -22,12 +28,15 @@ from .statsig_logger import _StatsigLogger
 from .statsig_metadata import _StatsigMetadata
 from .statsig_network import _StatsigNetwork
 from .statsig_options import StatsigOptions
+from .statsig_session import StatsigSession
 from .statsig_user import StatsigUser
+from .thread_util import is_free_threaded, spawn_background_thread
 from .utils import HashingAlgorithm
 from .version import __version__
 
 RULESETS_SYNC_INTERVAL = 10
 IDLISTS_SYNC_INTERVAL = 60
+CACHE_METRICS_FLUSH_INTERVAL = 60
 
 
 class StatsigServer:
@@ -46,6 +55,7 @@ class StatsigServer:
     def __init__(self) -> None:
         self._executor = ThreadPoolExecutor(max_workers=2)
         self._initialized = False
+        self._cache_metrics_thread: Optional[threading.Thread] = None
 
         self._errorBoundary = _StatsigErrorBoundary()
 
@@ -108,6 +118,8 @@ class StatsigServer:
             self._options = options
             self.__shutdown_event = threading.Event()
             self.__statsig_metadata = _StatsigMetadata.get()
+            if is_free_threaded():
+                globals.logger.debug("Free-threaded CPython detected, checks run in parallel across threads")
             self._errorBoundary.set_statsig_options_and_metadata(
                 self._options, self.__statsig_metadata
             )
@@ -138,7 +150,11 @@ class StatsigServer:
                 init_context
             )
 
-            self._evaluator = _Evaluator(self._spec_store, self._options.global_custom_fields, self._options.disable_ua_parser, self._options.disable_country_lookup)
+            self._evaluator = _Evaluator(self._spec_store, self._options.global_custom_fields, self._options.disable_ua_parser, self._options.disable_country_lookup,
+                                         self._options.short_circuit_rule_evaluation, self._options.order_conditions_by_cost,
+                                         self._options.evaluation_cache_size, self._options.ua_parse_cache_size,
+                                         self._options.compact_country_lookup, self._options.country_lookup_cache_size,
+                                         self._options.client_initialize_cache_bytes)
 
             init_timeout = options.overall_init_timeout
             if init_timeout is not None:
@@ -250,6 +266,47 @@ class StatsigServer:
             "check_gate", task, lambda: False, {"configName": gate_name}
         )
 
+    def check_gate_batch(self, users: Iterable[StatsigUser], gate_name: str, log_exposure=True) -> List[bool]:
+        """
+        Checks one gate for many users, in order. Cheaper than calling check_gate per user: the gate's
+        spec and overrides are looked up once and exposures are enqueued together.
+        """
+        users = list(users)
+
+        def task():
+            if not self._verify_batch_inputs(users, gate_name):
+                for _ in users:
+                    self.safe_eval_callback(FeatureGate(False, gate_name, "", ""))
+                return [False] * len(users)
+
+            normalized = self.__normalize_users(users)
+            results = self._evaluator.check_gate_batch(normalized, gate_name)
+            if log_exposure:
+                self._logger.log_gate_exposures(normalized, gate_name, results)
+            if self._options.evaluation_callback is not None:
+                for result in results:
+                    self.safe_eval_callback(FeatureGate(
+                        result.boolean_value,
+                        gate_name,
+                        result.rule_id,
+                        result.id_type,
+                        result.group_name,
+                        result.evaluation_details,
+                        result.override_config_name
+                    ))
+            return [result.boolean_value for result in results]
+
+        return self._errorBoundary.capture(
+            "check_gate_batch", task, lambda: [False] * len(users), {"configName": gate_name}
+        )
+
+    def check_gate_columnar(self, users: UserColumns, gate_name: str) -> ColumnarEvaluation:
+        """
+        Checks one gate for a columnar batch of users, e.g. for offline backfills. Requires numpy
+        (pip install statsig[columnar]). No exposures are logged.
+        """
+        return self.__evaluate_columnar(users, gate_name, EntityType.GATE, "check_gate_columnar")
+
     def manually_log_gate_exposure(self, user: StatsigUser, gate_name: str):
         user = self.__normalize_user(user)
         result = self._evaluator.check_gate(user, gate_name)
@@ -290,6 +347,56 @@ class StatsigServer:
             {"configName": config_name},
         )
 
+    def get_config_batch(self, users: Iterable[StatsigUser], config_name: str,
+                         log_exposure=True) -> List[DynamicConfig]:
+        """
+        Gets one config for many users, in order. Cheaper than calling get_config per user: the config's
+        spec and overrides are looked up once and exposures are enqueued together.
+        """
+        users = list(users)
+
+        def task():
+            if not self._verify_batch_inputs(users, config_name):
+                configs = [DynamicConfig({}, config_name, "") for _ in users]
+                for config in configs:
+                    self.safe_eval_callback(config)
+                return configs
+
+            normalized = self.__normalize_users(users)
+            results = self._evaluator.get_config_batch(normalized, config_name)
+            if log_exposure:
+                self._logger.log_config_exposures(normalized, config_name, results)
+            configs = []
+            for user, result in zip(normalized, results):
+                config = DynamicConfig(
+                    result.json_value,
+                    config_name,
+                    result.rule_id,
+                    user,
+                    group_name=result.group_name,
+                    evaluation_details=result.evaluation_details,
+                    secondary_exposures=result.secondary_exposures,
+                    passed_rule=result.boolean_value,
+                    version=result.version,
+                )
+                self.safe_eval_callback(config)
+                configs.append(config)
+            return configs
+
+        return self._errorBoundary.capture(
+            "get_config_batch",
+            task,
+            lambda: [DynamicConfig({}, config_name, "") for _ in users],
+            {"configName": config_name},
+        )
+
+    def get_config_columnar(self, users: UserColumns, config_name: str) -> ColumnarEvaluation:
+        """
+        Gets one config or experiment for a columnar batch of users, e.g. for offline backfills.
+        Requires numpy (pip install statsig[columnar]). No exposures are logged.
+        """
+        return self.__evaluate_columnar(users, config_name, EntityType.CONFIG, "get_config_columnar")
+
     def manually_log_config_exposure(self, user: StatsigUser, config_name: str):
         user = self.__normalize_user(user)
         result = self._evaluator.get_config(user, config_name)
@@ -395,6 +502,19 @@ class StatsigServer:
             {"configName": layer_name},
         )
 
+    def session(self, user: StatsigUser) -> StatsigSession:
+        """
+        Starts a StatsigSession for checking many gates, configs, experiments and layers for one user,
+        e.g. over one web request. Close it, or use it as a context manager, to log its exposures.
+        """
+        if not self._initialized:
+            raise StatsigRuntimeError(
+                "Must call initialize before checking gates/configs/experiments or logging events"
+            )
+        self._verify_user(user)
+        self._verify_bg_threads_running()
+        return StatsigSession(self, user, self.__normalize_user(user))
+
     def manually_log_layer_parameter_exposure(
             self, user: StatsigUser, layer_name: str, parameter_name: str
     ):
@@ -437,6 +557,7 @@ class StatsigServer:
         def task():
             globals.logger.info("Shutting down Statsig SDK instance.")
             self.__shutdown_event.set()
+            self._evaluator.shutdown()
             self._logger.shutdown()
             self._spec_store.shutdown()
             self._network.shutdown()
@@ -532,7 +653,7 @@ class StatsigServer:
         hash_value = hash.value if hash is not None else HashingAlgorithm.SHA256.value
 
         def task():
-            result = self._evaluator.get_client_initialize_response(
+            result = self._evaluator.client_initialize.get_response(
                 self.__normalize_user(user), hash or HashingAlgorithm.SHA256, client_sdk_key, include_local_overrides, target_app_id
             )
             if result is None:
@@ -548,11 +669,117 @@ class StatsigServer:
             "get_client_initialize_response", task, recover, {'clientKey': client_sdk_key, 'hash': hash_value}
         )
 
+    def get_client_initialize_response_bytes(
+            self, user: StatsigUser,
+            client_sdk_key: Optional[str] = None,
+            hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+            include_local_overrides: Optional[bool] = False,
+            target_app_id: Optional[str] = None,
+            encoding: Optional[str] = None,
+    ) -> Optional[bytes]:
+        hash_value = hash.value if hash is not None else HashingAlgorithm.SHA256.value
+
+        def task():
+            if encoding is not None and encoding not in CLIENT_INITIALIZE_ENCODINGS:
+                raise StatsigValueError(
+                    f"Unsupported encoding {encoding}, expected one of {', '.join(CLIENT_INITIALIZE_ENCODINGS)}")
+            result = self._evaluator.client_initialize.get_response_bytes(
+                self.__normalize_user(user), hash or HashingAlgorithm.SHA256, client_sdk_key, include_local_overrides,
+                target_app_id, encoding
+            )
+            if result is None:
+                self._errorBoundary.log_exception("get_client_initialize_response_bytes",
+                                                  StatsigValueError("Failed to get client initialize response"),
+                                                  {'clientKey': client_sdk_key, 'hash': hash_value})
+            return result
+
+        def recover():
+            return None
+
+        return self._errorBoundary.capture(
+            "get_client_initialize_response_bytes", task, recover, {'clientKey': client_sdk_key, 'hash': hash_value}
+        )
+
+    def get_client_initialize_responses(
+            self, users: Iterable[StatsigUser],
+            client_sdk_key: Optional[str] = None,
+            hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+            include_local_overrides: Optional[bool] = False,
+            target_app_id: Optional[str] = None,
+            max_workers: int = 1,
+    ) -> List[ClientInitializeResponse]:
+        """
+        Client initialize responses for many users, in order. Cheaper than calling
+        get_client_initialize_response per user: target app filtering and the responses of gates
+        and configs that don't depend on the user are done once for the batch. max_workers above 1
+        builds responses on that many threads, which only helps on free-threaded CPython.
+        """
+        users = list(users)
+        hash_value = hash.value if hash is not None else HashingAlgorithm.SHA256.value
+        extra = {'clientKey': client_sdk_key, 'hash': hash_value}
+
+        def task():
+            results = self._evaluator.client_initialize.get_responses(
+                self.__normalize_users(users), hash or HashingAlgorithm.SHA256, client_sdk_key,
+                include_local_overrides, target_app_id, max_workers
+            )
+            if users and results[0] is None:
+                self._errorBoundary.log_exception("get_client_initialize_responses",
+                                                  StatsigValueError("Failed to get client initialize response"),
+                                                  extra)
+            return results
+
+        def recover():
+            return [None] * len(users)
+
+        return self._errorBoundary.capture("get_client_initialize_responses", task, recover, extra)
+
+    def stream_client_initialize_response(
+            self, user: StatsigUser,
+            client_sdk_key: Optional[str] = None,
+            hash: Optional[HashingAlgorithm] = HashingAlgorithm.SHA256,
+            include_local_overrides: Optional[bool] = False,
+            target_app_id: Optional[str] = None,
+            encoding: Optional[str] = None,
+            chunk_size: int = DEFAULT_CLIENT_INITIALIZE_CHUNK_SIZE,
+    ) -> Optional[Iterator[bytes]]:
+        hash_value = hash.value if hash is not None else HashingAlgorithm.SHA256.value
+        extra = {'clientKey': client_sdk_key, 'hash': hash_value}
+
+        def log_failures(chunks: Iterator[bytes]):
+            # entities are evaluated as the chunks are read, after this call has returned
+            try:
+                yield from chunks
+            except Exception as e:
+                self._errorBoundary.log_exception("stream_client_initialize_response", e, extra)
+                raise
+
+        def task():
+            if encoding is not None and encoding not in CLIENT_INITIALIZE_STREAM_ENCODERS:
+                raise StatsigValueError(
+                    f"Unsupported encoding {encoding}, expected one of {', '.join(CLIENT_INITIALIZE_STREAM_ENCODERS)}")
+            chunks = self._evaluator.client_initialize.stream_response(
+                self.__normalize_user(user), hash or HashingAlgorithm.SHA256, client_sdk_key, include_local_overrides,
+                target_app_id, encoding, chunk_size
+            )
+            if chunks is None:
+                self._errorBoundary.log_exception("stream_client_initialize_response",
+                                                  StatsigValueError("Failed to get client initialize response"),
+                                                  extra)
+                return None
+            return log_failures(chunks)
+
+        def recover():
+            return None
+
+        return self._errorBoundary.capture("stream_client_initialize_response", task, recover, extra)
+
     def evaluate_all(self, user: StatsigUser):
         def task():
+            context = EvaluationContext()
             all_gates = {}
             for gate in self._spec_store.get_all_gates():
-                result = self.__check_gate(user, gate, False)
+                result = self.__check_gate(user, gate, False, context)
                 all_gates[gate] = {
                     "value": result.boolean_value,
                     "rule_id": result.rule_id,
@@ -560,7 +787,7 @@ class StatsigServer:
 
             all_configs = {}
             for config in self._spec_store.get_all_configs():
-                result = self.__get_config(user, config, False)
+                result = self.__get_config(user, config, False, context)
                 all_configs[config] = {
                     "value": result.json_value,
                     "rule_id": result.rule_id,
@@ -578,12 +805,24 @@ class StatsigServer:
                 "Must call initialize before checking gates/configs/experiments or logging events"
             )
 
-        if not user or (not user.user_id and not user.custom_ids):
-            raise StatsigValueError(
-                "A non-empty StatsigUser with user_id or custom_ids is required. See "
-                "https://docs.statsig.com/messages/serverRequiredUserID"
+        self._verify_user(user)
+
+        if not variable_name:
+            return False
+
+        self._verify_bg_threads_running()
+
+        return True
+
+    def _verify_batch_inputs(self, users: List[StatsigUser], variable_name: str):
+        if not self._initialized:
+            raise StatsigRuntimeError(
+                "Must call initialize before checking gates/configs/experiments or logging events"
             )
 
+        for user in users:
+            self._verify_user(user)
+
         if not variable_name:
             return False
 
@@ -591,6 +830,13 @@ class StatsigServer:
 
         return True
 
+    def _verify_user(self, user: StatsigUser):
+        if not user or (not user.user_id and not user.custom_ids):
+            raise StatsigValueError(
+                "A non-empty StatsigUser with user_id or custom_ids is required. See "
+                "https://docs.statsig.com/messages/serverRequiredUserID"
+            )
+
     def _verify_bg_threads_running(self):
         if self._logger is not None:
             self._logger.spawn_bg_threads_if_needed()
@@ -601,9 +847,30 @@ class StatsigServer:
         if self._network is not None:
             self._network.spawn_bg_threads_if_needed()
 
-    def __check_gate(self, user: StatsigUser, gate_name: str, log_exposure=True):
+        if self._evaluator is not None:
+            self.__spawn_cache_metrics_thread_if_needed()
+
+    def __spawn_cache_metrics_thread_if_needed(self):
+        # cache hit/miss counts are reported from here, so lookups never call the observability client
+        options = self._options
+        if not (options.evaluation_cache_size or options.ua_parse_cache_size or options.country_lookup_cache_size
+                or options.client_initialize_cache_bytes):
+            return
+        if self._cache_metrics_thread is None or not self._cache_metrics_thread.is_alive():
+            self._cache_metrics_thread = spawn_background_thread(
+                "cache_metrics_flush",
+                self._sync,
+                (self.__flush_cache_metrics, CACHE_METRICS_FLUSH_INTERVAL),
+                self._errorBoundary,
+            )
+
+    def __flush_cache_metrics(self):
+        self._evaluator.flush_cache_metrics()
+
+    def __check_gate(self, user: StatsigUser, gate_name: str, log_exposure=True,
+                     context: Optional[EvaluationContext] = None):
         user = self.__normalize_user(user)
-        result = self._evaluator.check_gate(user, gate_name)
+        result = self._evaluator.check_gate(user, gate_name, context=context)
 
         if log_exposure:
             self._logger.log_gate_exposure(
@@ -613,10 +880,11 @@ class StatsigServer:
             )
         return result
 
-    def __get_config(self, user: StatsigUser, config_name: str, log_exposure=True):
+    def __get_config(self, user: StatsigUser, config_name: str, log_exposure=True,
+                     context: Optional[EvaluationContext] = None):
         user = self.__normalize_user(user)
 
-        result = self._evaluator.get_config(user, config_name)
+        result = self._evaluator.get_config(user, config_name, context)
         result.user = user
 
         if log_exposure:
@@ -636,6 +904,36 @@ class StatsigServer:
             userCopy._statsig_environment = {"tier": default_env}
         return userCopy
 
+    def __evaluate_columnar(self, users: UserColumns, name: str, entity_type: EntityType, tag: str):
+        def task():
+            if not self._initialized:
+                raise StatsigRuntimeError(
+                    "Must call initialize before checking gates/configs/experiments or logging events"
+                )
+            environment = self._options._environment
+            default_env = self._spec_store.get_default_environment()
+            if environment is None and default_env is not None:
+                environment = {"tier": default_env}
+            return _ColumnarEvaluator(self._evaluator, self._spec_store, users, environment).evaluate(name, entity_type)
+
+        return self._errorBoundary.capture(tag, task, lambda: default_columnar_evaluation(len(users)),
+                                           {"configName": name})
+
+    def __normalize_users(self, users: List[StatsigUser]) -> List[StatsigUser]:
+        # Same as __normalize_user, but a shallow copy: the users already went through __post_init__
+        # when they were built, so re-running it through dataclasses.replace only costs time
+        environment = self._options._environment if self._options is not None else None
+        default_env = self._spec_store.get_default_environment()
+        normalized = []
+        for user in users:
+            userCopy = copy.copy(user)
+            if environment is not None:
+                userCopy._statsig_environment = environment
+            if userCopy._statsig_environment is None and default_env is not None:
+                userCopy._statsig_environment = {"tier": default_env}
+            normalized.append(userCopy)
+        return normalized
+
     def _sync(self, sync_func, interval):
         while True:
             try:
@@ -0,0 +1,166 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from .config_evaluation import _ConfigEvaluation
+from .dynamic_config import DynamicConfig
+from .evaluation_context import EvaluationContext
+from .feature_gate import FeatureGate
+from .layer import Layer
+from .spec_store import EntityType
+from .statsig_logger import _Exposure
+from .statsig_user import StatsigUser
+
+if TYPE_CHECKING:
+    from .statsig_server import StatsigServer
+
+
+class StatsigSession:
+    """
+    Gate, config, experiment and layer checks for one user over one request, e.g. a web request
+    that checks the same user dozens of times. Create it with StatsigServer.session(user), ideally
+    as a context manager:
+
+        with statsig_server.session(user) as session:
+            if session.check_gate("new_checkout"):
+                ...
+
+    The user is normalized once, each result is evaluated once and then reused, and every check
+    reads the config specs snapshot the first one saw, so a config sync in the middle of the
+    request does not change answers or mix old and new specs. Exposures are
+    deduplicated within the session and handed to the logger together when the session closes.
+    A session is meant for a single request and is not thread safe.
+    """
+
+    def __init__(self, server: "StatsigServer", user: StatsigUser, normalized_user: StatsigUser):
+        self._server = server
+        self._user = user
+        self._normalized_user = normalized_user
+        self._context = EvaluationContext()
+        self._results: Dict[Tuple[EntityType, str], _ConfigEvaluation] = {}
+        self._exposures: List[_Exposure] = []
+        self._exposed: Set[Tuple[EntityType, str, str]] = set()
+        self._closed = False
+
+    def __enter__(self) -> "StatsigSession":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def user(self) -> StatsigUser:
+        return self._user
+
+    def check_gate(self, gate_name: str, log_exposure=True) -> bool:
+        return self.get_feature_gate(gate_name, log_exposure).value
+
+    def get_feature_gate(self, gate_name: str, log_exposure=True) -> FeatureGate:
+        result = self.__evaluate(EntityType.GATE, gate_name, "session_get_feature_gate")
+        if result is None:
+            feature_gate = FeatureGate(False, gate_name, "", "")
+        else:
+            if log_exposure:
+                self.__expose(_Exposure(EntityType.GATE, gate_name, result))
+            feature_gate = FeatureGate(
+                result.boolean_value,
+                gate_name,
+                result.rule_id,
+                result.id_type,
+                result.group_name,
+                result.evaluation_details,
+                result.override_config_name
+            )
+        self._server.safe_eval_callback(feature_gate)
+        return feature_gate
+
+    def get_config(self, config_name: str, log_exposure=True) -> DynamicConfig:
+        return self.__get_config(config_name, log_exposure, self._normalized_user, "session_get_config")
+
+    def get_experiment(self, experiment_name: str, log_exposure=True) -> DynamicConfig:
+        return self.__get_config(experiment_name, log_exposure, self._user, "session_get_experiment")
+
+    def get_layer(self, layer_name: str, log_exposure=True) -> Layer:
+        result = self.__evaluate(EntityType.LAYER, layer_name, "session_get_layer")
+        if result is None:
+            layer = Layer._create(layer_name, {}, "")
+        else:
+            def log_func(layer: Layer, parameter_name: str):
+                if log_exposure:
+                    self.__expose(_Exposure(EntityType.LAYER, layer_name, result, layer, parameter_name))
+
+            layer = Layer._create(
+                layer_name,
+                result.json_value,
+                result.rule_id,
+                result.group_name,
+                result.allocated_experiment,
+                log_func,
+                evaluation_details=result.evaluation_details
+            )
+        self._server.safe_eval_callback(layer)
+        return layer
+
+    def flush(self):
+        """Hands the exposures gathered so far to the logger."""
+        if not self._exposures:
+            return
+        exposures = self._exposures
+        self._exposures = []
+        self._server._errorBoundary.swallow(
+            "session_flush", lambda: self._server._logger.log_exposures(self._normalized_user, exposures))
+
+    def close(self):
+        """Flushes the session's exposures. Exposures from checks after closing are logged right away."""
+        self._closed = True
+        self.flush()
+
+    def __get_config(self, config_name: str, log_exposure: bool, config_user: StatsigUser, tag: str):
+        result = self.__evaluate(EntityType.CONFIG, config_name, tag)
+        if result is None:
+            config = DynamicConfig({}, config_name, "")
+        else:
+            if log_exposure:
+                self.__expose(_Exposure(EntityType.CONFIG, config_name, result))
+            config = DynamicConfig(
+                result.json_value,
+                config_name,
+                result.rule_id,
+                config_user,
+                group_name=result.group_name,
+                evaluation_details=result.evaluation_details,
+                secondary_exposures=result.secondary_exposures,
+                passed_rule=result.boolean_value,
+                version=result.version,
+            )
+        self._server.safe_eval_callback(config)
+        return config
+
+    def __evaluate(self, entity_type: EntityType, name: str, tag: str) -> Optional[_ConfigEvaluation]:
+        if not name:
+            return None
+        key = (entity_type, name)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        def task():
+            evaluator = self._server._evaluator
+            if entity_type == EntityType.GATE:
+                evaluation = evaluator.check_gate(self._normalized_user, name, context=self._context)
+            elif entity_type == EntityType.CONFIG:
+                evaluation = evaluator.get_config(self._normalized_user, name, self._context)
+                evaluation.user = self._normalized_user
+            else:
+                evaluation = evaluator.get_layer(self._normalized_user, name, self._context)
+            self._results[key] = evaluation
+            return evaluation
+
+        return self._server._errorBoundary.capture(tag, task, lambda: None, {"configName": name})
+
+    def __expose(self, exposure: _Exposure):
+        key = (exposure.entity_type, exposure.name, exposure.parameter_name)
+        if key in self._exposed:
+            return
+        self._exposed.add(key)
+        self._exposures.append(exposure)
+        if self._closed:
+            self.flush()
@@ -213,6 +213,15 @@ class StatsigTelemetryLogger(AutoTryCatch):
         self.distribution("config_sync_overall.latency", duration_ms, tags)
 
 
+    def log_cache_stats(self, cache: str, hits: int, misses: int, evictions: int, size: int) -> None:
+        if hits:
+            self.increment(f"{cache}.hit_count", hits)
+        if misses:
+            self.increment(f"{cache}.miss_count", misses)
+        if evictions:
+            self.increment(f"{cache}.eviction_count", evictions)
+        self.gauge(f"{cache}.size", size)
+
     def log_sdk_exception(self, tag: str, exception: Exception):
         if self.sdk_error_callback is not None:
             self.sdk_error_callback(tag, exception)
@@ -0,0 +1,110 @@
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Below this many targets a plain loop of `in` checks beats walking the automaton in Python,
+# and str.startswith/endswith with a tuple beats slicing once per distinct target length
+AHO_CORASICK_MIN_TARGETS = 32
+AFFIX_SET_MIN_TARGETS = 32
+
+
+class _AhoCorasick:
+    """
+    An Aho-Corasick automaton over a set of strings, answering whether any of them occurs in a
+    text with one pass over the text regardless of how many strings there are.
+    """
+    __slots__ = ("_goto", "_fail", "_matches")
+
+    def __init__(self, patterns: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._matches: List[bool] = [False]
+
+        for pattern in patterns:
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._matches.append(False)
+                state = next_state
+            self._matches[state] = True
+
+        # breadth first, so a state's fail link is resolved before the states below it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._matches[next_state] = self._matches[next_state] or self._matches[fail]
+                queue.append(next_state)
+
+    def search(self, text: str) -> bool:
+        goto, fail, matches = self._goto, self._fail, self._matches
+        if matches[0]:
+            return True
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if matches[state]:
+                return True
+        return False
+
+
+def _affix_set_matcher(targets: Sequence[str], prefix: bool) -> Callable[[str], bool]:
+    """Looks up the value's prefix (or suffix) of each distinct target length in a set."""
+    if "" in targets:
+        return lambda value: True
+    target_set = frozenset(targets)
+    lengths = tuple(sorted({len(t) for t in targets}))
+
+    if prefix:
+        def matches(value: str) -> bool:
+            for length in lengths:
+                if length > len(value):
+                    return False
+                if value[:length] in target_set:
+                    return True
+            return False
+    else:
+        def matches(value: str) -> bool:
+            for length in lengths:
+                if length > len(value):
+                    return False
+                if value[-length:] in target_set:
+                    return True
+            return False
+
+    return matches
+
+
+def build_string_matcher(operator: str, target) -> Optional[Callable[[str], bool]]:
+    """
+    A function telling whether a casefolded user value starts with, ends with or contains any
+    of the targets, for the str_*_any / str_contains_none operators. None when the target is
+    not a list, those keep the generic loop.
+    """
+    if not isinstance(target, list):
+        return None
+    targets = tuple(str(t).casefold() for t in target if t is not None)
+
+    if operator in ("str_starts_with_any", "str_ends_with_any"):
+        prefix = operator == "str_starts_with_any"
+        if len(targets) >= AFFIX_SET_MIN_TARGETS:
+            return _affix_set_matcher(targets, prefix)
+        if prefix:
+            return lambda value: value.startswith(targets)
+        return lambda value: value.endswith(targets)
+    if operator in ("str_contains_any", "str_contains_none"):
+        if len(targets) >= AHO_CORASICK_MIN_TARGETS:
+            return _AhoCorasick(targets).search
+        return lambda value: any(t in value for t in targets)
+    return None
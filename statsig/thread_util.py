@@ -1,3 +1,4 @@
+import sys
 import threading
 from typing import Callable, Optional
 
@@ -6,6 +7,11 @@ from .statsig_error_boundary import _StatsigErrorBoundary
 THREAD_JOIN_TIMEOUT = 10.0
 
 
+def is_free_threaded() -> bool:
+    """True on a free-threaded CPython build (3.13t and later) running with the GIL disabled."""
+    return not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
 def spawn_background_thread(name: str,
                             task: Callable[..., None],
                             args: tuple,
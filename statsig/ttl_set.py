@@ -1,28 +1,33 @@
-import threading
-
 from . import globals
 from .thread_util import spawn_background_thread
 
 
 class TTLSet:
+    """
+    A set of keys cleared every reset_interval seconds. Lock free: keys are added with the
+    atomic dict.setdefault and a reset publishes a new dict, so concurrent checks never wait on
+    each other, with or without the GIL.
+    """
+
     def __init__(self, shutdown_event):
-        self.store = set()
-        self.lock = threading.Lock()
+        self.store: dict = {}
         self.reset_interval = 60
         self.shutdown_event = shutdown_event
         self.start_reset_thread()
 
     def add(self, key):
-        with self.lock:
-            self.store.add(key)
+        self.store[key] = True
+
+    def add_if_absent(self, key) -> bool:
+        """Adds the key, returning False if it was already there. Exactly one concurrent caller gets True."""
+        token = object()
+        return self.store.setdefault(key, token) is token
 
     def contains(self, key):
-        with self.lock:
-            return key in self.store
+        return key in self.store
 
     def reset(self):
-        with self.lock:
-            self.store.clear()
+        self.store = {}
 
     def start_reset_thread(self):
         """Starts a thread to reset the set every minute."""
@@ -1,7 +1,7 @@
 import hashlib
 import json
 from enum import Enum
-from struct import unpack
+from struct import Struct
 from typing import Optional, Dict, Any, Mapping, Union, Sequence # pylint: disable=unused-import
 from typing_extensions import TypeAliasType
 
@@ -61,8 +61,12 @@ def get_or_default(val: Optional[Any], default: Any):
     return val
 
 
+# reads the first 8 bytes of a digest without slicing it first
+_unpack_uint64 = Struct('>Q').unpack_from
+
+
 def sha256_hash(key: str) -> int:
-    return unpack('>Q', hashlib.sha256(str(key).encode('utf-8')).digest()[:8])[0]
+    return _unpack_uint64(hashlib.sha256(str(key).encode('utf-8')).digest())[0]
 
 
 # Constants
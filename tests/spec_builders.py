@@ -0,0 +1,40 @@
+"""
+Builders for download_config_specs entries, for tests whose specs are not in testdata/*.json.
+Keyword arguments that are not parameters are copied onto the entry as they are, under their
+download_config_specs names (e.g. isExperimentGroup=True, explicitParameters=["color"]).
+"""
+
+DEFAULT_TIME = 1631638014811
+
+
+def condition(type, operator=None, target=None, field=None, id_type="userID", salt=None):
+    return {"type": type, "operator": operator, "targetValue": target, "field": field, "idType": id_type,
+            "additionalValues": {} if salt is None else {"salt": salt}}
+
+
+def rule(id, conditions, return_value=True, pass_percentage=100, id_type="userID", group_name=None,
+         delegate=None, sampling_rate=None, **extra):
+    built = {"name": id, "id": id, "salt": id, "passPercentage": pass_percentage, "conditions": conditions,
+             "returnValue": return_value, "idType": id_type, **extra}
+    if group_name is not None:
+        built["groupName"] = group_name
+    if delegate is not None:
+        built["configDelegate"] = delegate
+    if sampling_rate is not None:
+        built["samplingRate"] = sampling_rate
+    return built
+
+
+def named_rule(id, conditions, pass_percentage=100, **kwargs):
+    """A rule whose group name and return value both name it, so results show which rule matched."""
+    return rule(id, conditions, {"rule": id}, pass_percentage, group_name=id, **kwargs)
+
+
+def spec(name, type, rules, default_value, enabled=True, id_type="userID", entity=None, **extra):
+    return {"name": name, "type": type, "salt": name, "enabled": enabled, "defaultValue": default_value,
+            "rules": rules, "idType": id_type, "entity": entity or type, **extra}
+
+
+def config_specs(feature_gates=(), dynamic_configs=(), layer_configs=(), time=DEFAULT_TIME, **extra):
+    return {"feature_gates": list(feature_gates), "dynamic_configs": list(dynamic_configs),
+            "layer_configs": list(layer_configs), "has_updates": True, "time": time, **extra}
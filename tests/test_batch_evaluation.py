@@ -0,0 +1,135 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from gzip_helpers import GzipHelpers
+from network_stub import NetworkStub
+from spec_builders import condition, rule
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.batch_event_queue import EventBatchProcessor
+from statsig.statsig_errors import StatsigValueError
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                       '../testdata/download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+
+# send users with "mapped" in their email from test_config to sample_experiment
+CONFIG_SPECS["overrides"] = {
+    "test_config": [{"new_config_name": "sample_experiment", "rules": [{"rule_name": "mapped_users"}]}],
+}
+CONFIG_SPECS["override_rules"] = {
+    "mapped_users": rule("mapped_users", [condition("user_field", "str_contains_any", ["mapped"], "email")]),
+}
+
+GATES = [gate["name"] for gate in CONFIG_SPECS["feature_gates"]] + ["not_a_gate"]
+CONFIGS = [config["name"] for config in CONFIG_SPECS["dynamic_configs"]] + ["not_a_config"]
+
+USERS = [StatsigUser(f"user_{i}", email=email, ip="24.5.0.0" if i % 3 else "81.2.69.160",
+                     user_agent="Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X)" if i % 4 else None,
+                     custom_ids={"companyID": f"company_{i % 5}"})
+         for i, email in enumerate(["someone@statsig.com", "mapped@statsig.com", "mapped@gmail.com", None,
+                                    "someone@gmail.com"] * 20)]
+
+_network_stub = NetworkStub("http://test-batch-evaluation")
+
+
+@patch('requests.Session.request', side_effect=_network_stub.mock)
+class TestBatchEvaluation(unittest.TestCase):
+    _events = []
+
+    @classmethod
+    def setUpClass(cls):
+        _network_stub.reset()
+        _network_stub.stub_request_with_value("download_config_specs/.*", 200, CONFIG_SPECS)
+
+        def log_event_callback(url: str, **kwargs):
+            cls._events.extend(GzipHelpers.decode_body(kwargs)["events"])
+
+        _network_stub.stub_request_with_function("log_event", 202, log_event_callback)
+
+    def setUp(self):
+        TestBatchEvaluation._events = []
+
+    def _start(self, **kwargs):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            api=_network_stub.host, disable_diagnostics=True, tier="staging", **kwargs))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _exposures(self):
+        return sorted(
+            json.dumps([event["eventName"], event["user"], event["secondaryExposures"],
+                        {key: value for key, value in event["metadata"].items() if key not in ("serverTime", "initTime")}],
+                       sort_keys=True)
+            for event in TestBatchEvaluation._events if event["eventName"] != "statsig::diagnostics")
+
+    def test_gates_match_check_gate(self, mock_request):
+        server = self._start()
+        for gate in GATES:
+            expected = [server.get_feature_gate(user, gate, log_exposure=False) for user in USERS]
+            self.assertEqual(server.check_gate_batch(USERS, gate, log_exposure=False),
+                             [result.value for result in expected], gate)
+
+    def test_configs_match_get_config(self, mock_request):
+        server = self._start()
+        for config in CONFIGS:
+            expected = [server.get_config(user, config, log_exposure=False) for user in USERS]
+            actual = server.get_config_batch(iter(USERS), config, log_exposure=False)
+            self.assertEqual(len(actual), len(expected))
+            for got, want in zip(actual, expected):
+                self.assertEqual((got.value, got.rule_id, got.group_name, got.secondary_exposures,
+                                  got.evaluation_details.reason, got.user),
+                                 (want.value, want.rule_id, want.group_name, want.secondary_exposures,
+                                  want.evaluation_details.reason, want.user), config)
+        self.assertEqual(server.get_config_batch([USERS[1]], "test_config")[0].rule_id,
+                         server.get_config(USERS[1], "sample_experiment").rule_id)
+
+    def test_exposures_match_single_calls(self, mock_request):
+        server = self._start()
+        for user in USERS:
+            server.check_gate(user, "on_for_statsig_email")
+            server.get_config(user, "test_config")
+        server.shutdown()
+        expected = self._exposures()
+
+        TestBatchEvaluation._events = []
+        server = self._start(event_queue_size=30)
+        with patch.object(EventBatchProcessor, "add_event", wraps=server._logger.event_batch_processor.add_event) \
+                as add_event:
+            server.check_gate_batch(USERS, "on_for_statsig_email")
+            server.get_config_batch(USERS, "test_config")
+            add_event.assert_not_called()
+        server.shutdown()
+
+        self.assertEqual(len(expected), 2 * len(USERS))
+        self.assertEqual(self._exposures(), expected)
+
+    def test_overrides(self, mock_request):
+        server = self._start()
+        server.override_gate("always_on_gate", False, "user_1")
+        server.override_config("test_config", {"overridden": True})
+        self.assertEqual(server.check_gate_batch(USERS[:3], "always_on_gate"), [True, False, True])
+        self.assertEqual([config.value for config in server.get_config_batch(USERS[:2], "test_config")],
+                         [{"overridden": True}] * 2)
+
+    def test_invalid_inputs(self, mock_request):
+        server = self._start()
+        self.assertEqual(server.check_gate_batch(USERS[:2], ""), [False, False])
+        self.assertEqual([config.value for config in server.get_config_batch(USERS[:2], "")], [{}, {}])
+        self.assertEqual(server.check_gate_batch([], "always_on_gate"), [])
+        with self.assertRaises(StatsigValueError):
+            server.check_gate_batch([USERS[0], None], "always_on_gate")
+
+    def test_evaluation_callback(self, mock_request):
+        seen = []
+        server = self._start(evaluation_callback=seen.append)
+        server.check_gate_batch(USERS[:3], "always_on_gate")
+        server.get_config_batch(USERS[:2], "test_config")
+        self.assertEqual([result.name for result in seen], ["always_on_gate"] * 3 + ["test_config"] * 2)
+        self.assertEqual([result.value for result in seen[:3]], [True] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
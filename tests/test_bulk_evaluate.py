@@ -0,0 +1,120 @@
+import base64
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from hashlib import sha256
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.bulk_evaluate import main
+
+SPECS_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), '../testdata/download_config_specs.json')
+with open(SPECS_PATH) as r:
+    CONFIG_SPECS = r.read()
+
+GATES = ["always_on_gate", "on_for_statsig_email", "on_for_id_list", "test_country", "test_ua"]
+CONFIGS = ["test_config", "sample_experiment"]
+
+USERS = [StatsigUser(f"user_{i}", email=email, ip="24.5.0.0" if i % 3 else "81.2.69.160",
+                     user_agent="Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X)" if i % 4 else None,
+                     custom={"level": i % 10}, custom_ids={"companyID": f"company_{i % 5}"})
+         for i, email in enumerate(["someone@statsig.com", None, "someone@gmail.com"] * 15)]
+LISTED_USERS = ["user_1", "user_4", "user_30"]
+
+
+def _hashed(id):
+    return base64.b64encode(sha256(id.encode('utf-8')).digest()).decode('utf-8')[0:8]
+
+
+class TestBulkEvaluate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(local_mode=True, bootstrap_values=CONFIG_SPECS,
+                                                       disable_diagnostics=True))
+        server._spec_store.load_local_id_list("list_1", "".join(f"+{_hashed(id)}\n" for id in LISTED_USERS))
+        cls.expected = [{
+            "userID": user.user_id,
+            "customIDs": user.custom_ids,
+            "gates": {gate: server.check_gate(user, gate, log_exposure=False) for gate in GATES},
+            "configs": {config: {"value": result.value, "rule_id": result.rule_id, "group_name": result.group_name}
+                        for config, result in
+                        ((config, server.get_config(user, config, log_exposure=False)) for config in CONFIGS)},
+        } for user in USERS]
+        server.shutdown()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        self.id_list = self._write("list_1.txt", "".join(f"+{_hashed(id)}\n" for id in LISTED_USERS + ["user_2"])
+                                   + f"-{_hashed('user_2')}\n")
+
+    def _write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, "w", newline="") as file:
+            file.write(content)
+        return path
+
+    def _run(self, users_path, output_name, *args):
+        output = os.path.join(self.dir, output_name)
+        report = io.StringIO()
+        argv = ["--specs", SPECS_PATH, "--users", users_path, "--output", output, "--id-list",
+                f"list_1={self.id_list}", "--chunk-size", "7"]
+        for gate in GATES:
+            argv += ["--gate", gate]
+        for config in CONFIGS:
+            argv += ["--experiment", config]
+        with contextlib.redirect_stderr(report):
+            self.assertEqual(main(argv + list(args)), 0)
+        with open(output, newline="") as file:
+            return file.read(), report.getvalue()
+
+    def _jsonl_users(self):
+        return self._write("users.jsonl", "".join(json.dumps(user.to_dict(True)) + "\n" for user in USERS))
+
+    def test_jsonl_matches_server(self):
+        for workers in ("1", "3"):
+            output, report = self._run(self._jsonl_users(), "results.jsonl", "--workers", workers)
+            self.assertEqual([json.loads(line) for line in output.splitlines()], self.expected)
+            self.assertIn(f"evaluated {len(USERS)} users (0 invalid)", report)
+            self.assertIn("users/sec", report)
+        self.assertEqual(sum(result["gates"]["on_for_id_list"] for result in self.expected), len(LISTED_USERS))
+
+    def test_csv(self):
+        columns = ["userID", "email", "ip", "userAgent", "custom.level", "customIDs.companyID"]
+        users = io.StringIO()
+        writer = csv.writer(users)
+        writer.writerow(columns)
+        for user in USERS:
+            writer.writerow([user.user_id, user.email or "", user.ip, user.user_agent or "", user.custom["level"],
+                             user.custom_ids["companyID"]])
+        output, _ = self._run(self._write("users.csv", users.getvalue()), "results.csv", "--workers", "2")
+        rows = list(csv.DictReader(io.StringIO(output)))
+        self.assertEqual(len(rows), len(USERS))
+        for row, expected in zip(rows, self.expected):
+            self.assertEqual(row["userID"], expected["userID"])
+            self.assertEqual({gate: row[gate] == "true" for gate in GATES}, expected["gates"])
+            for config in CONFIGS:
+                self.assertEqual(row[f"{config}.rule_id"], expected["configs"][config]["rule_id"])
+                self.assertEqual(json.loads(row[f"{config}.value"]), expected["configs"][config]["value"])
+
+    def test_invalid_users_keep_their_place(self):
+        users = self._write("users.jsonl", '{"userID": "user_0"}\n{"email": "a@b.com"}\nnot json\n[]\n'
+                                           '{"customIDs": {"companyID": "c"}}\n')
+        output, report = self._run(users, "results.jsonl", "--workers", "1")
+        results = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([("error" in result) for result in results], [False, True, True, True, False])
+        self.assertEqual(results[4]["customIDs"], {"companyID": "c"})
+        self.assertIn("evaluated 5 users (3 invalid)", report)
+
+    def test_requires_something_to_evaluate(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main(["--specs", SPECS_PATH, "--users", self._jsonl_users()])
+
+
+if __name__ == '__main__':
+    unittest.main()
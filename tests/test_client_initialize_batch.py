@@ -0,0 +1,90 @@
+import json
+import os
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from spec_builders import condition, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.utils import HashingAlgorithm
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), '../testdata/download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+# real responses always carry an idType, the client initialize response reads it
+for entry in CONFIG_SPECS["feature_gates"] + CONFIG_SPECS["dynamic_configs"]:
+    entry.setdefault("idType", "userID")
+CONFIG_SPECS["feature_gates"] += [
+    dict(CONFIG_SPECS["feature_gates"][1], name="disabled_gate", enabled=False),
+    dict(CONFIG_SPECS["feature_gates"][0], name="web_only_gate", targetAppIDs=["web"]),
+]
+CONFIG_SPECS["dynamic_configs"] += [
+    spec("launched_experiment", "dynamic_config", [
+        rule("launch", [condition("public")], {"color": "blue"}, group_name="Launched")], {"color": "red"},
+         entity="experiment", salt="launched", isActive=False, targetAppIDs=["web", "ios"]),
+]
+for entry in CONFIG_SPECS["feature_gates"][:3] + CONFIG_SPECS["layer_configs"]:
+    entry["targetAppIDs"] = ["web"]
+CONFIG_SPECS["sdk_keys_to_app_ids"] = {"client-web": "web", "client-ios": "ios"}
+
+USERS = [StatsigUser("123", email="testuser@statsig.com"), StatsigUser("456", custom_ids={"companyID": "c1"}),
+         StatsigUser("789", email="someone@example.com", country="US"), StatsigUser(None, custom_ids={"stableID": "s"})]
+
+
+class TestClientInitializeBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(self.server.shutdown)
+
+    def test_matches_one_user_at_a_time(self):
+        for algorithm in HashingAlgorithm:
+            for options in ({}, {"client_sdk_key": "client-web"}, {"client_sdk_key": "client-ios"},
+                            {"target_app_id": "web"}):
+                responses = self.server.get_client_initialize_responses(USERS, hash=algorithm, **options)
+                expected = [self.server.get_client_initialize_response(user, hash=algorithm, **options)
+                            for user in USERS]
+                self.assertEqual(responses, expected, (algorithm, options))
+
+        ios = self.server.get_client_initialize_responses(USERS, hash=HashingAlgorithm.NONE,
+                                                          client_sdk_key="client-ios")
+        self.assertEqual(list(ios[0]["dynamic_configs"]), ["launched_experiment"])
+        self.assertEqual(ios[0]["feature_gates"], {})
+
+    def test_parallel_matches_sequential(self):
+        users = USERS * 5
+        self.assertEqual(self.server.get_client_initialize_responses(users, max_workers=4),
+                         self.server.get_client_initialize_responses(users))
+
+    def test_constant_entities_are_built_once(self):
+        evaluator = self.server._evaluator
+        evaluate = evaluator._Evaluator__evaluate
+        evaluations = Counter()
+
+        def counting_evaluate(user, config_name, *args, **kwargs):
+            evaluations[config_name] += 1
+            return evaluate(user, config_name, *args, **kwargs)
+
+        with patch.object(evaluator, "_Evaluator__evaluate", side_effect=counting_evaluate):
+            responses = self.server.get_client_initialize_responses(USERS, hash=HashingAlgorithm.NONE)
+
+        self.assertEqual(evaluations["disabled_gate"], 1)
+        self.assertEqual(evaluations["launched_experiment"], 1)
+        self.assertEqual(evaluations["b_layer_no_alloc"], 1)
+        self.assertEqual(evaluations["on_for_statsig_email"], len(USERS))
+
+        responses[0]["feature_gates"]["always_on_gate"]["secondary_exposures"].append({})
+        responses[0]["dynamic_configs"]["launched_experiment"]["group_name"] = "changed"
+        self.assertEqual(responses[1]["feature_gates"]["always_on_gate"]["secondary_exposures"], [])
+        self.assertEqual(responses[1]["dynamic_configs"]["launched_experiment"]["group_name"], "Launched")
+
+    def test_local_overrides_of_constant_entities(self):
+        self.server.override_gate("always_on_gate", False, "456")
+        responses = self.server.get_client_initialize_responses(USERS, hash=HashingAlgorithm.NONE,
+                                                                include_local_overrides=True)
+        self.assertEqual([response["feature_gates"]["always_on_gate"]["value"] for response in responses],
+                         [True, False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
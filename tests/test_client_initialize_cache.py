@@ -0,0 +1,136 @@
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+
+import brotli
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.client_initialize_formatter import ClientInitializeResponseFormatter
+from statsig.evaluation_details import DataSource
+from statsig.statsig_errors import StatsigValueError
+from statsig.utils import HashingAlgorithm
+
+
+def _gate(name, conditions):
+    return spec(name, "feature_gate", [rule(name, conditions, group_name=name)], False)
+
+
+CONFIG_SPECS = config_specs(feature_gates=[
+    _gate("employees", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")]),
+    _gate("allowlisted", [condition("unit_id", "in_segment_list", "segment:allowlist")]),
+])
+
+USER = StatsigUser("123", email="someone@statsig.com")
+
+
+class TestClientInitializeCache(unittest.TestCase):
+    def _start(self, specs=None, cache_bytes=1 << 20):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(specs or CONFIG_SPECS), disable_diagnostics=True,
+            client_initialize_cache_bytes=cache_bytes))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _count_builds(self):
+        return patch.object(ClientInitializeResponseFormatter, "get_formatted_response",
+                            wraps=ClientInitializeResponseFormatter.get_formatted_response)
+
+    def test_hits_return_independent_copies(self):
+        server = self._start()
+        with self._count_builds() as built:
+            first = server.get_client_initialize_response(USER)
+            first["feature_gates"].clear()
+            second = server.get_client_initialize_response(USER)
+            server.get_client_initialize_response(USER, hash=HashingAlgorithm.NONE)
+        self.assertEqual(built.call_count, 2)
+        self.assertEqual(len(second["feature_gates"]), 2)
+        self.assertEqual(second, self._start(cache_bytes=0).get_client_initialize_response(USER))
+
+    def test_bytes_match_the_response(self):
+        server = self._start()
+        response = server.get_client_initialize_response(USER, hash=HashingAlgorithm.DJB2)
+        payload = server.get_client_initialize_response_bytes(USER, hash=HashingAlgorithm.DJB2)
+        self.assertEqual(json.loads(payload), response)
+
+        with self._count_builds() as built:
+            gzipped = server.get_client_initialize_response_bytes(USER, hash=HashingAlgorithm.DJB2, encoding="gzip")
+            brotlied = server.get_client_initialize_response_bytes(USER, hash=HashingAlgorithm.DJB2, encoding="br")
+            self.assertIs(server.get_client_initialize_response_bytes(
+                USER, hash=HashingAlgorithm.DJB2, encoding="gzip"), gzipped)
+        self.assertEqual(built.call_count, 0)
+        self.assertEqual(gzip.decompress(gzipped), payload)
+        self.assertEqual(brotli.decompress(brotlied), payload)
+
+        with self.assertRaises(StatsigValueError):
+            server.get_client_initialize_response_bytes(USER, encoding="deflate")
+
+    def test_bytes_without_cache(self):
+        server = self._start(cache_bytes=0)
+        payload = server.get_client_initialize_response_bytes(USER, encoding="gzip")
+        self.assertEqual(json.loads(gzip.decompress(payload)), server.get_client_initialize_response(USER))
+
+    def test_dropped_on_spec_sync(self):
+        server = self._start()
+        server.get_client_initialize_response(USER)
+        specs = dict(CONFIG_SPECS, time=CONFIG_SPECS["time"] + 1,
+                     feature_gates=CONFIG_SPECS["feature_gates"][:1])
+        server._spec_store._process_specs(specs, DataSource.NETWORK)
+        with self._count_builds() as built:
+            response = server.get_client_initialize_response(USER, hash=HashingAlgorithm.NONE)
+        self.assertEqual(built.call_count, 1)
+        self.assertEqual(list(response["feature_gates"]), ["employees"])
+
+    def test_dropped_on_override(self):
+        server = self._start()
+        server.get_client_initialize_response(USER, include_local_overrides=True)
+        server.override_gate("allowlisted", True, "123")
+        response = server.get_client_initialize_response(USER, hash=HashingAlgorithm.NONE,
+                                                         include_local_overrides=True)
+        self.assertTrue(response["feature_gates"]["allowlisted"]["value"])
+
+    def test_id_list_change_invalidates(self):
+        server = self._start()
+        response = server.get_client_initialize_response(USER, hash=HashingAlgorithm.NONE)
+        self.assertFalse(response["feature_gates"]["allowlisted"]["value"])
+        server._spec_store.load_local_id_list("segment:allowlist", "+pmWkWSBC\n")
+        response = server.get_client_initialize_response(USER, hash=HashingAlgorithm.NONE)
+        self.assertTrue(response["feature_gates"]["allowlisted"]["value"])
+
+    def test_time_dependent_specs_are_not_cached(self):
+        specs = dict(CONFIG_SPECS, feature_gates=CONFIG_SPECS["feature_gates"] + [
+            _gate("launched", [condition("current_time", "after", 1)])])
+        server = self._start(specs)
+        with self._count_builds() as built:
+            server.get_client_initialize_response(USER)
+            server.get_client_initialize_response(USER)
+        self.assertEqual(built.call_count, 2)
+
+    def test_session_replay_sampling_is_not_cached(self):
+        specs = dict(CONFIG_SPECS, session_replay_info={"sampling_rate": 0.5, "recording_blocked": False})
+        server = self._start(specs)
+        with self._count_builds() as built:
+            server.get_client_initialize_response(USER)
+            server.get_client_initialize_response(USER)
+        self.assertEqual(built.call_count, 2)
+
+    def test_evicts_least_recently_used_past_the_byte_budget(self):
+        size = 2 * len(self._start(cache_bytes=0).get_client_initialize_response_bytes(USER))
+        server = self._start(cache_bytes=2 * size + size // 2)
+        users = [StatsigUser(str(i), email="someone@statsig.com") for i in range(3)]
+        server.get_client_initialize_response(users[0])
+        server.get_client_initialize_response(users[1])
+        server.get_client_initialize_response(users[0])
+        server.get_client_initialize_response(users[2])
+        with self._count_builds() as built:
+            server.get_client_initialize_response(users[0])
+            server.get_client_initialize_response(users[2])
+            self.assertEqual(built.call_count, 0)
+            server.get_client_initialize_response(users[1])
+            self.assertEqual(built.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
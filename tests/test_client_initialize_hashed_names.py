@@ -0,0 +1,66 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.client_initialize_formatter import hash_name
+from statsig.evaluation_details import DataSource
+from statsig.utils import HashingAlgorithm
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), '../testdata/download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+# real responses always carry an idType, the client initialize response reads it
+for spec in CONFIG_SPECS["feature_gates"] + CONFIG_SPECS["dynamic_configs"]:
+    spec.setdefault("idType", "userID")
+CONFIG_SPECS["session_replay_info"] = {
+    "targeting_gate": "always_on_gate",
+    "session_recording_exposure_triggers": {"always_on_gate": {"values": ["true"]}, "not_an_entity": {}},
+}
+
+USERS = [StatsigUser("123", email="testuser@statsig.com"), StatsigUser("456", custom_ids={"companyID": "c1"})]
+
+
+class TestClientInitializeHashedNames(unittest.TestCase):
+    def setUp(self):
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(self.server.shutdown)
+
+    def _responses(self):
+        responses = []
+        for algorithm in HashingAlgorithm:
+            for user in USERS:
+                response = self.server.get_client_initialize_response(user, hash=algorithm)
+                for key in ("can_record_session", "session_recording_rate"):
+                    response.pop(key, None)
+                responses.append(response)
+        return responses
+
+    def test_matches_hashing_every_name(self):
+        memoized = self._responses()
+        with patch("statsig.client_initialize_formatter._hashed_names", return_value={}):
+            self.assertEqual(self._responses(), memoized)
+        triggers = memoized[0]["session_recording_exposure_triggers"]
+        self.assertEqual(set(triggers), {hash_name("always_on_gate", HashingAlgorithm.SHA256),
+                                         hash_name("not_an_entity", HashingAlgorithm.SHA256)})
+
+    def test_names_are_hashed_once_per_snapshot(self):
+        with patch("statsig.client_initialize_formatter.hash_name", wraps=hash_name) as hashed:
+            for user in USERS * 3:
+                self.server.get_client_initialize_response(user, hash=HashingAlgorithm.SHA256)
+            calls = hashed.call_count
+            self.assertEqual(calls, len(self.server._spec_store.snapshot().hashed_names[HashingAlgorithm.SHA256]))
+
+            self.server.get_client_initialize_response(USERS[0], hash=HashingAlgorithm.SHA256)
+            self.assertEqual(hashed.call_count, calls)
+
+            specs = dict(CONFIG_SPECS, time=CONFIG_SPECS["time"] + 1)
+            self.server._spec_store._process_specs(specs, DataSource.NETWORK)
+            self.server.get_client_initialize_response(USERS[0], hash=HashingAlgorithm.SHA256)
+            self.assertEqual(hashed.call_count, 2 * calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
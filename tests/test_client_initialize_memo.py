@@ -0,0 +1,114 @@
+import json
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.utils import HashingAlgorithm
+
+
+def _rule(id, conditions, return_value=True, is_experiment_group=False, **kwargs):
+    return rule(id, conditions, return_value, group_name=id, isExperimentGroup=is_experiment_group, **kwargs)
+
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        spec("global_holdout", "feature_gate", [
+            _rule("held", [condition("user_field", "any", ["held@out.com"], "email")])], False, entity="holdout"),
+        spec("segment:employees", "feature_gate", [
+            _rule("employees", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")])], False,
+             entity="segment"),
+        spec("employees_gate", "feature_gate", [
+            _rule("employees", [condition("pass_gate", target="segment:employees")])], False),
+        spec("new_feature", "feature_gate", [
+            _rule("holdout", [condition("pass_gate", target="global_holdout")], False),
+            _rule("employees", [condition("pass_gate", target="employees_gate")]),
+        ], False),
+    ],
+    dynamic_configs=[
+        spec("checkout_exp", "dynamic_config", [
+            _rule("holdout", [condition("pass_gate", target="global_holdout")], {"color": "none"}),
+            _rule("test", [condition("pass_gate", target="employees_gate")], {"color": "blue"},
+                  is_experiment_group=True),
+            _rule("control", [condition("public")], {"color": "red"}, is_experiment_group=True),
+        ], {"color": "none"}, entity="experiment", isActive=True, hasSharedParams=True,
+             explicitParameters=["color"]),
+    ],
+    layer_configs=[
+        spec("checkout_layer", "dynamic_config", [
+            _rule("alloc", [condition("fail_gate", target="global_holdout")], {"color": "red"},
+                  delegate="checkout_exp")], {"color": "none"}, entity="layer", explicitParameters=["color"]),
+    ],
+    layers={"checkout_layer": ["checkout_exp"]},
+)
+
+USERS = [StatsigUser("1", email="someone@statsig.com"), StatsigUser("2", email="held@out.com"),
+         StatsigUser("3", email="someone@example.com")]
+
+
+class TestClientInitializeMemo(unittest.TestCase):
+    def setUp(self):
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(self.server.shutdown)
+        self.evaluator = self.server._evaluator
+
+    def _response(self, user):
+        return self.server.get_client_initialize_response(user, hash=HashingAlgorithm.NONE)
+
+    def test_each_entity_evaluated_once(self):
+        evaluations = Counter()
+        evaluate = self.evaluator._Evaluator__evaluate
+
+        def counting_evaluate(user, config_name, *args, **kwargs):
+            evaluations[config_name] += 1
+            return evaluate(user, config_name, *args, **kwargs)
+
+        with patch.object(self.evaluator, "_Evaluator__evaluate", side_effect=counting_evaluate):
+            self._response(USERS[0])
+
+        self.assertEqual(evaluations["global_holdout"], 1)
+        self.assertEqual(evaluations["segment:employees"], 1)
+        self.assertEqual(evaluations["employees_gate"], 1)
+        self.assertEqual(evaluations["new_feature"], 1)
+        # once for the dynamic_configs section, once as the layer's delegate
+        self.assertEqual(evaluations["checkout_exp"], 2)
+        self.assertEqual(evaluations["checkout_layer"], 1)
+
+    def test_matches_evaluating_every_entity(self):
+        for user in USERS:
+            response = self._response(user)
+            self.assertEqual(set(response["feature_gates"]), {"employees_gate", "new_feature"})
+            for gate, values in response["feature_gates"].items():
+                expected = self.evaluator.check_gate(user, gate)
+                self.assertEqual((values["value"], values["rule_id"], values["secondary_exposures"]),
+                                 (expected.boolean_value, expected.rule_id, expected.secondary_exposures), gate)
+
+            experiment = self.evaluator.get_config(user, "checkout_exp")
+            values = response["dynamic_configs"]["checkout_exp"]
+            self.assertEqual((values["value"], values["rule_id"], values["secondary_exposures"]),
+                             (experiment.json_value, experiment.rule_id, experiment.secondary_exposures))
+
+            layer = self.evaluator.get_layer(user, "checkout_layer")
+            values = response["layer_configs"]["checkout_layer"]
+            self.assertEqual((values["value"], values["rule_id"], values["secondary_exposures"],
+                              values["undelegated_secondary_exposures"]),
+                             (layer.json_value, layer.rule_id, layer.secondary_exposures,
+                              layer.undelegated_secondary_exposures))
+            if layer.allocated_experiment:
+                self.assertEqual(values["allocated_experiment_name"], "checkout_exp")
+                self.assertEqual(values["is_user_in_experiment"], experiment.is_experiment_group)
+                self.assertEqual(values["group_name"], experiment.group_name)
+
+    def test_gate_local_override_is_kept(self):
+        self.server.override_gate("employees_gate", True, "3")
+        self.assertTrue(self.server.check_gate(USERS[2], "new_feature"))
+        response = self._response(USERS[2])
+        self.assertTrue(response["feature_gates"]["new_feature"]["value"])
+        self.assertFalse(response["feature_gates"]["employees_gate"]["value"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+import brotli
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.statsig_errors import StatsigValueError
+from statsig.utils import HashingAlgorithm
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)), '../testdata/download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+# real responses always carry an idType, the client initialize response reads it
+for spec in CONFIG_SPECS["feature_gates"] + CONFIG_SPECS["dynamic_configs"]:
+    spec.setdefault("idType", "userID")
+CONFIG_SPECS["session_replay_info"] = {
+    "targeting_gate": "always_on_gate",
+    "session_recording_event_triggers": {"checkout": {"values": ["paid"]}},
+    "session_recording_exposure_triggers": {"always_on_gate": {"values": ["true"]}},
+}
+
+USERS = [StatsigUser("123", email="testuser@statsig.com"), StatsigUser("456", custom_ids={"companyID": "c1"}),
+         StatsigUser("789", email="someone@example.com", country="US")]
+
+
+class TestClientInitializeStream(unittest.TestCase):
+    def _start(self, **options):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, **options))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_matches_the_response(self):
+        server = self._start()
+        for algorithm in HashingAlgorithm:
+            for user in USERS:
+                chunks = list(server.stream_client_initialize_response(user, hash=algorithm, chunk_size=512))
+                self.assertGreater(len(chunks), 1)
+                self.assertEqual(json.loads(b"".join(chunks)),
+                                 server.get_client_initialize_response(user, hash=algorithm))
+
+    def test_encoded_chunks(self):
+        server = self._start()
+        response = server.get_client_initialize_response(USERS[0])
+        gzipped = list(server.stream_client_initialize_response(USERS[0], encoding="gzip", chunk_size=512))
+        brotlied = list(server.stream_client_initialize_response(USERS[0], encoding="br", chunk_size=512))
+        self.assertGreater(len(gzipped), 1)
+        self.assertGreater(len(brotlied), 1)
+        self.assertEqual(json.loads(gzip.decompress(b"".join(gzipped))), response)
+        self.assertEqual(json.loads(brotli.decompress(b"".join(brotlied))), response)
+
+        with self.assertRaises(StatsigValueError):
+            server.stream_client_initialize_response(USERS[0], encoding="deflate")
+
+    def test_entities_are_evaluated_as_chunks_are_read(self):
+        server = self._start()
+        evaluator = server._evaluator
+        evaluate = evaluator._Evaluator__evaluate
+        evaluated = []
+
+        def recording_evaluate(user, config_name, *args, **kwargs):
+            evaluated.append(config_name)
+            return evaluate(user, config_name, *args, **kwargs)
+
+        with patch.object(evaluator, "_Evaluator__evaluate", side_effect=recording_evaluate):
+            chunks = server.stream_client_initialize_response(USERS[0], chunk_size=1)
+            self.assertEqual(evaluated, [])
+            next(chunks)
+            next(chunks)
+            self.assertLess(len(set(evaluated)), len(CONFIG_SPECS["feature_gates"]))
+            list(chunks)
+        self.assertIn(CONFIG_SPECS["layer_configs"][0]["name"], evaluated)
+
+    def test_served_from_the_response_cache(self):
+        server = self._start(client_initialize_cache_bytes=1 << 20)
+        payload = server.get_client_initialize_response_bytes(USERS[0])
+        self.assertEqual(list(server.stream_client_initialize_response(USERS[0])), [payload])
+        self.assertEqual(gzip.decompress(b"".join(server.stream_client_initialize_response(
+            USERS[0], encoding="gzip"))), payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
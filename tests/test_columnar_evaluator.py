@@ -0,0 +1,183 @@
+import json
+import random
+import unittest
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.columnar_evaluator import has_imported_numpy
+from statsig.statsig_errors import StatsigValueError
+
+if has_imported_numpy:
+    from statsig import UserColumns
+
+
+def _spec(name, type, rules, default_value, **kwargs):
+    return spec(name, type, rules, default_value, salt=name + "_salt", **kwargs)
+
+
+def _group(id, conditions, group_name, **kwargs):
+    return rule(id, conditions, group_name=group_name, isExperimentGroup=True, **kwargs)
+
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        _spec("fields", "feature_gate", [
+            rule("employee", [condition("user_field", "any", ["statsig.com", "example.com"], "domain"),
+                              condition("user_field", "none", ["blocked"], "tier")]),
+            rule("big_spender", [condition("user_field", "gte", 500, "spend")], pass_percentage=40),
+            rule("new_app", [condition("user_field", "version_gte", "2.3.0", "appVersion"),
+                             condition("user_field", "lt", "100", "age")], pass_percentage=65),
+            rule("region", [condition("user_field", "eq", "nz", "region"),
+                            condition("environment_field", "any", ["production"], "tier")]),
+            rule("bucket", [condition("user_bucket", "lt", 300, salt="bucket_salt")], pass_percentage=50),
+        ], False),
+        _spec("company", "feature_gate", [
+            rule("company_rule", [condition("unit_id", "any", ["c1", "c2", "c3"], id_type="companyID"),
+                                  condition("user_bucket", "any", list(range(0, 1000, 3)), id_type="companyID",
+                                            salt="company_bucket")], id_type="companyID", pass_percentage=70),
+        ], False, id_type="companyID"),
+        _spec("nested", "feature_gate", [
+            rule("passes_fields", [condition("pass_gate", target="fields")]),
+            rule("after_nested", [condition("user_field", "gt", 20, "age")], pass_percentage=50),
+        ], False),
+        _spec("lookups", "feature_gate", [
+            rule("country", [condition("ip_based", "any", ["US"], "country")]),
+            rule("browser", [condition("ua_based", "any", ["Chrome"], "browser_name")]),
+            rule("match", [condition("user_field", "str_matches", "^a.*z$", "name")]),
+            rule("global", [condition("user_field", "eq", "global", "source")]),
+        ], False),
+        _spec("off", "feature_gate", [rule("always", [condition("public")])], False, enabled=False),
+        # the environment only has the lowercased key
+        _spec("environment_case", "feature_gate", [
+            rule("production", [condition("environment_field", "any", ["production"], "Tier")]),
+        ], False),
+    ],
+    dynamic_configs=[
+        _spec("experiment", "dynamic_config", [
+            rule("holdout", [condition("user_bucket", "lt", 100, salt="holdout")], return_value={"v": "holdout"}),
+            _group("control", [condition("public")], "Control", pass_percentage=50,
+                   return_value={"v": "control"}),
+            _group("test", [condition("public")], "Test", return_value={"v": "test"}),
+        ], {"v": "default"}),
+        _spec("configured", "dynamic_config", [
+            rule("old_version", [condition("user_field", "version_lt", "1.0", "appVersion")],
+                 return_value={"upgrade": True}),
+            rule("mobile", [condition("user_field", "any_case_sensitive", ["ios", "android"], "platform")],
+                 pass_percentage=30, return_value={"mobile": True}),
+        ], {"upgrade": False}),
+    ],
+)
+
+GATES = ["fields", "company", "nested", "lookups", "off", "environment_case", "missing_gate"]
+CONFIGS = ["experiment", "configured", "missing_config"]
+
+
+def _random_users(rng, size):
+    def maybe(values):
+        return rng.choice(values + [None])
+
+    return {
+        "user_ids": [maybe([f"user_{i}", i, ""]) if i % 7 else f"user_{i}" for i in range(size)],
+        "custom_ids": {"companyID": [maybe(["c1", "c2", "c4", f"c{i % 50}"]) for i in range(size)]},
+        "custom": {
+            "domain": [maybe(["statsig.com", "gmail.com", ""]) for _ in range(size)],
+            "tier": [maybe(["blocked", "free", "paid"]) for _ in range(size)],
+            "spend": [maybe([10, 499, 500, "750", "lots", 1e3]) for _ in range(size)],
+            "age": [maybe([12, 30, "99", 150, "x"]) for _ in range(size)],
+            "region": [maybe(["nz", "NZ", "us"]) for _ in range(size)],
+            "name": [maybe(["abcz", "abc", "Az"]) for _ in range(size)],
+            "platform": [maybe(["ios", "IOS", "web", ["ios"]]) for _ in range(size)],
+        },
+        "app_version": [maybe(["2.3.0", "2.10", "1.0.0.1", "0.9", "abc", "", "3.0-beta"]) for _ in range(size)],
+        "ip": [maybe(["24.5.0.0", "81.2.69.160"]) for _ in range(size)],
+        "user_agent": [maybe(["Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) Chrome/120.0.0.0 Safari/537.36"])
+                       for _ in range(size)],
+    }
+
+
+@unittest.skipIf(not has_imported_numpy, "numpy is not installed")
+class TestColumnarEvaluator(unittest.TestCase):
+    def _start(self, **kwargs):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True,
+            tier="production", global_custom_fields={"source": "global"}, **kwargs))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _random_columns(self, size=3000, seed=0):
+        columns = _random_users(random.Random(seed), size)
+        # StatsigUser requires one id; give users without any a company id
+        company_ids = columns["custom_ids"]["companyID"]
+        for i, user_id in enumerate(columns["user_ids"]):
+            if user_id in (None, "") and company_ids[i] is None:
+                company_ids[i] = "c9"
+        return UserColumns(**columns)
+
+    def test_gates_match_scalar_evaluator(self):
+        server = self._start()
+        users = self._random_columns()
+        for gate in GATES:
+            result = server.check_gate_columnar(users, gate)
+            for i in range(len(users)):
+                expected = server.get_feature_gate(users.user_at(i), gate, log_exposure=False)
+                self.assertEqual((result.rule_ids[i], result.group_names[i], result.passed[i]),
+                                 (expected.rule_id, expected.group_name, expected.value), (gate, i))
+
+    def test_configs_match_scalar_evaluator(self):
+        server = self._start()
+        users = self._random_columns(seed=1)
+        for config in CONFIGS:
+            result = server.get_config_columnar(users, config)
+            for i in range(len(users)):
+                expected = server.get_config(users.user_at(i), config, log_exposure=False)
+                self.assertEqual((result.rule_ids[i], result.group_names[i], result.passed[i],
+                                  result.values[result.value_keys[i]]),
+                                 (expected.rule_id, expected.group_name, expected.passed_rule, expected.value),
+                                 (config, i))
+
+    def test_overrides_go_through_scalar_evaluator(self):
+        server = self._start()
+        server.override_gate("fields", False, "user_1")
+        server.override_config("experiment", {"v": "override"}, "user_2")
+        users = UserColumns(user_ids=[f"user_{i}" for i in range(4)], custom={"domain": ["statsig.com"] * 4})
+        self.assertEqual(server.check_gate_columnar(users, "fields").passed.tolist(), [True, False, True, True])
+        result = server.get_config_columnar(users, "experiment")
+        self.assertEqual(result.rule_ids[2], "override")
+        self.assertEqual(result.values[result.value_keys[2]], {"v": "override"})
+
+    def test_environment_field_matches_lowercased_key(self):
+        server = self._start()
+        users = UserColumns(user_ids=["a", "b"])
+        self.assertEqual(server.check_gate_columnar(users, "environment_case").passed.tolist(), [True, True])
+        gate = server.get_feature_gate(users.user_at(0), "environment_case", log_exposure=False)
+        self.assertEqual((gate.value, gate.rule_id), (True, "production"))
+
+    def test_pass_percentage_split(self):
+        server = self._start()
+        users = UserColumns(user_ids=[f"user_{i}" for i in range(20000)])
+        result = server.get_config_columnar(users, "experiment")
+        self.assertAlmostEqual((result.rule_ids == "holdout").mean(), 0.1, delta=0.01)
+        control = result.group_names == "Control"
+        self.assertEqual(control.sum() + (result.rule_ids == "holdout").sum(), len(users))
+        self.assertAlmostEqual(result.passed[control].mean(), 0.5, delta=0.02)
+        self.assertEqual(result.values[:3], [{"v": "default"}, {"v": "holdout"}, {"v": "control"}])
+
+    def test_invalid_columns(self):
+        with self.assertRaises(StatsigValueError):
+            UserColumns(user_ids=["a", "b"], email=["a@statsig.com"])
+        with self.assertRaises(StatsigValueError):
+            UserColumns(user_ids=["a", None])
+        server = self._start()
+        result = server.check_gate_columnar(UserColumns(user_ids=[]), "fields")
+        self.assertEqual(len(result.rule_ids), 0)
+
+    def test_user_at(self):
+        users = UserColumns(user_ids=[1, None], custom_ids={"companyID": [None, 2]}, custom={"a": [["x"], None]},
+                            email=["a@statsig.com", None])
+        self.assertEqual(users.user_at(0), StatsigUser("1", email="a@statsig.com", custom={"a": ["x"]}))
+        self.assertEqual(users.user_at(1), StatsigUser(custom_ids={"companyID": "2"}))
+
+
+if __name__ == '__main__':
+    unittest.main()
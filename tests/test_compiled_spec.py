@@ -0,0 +1,102 @@
+import json
+import unittest
+
+from statsig.compiled_spec import _CompiledCondition, compile_specs, compile_rules
+from statsig.evaluation_operators import OPERATORS, PARSED_TARGET_OPERATORS, USER_BUCKET_OPERATORS, \
+    unknown_operator
+from statsig.spec_store import _SpecStore
+
+
+def _outcome(compare, value, condition):
+    try:
+        return compare(value, condition)
+    except Exception as e:
+        return type(e)
+
+
+class TestCompiledSpec(unittest.TestCase):
+    def test_compiles_rules_and_conditions(self):
+        compiled = compile_specs({
+            "a_gate": {
+                "name": "a_gate",
+                "enabled": True,
+                "salt": "gate_salt",
+                "idType": "userID",
+                "defaultValue": False,
+                "rules": [{
+                    "id": "rule_1",
+                    "passPercentage": 50,
+                    "idType": "stableID",
+                    "returnValue": True,
+                    "conditions": [
+                        {"type": "user_field", "operator": "any", "field": "Email",
+                         "targetValue": ["a@b.com"], "fast_target_value": {"a@b.com": None}},
+                        {"type": "user_bucket", "operator": "any", "targetValue": [1, 2],
+                         "additionalValues": {"salt": "s"}, "user_bucket": {1: None, 2: None}},
+                        {"type": "custom_type", "operator": "made_up_op"},
+                    ],
+                }],
+            }
+        })
+
+        spec = compiled["a_gate"]
+        self.assertEqual(spec.name, "a_gate")
+        self.assertTrue(spec.enabled)
+        self.assertEqual(spec.salt, "gate_salt")
+
+        rule = spec.rules[0]
+        self.assertEqual(rule.salt, "rule_1")
+        self.assertEqual(rule.id_type_lower, "stableid")
+
+        field_condition, bucket_condition, unknown_condition = rule.conditions
+        self.assertEqual(field_condition.condition_type, "USER_FIELD")
+        self.assertEqual(field_condition.field.field_lower, "email")
+        self.assertEqual(field_condition.field.user_attribute, "email")
+        self.assertIs(field_condition.compare, OPERATORS["any"])
+
+        self.assertEqual(bucket_condition.bucket_salt, "s.")
+        self.assertIs(bucket_condition.compare, USER_BUCKET_OPERATORS["any"])
+
+        self.assertEqual(unknown_condition.condition_type, "CUSTOM_TYPE")
+        self.assertIs(unknown_condition.compare, unknown_operator)
+
+    def test_compile_rules_keeps_none(self):
+        self.assertIsNone(compile_rules(None))
+        rules = compile_rules({"override": {"id": "override", "conditions": []}})
+        self.assertEqual(rules["override"].conditions, [])
+        self.assertIsNone(rules["override"].id_type_lower)
+
+    def test_parsed_targets_match_unparsed_operators(self):
+        cases = {
+            "gt": ([10, "10.5", -1.5, "1e3"], [9, "10", 11.2, None, "", "abc", True]),
+            "lte": ([3, "3"], [3, "2.9", 4]),
+            "version_gt": (["1.2.3", "2.0-beta", "1.a.3", 2, "1..2"], ["1.2.4", "1.2", "2.0.0.1", "1.b.3", "x", 3, "01. 2.+3", "1.2.99999999999999999999"]),
+            "version_eq": (["1.0", "1.0.0-rc1"], ["1", "1.0.0.0", "1.0.1", None]),
+            "after": ([1640995200000, "1640995200", 1640995200], [1640995200001, "1641081600000", 1640995199, None, "soon"]),
+            "on": ([1640995200000], [1640995300000, "1641081600000", 1640995200]),
+        }
+        for op, (targets, values) in cases.items():
+            for target in targets:
+                rule = {"conditions": [{"type": "user_field", "operator": op, "targetValue": target}]}
+                _SpecStore._parse_target_value_for_condition(None, rule, 0, op, "user_field", target)
+                condition = rule["conditions"][0]
+                self.assertIn("parsed_target_value", condition)
+                json.dumps(condition)
+
+                compiled = _CompiledCondition(condition)
+                self.assertIs(compiled.compare, PARSED_TARGET_OPERATORS[op])
+                for value in values:
+                    self.assertEqual(_outcome(compiled.compare, value, compiled),
+                                     _outcome(OPERATORS[op], value, compiled), (op, target, value))
+
+    def test_unparsable_targets_fall_back(self):
+        for op, target in (("gt", "ten"), ("version_gt", "1e999"), ("before", "tomorrow")):
+            rule = {"conditions": [{"type": "user_field", "operator": op, "targetValue": target}]}
+            _SpecStore._parse_target_value_for_condition(None, rule, 0, op, "user_field", target)
+            compiled = _CompiledCondition(rule["conditions"][0])
+            self.assertNotIn("parsed_target_value", rule["conditions"][0])
+            self.assertIs(compiled.compare, OPERATORS[op])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, named_rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+
+_PAST = 1262304000000  # 2010-01-01
+_FUTURE = 4102444800000  # 2100-01-01
+
+
+def _spec(name, entity, rules, enabled=True):
+    return spec(name, "feature_gate" if entity == "feature_gate" else "dynamic_config", rules, {"rule": "default"},
+                enabled, entity=entity)
+
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        _spec("disabled_gate", "feature_gate", [named_rule("on", [condition("public")])], enabled=False),
+        _spec("public_gate", "feature_gate", [named_rule("on", [condition("public")])]),
+        _spec("off_gate", "feature_gate", [named_rule("off", [condition("public")], 0, sampling_rate=101)]),
+        _spec("no_rules_gate", "feature_gate", []),
+        _spec("window_gate", "feature_gate", [
+            named_rule("window", [condition("current_time", "after", _PAST),
+                                  condition("current_time", "before", _FUTURE)], sampling_rate=201),
+            named_rule("everyone_else", [condition("public")], 0),
+        ]),
+        _spec("expired_gate", "feature_gate", [named_rule("expired", [condition("current_time", "before", _PAST)])]),
+        _spec("launch_gate", "feature_gate", [
+            named_rule("launched", [condition("current_time", "after", _FUTURE)]),
+            named_rule("not_yet", [condition("public")], sampling_rate=101),
+        ]),
+        _spec("targeted_gate", "feature_gate", [named_rule("employees", [
+            condition("user_field", "str_contains_any", ["@statsig.com"], "email")])]),
+        _spec("partial_gate", "feature_gate", [named_rule("half", [condition("public")], 50)]),
+        _spec("parent_gate", "feature_gate", [
+            named_rule("parents", [condition("pass_gate", target="public_gate"),
+                                   condition("pass_gate", target="expired_gate"),
+                                   condition("pass_gate", target="off_gate")]),
+            named_rule("fallback", [condition("pass_gate", target="window_gate")]),
+        ]),
+        _spec("mapped_gate", "feature_gate", [named_rule("on", [condition("public")])]),
+    ],
+    dynamic_configs=[_spec("public_config", "dynamic_config", [named_rule("everyone", [condition("public")])])],
+    layer_configs=[_spec("public_layer", "layer", [named_rule("everyone", [condition("public")])])],
+    overrides={"mapped_gate": []},
+    time=1,
+)
+
+FOLDED = ["disabled_gate", "public_gate", "off_gate", "no_rules_gate", "window_gate", "expired_gate", "launch_gate"]
+NOT_FOLDED = ["targeted_gate", "partial_gate", "parent_gate", "mapped_gate"]
+
+USERS = [StatsigUser(f"user_{i}", email="someone@statsig.com" if i % 2 else None) for i in range(20)]
+
+_COMPARED_FIELDS = ("boolean_value", "json_value", "rule_id", "group_name", "is_experiment_group", "id_type",
+                    "version", "secondary_exposures", "undelegated_secondary_exposures", "sample_rate",
+                    "analytical_condition", "seen_analytical_gates", "forward_all_exposures")
+
+
+class TestConstantFolding(unittest.TestCase):
+    def _start(self):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _evaluate(self, server):
+        evaluator = server._evaluator
+        results = []
+        for user in USERS:
+            checks = [(name, evaluator.check_gate(user, name)) for name in FOLDED + NOT_FOLDED] + \
+                     [("public_config", evaluator.get_config(user, "public_config")),
+                      ("public_layer", evaluator.get_layer(user, "public_layer"))]
+            for name, result in checks:
+                results.append((name, user.user_id, {field: getattr(result, field) for field in _COMPARED_FIELDS},
+                                result.evaluation_details.reason, result.evaluation_details.source))
+        return results
+
+    def test_user_independent_specs_are_folded(self):
+        spec_store = self._start()._spec_store
+        for gate in FOLDED:
+            self.assertIsNotNone(spec_store.get_compiled_gate(gate).constant, gate)
+        for gate in NOT_FOLDED:
+            self.assertIsNone(spec_store.get_compiled_gate(gate).constant, gate)
+        self.assertIsNotNone(spec_store.get_compiled_config("public_config").constant)
+        self.assertIsNotNone(spec_store.get_compiled_layer("public_layer").constant)
+
+    def test_matches_rule_interpreter(self):
+        folded = self._evaluate(self._start())
+        with patch("statsig.compiled_spec.fold_constant_result", return_value=None):
+            interpreted = self._evaluate(self._start())
+        self.assertEqual(len(folded), len(interpreted))
+        for got, want in zip(folded, interpreted):
+            self.assertEqual(got, want)
+
+        by_gate = {name: fields["rule_id"] for name, _user, fields, _reason, _source in folded}
+        self.assertEqual(by_gate["disabled_gate"], "disabled")
+        self.assertEqual(by_gate["window_gate"], "window")
+        self.assertEqual(by_gate["expired_gate"], "default")
+        self.assertEqual(by_gate["launch_gate"], "not_yet")
+
+    def test_exposures_match_rule_interpreter(self):
+        def exposures(server):
+            events = []
+            with patch.object(server._logger, "log", side_effect=lambda event: events.append(event.to_dict())):
+                for user in USERS[:5]:
+                    for gate in FOLDED + NOT_FOLDED:
+                        server.check_gate(user, gate)
+                    server.get_config(user, "public_config")
+            for event in events:
+                event.pop("time", None)
+                for key in ("configSyncTime", "initTime", "serverTime"):
+                    event["metadata"].pop(key, None)
+            return events
+
+        folded = exposures(self._start())
+        self.assertGreater(len(folded), 0)
+        with patch("statsig.compiled_spec.fold_constant_result", return_value=None):
+            self.assertEqual(exposures(self._start()), folded)
+
+    def test_time_window_is_checked_per_evaluation(self):
+        server = self._start()
+        user = USERS[0]
+        self.assertTrue(server.check_gate(user, "window_gate"))
+        with patch("statsig.evaluator.time.time", return_value=_FUTURE / 1000 + 1):
+            gate = server.get_feature_gate(user, "window_gate")
+        self.assertFalse(gate.value)
+        self.assertEqual(gate.rule_id, "everyone_else")
+        with patch("statsig.evaluator.time.time", return_value=_FUTURE / 1000 + 1):
+            self.assertEqual(server.get_feature_gate(user, "launch_gate").rule_id, "launched")
+
+    def test_results_are_not_shared(self):
+        evaluator = self._start()._evaluator
+        first = evaluator.check_gate(USERS[0], "public_gate")
+        first.user = USERS[0]
+        first.secondary_exposures.append({"gate": "x", "gateValue": "true", "ruleID": "x"})
+        second = evaluator.check_gate(USERS[1], "public_gate")
+        self.assertIsNot(first, second)
+        self.assertIsNone(second.user)
+        self.assertEqual(second.secondary_exposures, [])
+        self.assertIsNot(first.evaluation_details, second.evaluation_details)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import random
+import unittest
+
+from ip3country import CountryLookup
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.country_lookup import _CompactCountryLookup, get_compact_country_lookup
+
+CONFIG_SPECS = config_specs(feature_gates=[
+    spec("in_us_or_nz", "feature_gate", [rule("rule", [condition("ip_based", "any", ["US", "NZ"], "country")])], False,
+         salt="salt"),
+])
+
+
+class TestCompactCountryLookup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.original = CountryLookup()
+        cls.compact = get_compact_country_lookup()
+
+    def test_shared_instance(self):
+        self.assertIs(get_compact_country_lookup(), self.compact)
+        self.assertIsInstance(self.compact, _CompactCountryLookup)
+
+    def test_matches_ip3country(self):
+        rng = random.Random(3)
+        numbers = [rng.randrange(0, 2 ** 32) for _ in range(20000)]
+        # range boundaries and both ends of the address space
+        for end in self.compact.range_ends[::1000]:
+            numbers.extend((end - 1, end, end + 1))
+        numbers.extend((-1, 0, 2 ** 32 - 1, 2 ** 32, 2 ** 40))
+        for number in numbers:
+            self.assertEqual(self.compact.lookupNumeric(number), self.original.lookupNumeric(number), number)
+
+        for ip in ("1.1.1.1", "24.5.0.0", "202.12.29.1", "255.255.255.255", "0.0.0.0", "1.2.3", "", "::1"):
+            self.assertEqual(self.compact.lookupStr(ip), self.original.lookupStr(ip), ip)
+        for ip in ("a.b.c.d", "1.2.3."):
+            with self.assertRaises(ValueError):
+                self.compact.lookupStr(ip)
+
+
+class TestCountryLookupCache(unittest.TestCase):
+    def _start(self, **kwargs):
+        kwargs.setdefault("country_lookup_cache_size", 1000)
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, **kwargs))
+        self.addCleanup(server.shutdown)
+
+        evaluator = server._evaluator
+        self.lookups = []
+        lookup = self.backend = evaluator._country_lookup
+
+        class CountingLookup:
+            @staticmethod
+            def lookupStr(ip):
+                self.lookups.append(ip)
+                return lookup.lookupStr(ip)
+
+        evaluator._country_lookup = CountingLookup
+        return server
+
+    def _check(self, server):
+        self.assertTrue(server.check_gate(StatsigUser("a", ip="24.5.0.0"), "in_us_or_nz"))
+        self.assertFalse(server.check_gate(StatsigUser("b", ip="81.2.69.160"), "in_us_or_nz"))
+        self.assertFalse(server.check_gate(StatsigUser("c", ip="1.2.3"), "in_us_or_nz"))
+
+    def test_looks_up_each_ip_once(self):
+        server = self._start()
+        for _ in range(3):
+            self._check(server)
+        self.assertEqual(self.lookups, ["24.5.0.0", "81.2.69.160", "1.2.3"])
+
+    def test_default_backend(self):
+        self._start()
+        self.assertIsInstance(self.backend, CountryLookup)
+
+    def test_disabled_cache(self):
+        server = self._start(country_lookup_cache_size=0)
+        for _ in range(2):
+            self._check(server)
+        self.assertEqual(len(self.lookups), 6)
+
+    def test_disabled_by_default(self):
+        self.assertEqual(StatsigOptions().country_lookup_cache_size, 0)
+        self.assertNotIn("country_lookup_cache_size", StatsigOptions().get_logging_copy())
+
+    def test_compact_backend(self):
+        server = self._start(compact_country_lookup=True)
+        self.assertIs(self.backend, get_compact_country_lookup())
+        self._check(server)
+
+    def test_invalid_ip_is_not_cached(self):
+        server = self._start()
+        for _ in range(2):
+            self.assertFalse(server.check_gate(StatsigUser("a", ip="a.b.c.d"), "in_us_or_nz"))
+        self.assertEqual(self.lookups, ["a.b.c.d", "a.b.c.d"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import json
+import unittest
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+
+CONFIG_SPECS = config_specs(feature_gates=[
+    spec("production_only", "feature_gate", [
+        rule("production", [condition("environment_field", "any", ["production"], "Tier")])], False),
+])
+
+
+class TestEnvironmentField(unittest.TestCase):
+    def _start(self, tier):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, tier=tier))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_field_matches_lowercased_environment_key(self):
+        server = self._start("production")
+        gate = server.get_feature_gate(StatsigUser("123"), "production_only", log_exposure=False)
+        self.assertEqual((gate.value, gate.rule_id), (True, "production"))
+
+        server = self._start("staging")
+        gate = server.get_feature_gate(StatsigUser("123"), "production_only", log_exposure=False)
+        self.assertEqual((gate.value, gate.rule_id), (False, "default"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import json
+import time
+import unittest
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.interface_observability_client import ObservabilityClient
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        spec("employees", "feature_gate", [
+            rule("employees_rule", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")])],
+             False),
+        spec("launched", "feature_gate", [
+            rule("launch_rule", [condition("current_time", "after", int(time.time() * 1000) + 60 * 60 * 1000)])],
+             False),
+        spec("allow_list", "feature_gate", [
+            rule("list_rule", [condition("unit_id", "in_segment_list", "allowed_users")])], False),
+        spec("employees_or_allowed", "feature_gate", [
+            rule("employees", [condition("pass_gate", target="employees")]),
+            rule("allowed", [condition("pass_gate", target="allow_list")]),
+        ], False),
+    ],
+    dynamic_configs=[
+        spec("experiment", "dynamic_config", [
+            rule("employees", [condition("pass_gate", target="employees")], {"a": 1}),
+        ], {"a": 0}),
+    ],
+)
+
+
+class MockObservabilityClient(ObservabilityClient):
+    def __init__(self):
+        self.logs = defaultdict(list)
+
+    def increment(self, metric_name: str, value: int = 1, tags: Optional[Dict[str, Any]] = None) -> None:
+        self.logs[metric_name].append(value)
+
+    def gauge(self, metric_name: str, value: float, tags: Optional[Dict[str, Any]] = None) -> None:
+        self.logs[metric_name].append(value)
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def setUp(self):
+        self.ob_client = MockObservabilityClient()
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True,
+            evaluation_cache_size=2, observability_client=self.ob_client))
+        self.evaluator = self.server._evaluator
+        self.cache = self.evaluator._evaluation_cache
+        self.user = StatsigUser("123", email="someone@statsig.com")
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_repeated_evaluation_is_served_from_cache(self):
+        first = self.evaluator.get_config(self.user, "experiment")
+        second = self.evaluator.get_config(StatsigUser("123", email="someone@statsig.com"), "experiment")
+
+        self.assertEqual(second.json_value, {"a": 1})
+        self.assertEqual(second.rule_id, first.rule_id)
+        self.assertEqual(second.secondary_exposures, first.secondary_exposures)
+        self.assertIsNot(second.secondary_exposures, first.secondary_exposures)
+        self.assertEqual((self.cache._hits, self.cache._misses), (1, 1))
+
+        other = self.evaluator.get_config(StatsigUser("123", email="someone@example.com"), "experiment")
+        self.assertEqual(other.json_value, {"a": 0})
+        self.assertEqual(self.cache._misses, 2)
+
+    def test_hits_get_fresh_evaluation_details(self):
+        first = self.evaluator.check_gate(self.user, "employees")
+        with patch("statsig.evaluation_details.time.time", return_value=time.time() + 60):
+            second = self.evaluator.check_gate(self.user, "employees")
+
+        self.assertEqual(self.cache._hits, 1)
+        self.assertIsNot(second.evaluation_details, first.evaluation_details)
+        self.assertGreaterEqual(second.evaluation_details.server_time - first.evaluation_details.server_time, 59000)
+        self.assertEqual(second.evaluation_details.reason, first.evaluation_details.reason)
+        self.assertEqual(second.evaluation_details.source, first.evaluation_details.source)
+
+    def test_users_share_entries_on_fields_the_entity_reads(self):
+        self.evaluator.check_gate(StatsigUser("a", email="a@statsig.com", country="US"), "employees")
+        result = self.evaluator.check_gate(StatsigUser("b", email="a@statsig.com", custom={"plan": "pro"}),
+                                           "employees")
+        self.assertTrue(result.boolean_value)
+        self.assertEqual((self.cache._hits, self.cache._misses), (1, 1))
+
+        self.evaluator.check_gate(StatsigUser("b", custom={"email": "a@statsig.com"}), "employees")
+        self.assertEqual(self.cache._misses, 2)
+
+    def test_overrides_invalidate_cache(self):
+        self.assertTrue(self.evaluator.check_gate(self.user, "employees").boolean_value)
+        self.server.override_gate("employees", False, "123")
+        self.assertFalse(self.evaluator.check_gate(self.user, "employees").boolean_value)
+        self.server.remove_gate_override("employees", "123")
+        self.assertTrue(self.evaluator.check_gate(self.user, "employees").boolean_value)
+
+    def test_time_dependent_gates_are_not_cached(self):
+        self.evaluator.check_gate(self.user, "launched")
+        self.evaluator.check_gate(self.user, "launched")
+        self.assertEqual(len(self.cache._entries), 0)
+        self.assertEqual((self.cache._hits, self.cache._misses), (0, 0))
+
+    def test_id_list_changes_invalidate_cache(self):
+        user = StatsigUser("123")
+        self.assertFalse(self.evaluator.check_gate(user, "allow_list").boolean_value)
+        self.assertFalse(self.evaluator.check_gate(user, "employees_or_allowed").boolean_value)
+
+        self.server._spec_store._id_lists["allowed_users"] = {"ids": {"pmWkWSBC": True}, "readBytes": 10}
+        self.assertTrue(self.evaluator.check_gate(user, "allow_list").boolean_value)
+        result = self.evaluator.check_gate(user, "employees_or_allowed")
+        self.assertTrue(result.boolean_value)
+        self.assertEqual(result.rule_id, "allowed")
+
+    def test_evicts_least_recently_used(self):
+        self.evaluator.check_gate(self.user, "employees")
+        self.evaluator.check_gate(self.user, "allow_list")
+        self.evaluator.check_gate(self.user, "employees")
+        self.evaluator.get_config(self.user, "experiment")
+
+        self.assertEqual([key[1] for key in self.cache._entries], ["employees", "experiment"])
+        self.assertEqual(self.cache._evictions, 1)
+
+    def test_metrics_flushed_on_shutdown(self):
+        self.evaluator.check_gate(self.user, "employees")
+        self.evaluator.check_gate(self.user, "employees")
+        self.server.shutdown()
+
+        self.assertEqual(self.ob_client.logs["statsig.sdk.evaluation_cache.hit_count"], [1])
+        self.assertEqual(self.ob_client.logs["statsig.sdk.evaluation_cache.miss_count"], [1])
+        self.assertEqual(self.ob_client.logs["statsig.sdk.evaluation_cache.size"], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import sys
+import threading
+import unittest
+
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.batch_event_queue import EventBatchProcessor
+from statsig.diagnostics import Context, Diagnostics, Key, Marker
+from statsig.ttl_set import TTLSet
+
+THREADS = 8
+
+
+def _run_threads(target):
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    def run(index):
+        barrier.wait()
+        results[index] = target(index)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestFreeThreading(unittest.TestCase):
+    """Shared state touched by every check stays consistent when checks run on many threads at once."""
+
+    def setUp(self):
+        # switch threads as often as possible, so races show up with the GIL too
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+
+    def test_event_queue_keeps_every_event(self):
+        processor = EventBatchProcessor(StatsigOptions(event_queue_size=100, retry_queue_size=1000), {},
+                                        threading.Event(), None, Diagnostics())
+
+        def add(index):
+            for i in range(1000):
+                if i % 10 == 0:
+                    processor.add_events([{"id": (index, i, j)} for j in range(3)])
+                else:
+                    processor.add_event({"id": (index, i)})
+
+        _run_threads(add)
+        processor.batch_events()
+        batches = processor.get_all_batched_events()
+
+        events = [event["id"] for batch in batches for event in batch.payload["events"]]
+        self.assertEqual(len(events), THREADS * 1200)
+        self.assertEqual(len(set(events)), len(events))
+        self.assertTrue(all(batch.event_count == 100 for batch in batches[:-1]))
+        self.assertEqual([batch.event_count for batch in batches],
+                         [len(batch.payload["events"]) for batch in batches])
+
+    def test_exposures_dedupe_exactly_once(self):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(local_mode=True, disable_diagnostics=True))
+        self.addCleanup(server.shutdown)
+        users = [StatsigUser(f"user_{i}") for i in range(200)]
+
+        def expose(_index):
+            return [user.user_id for user in users
+                    if server._logger._is_unique_exposure(user, "statsig::gate_exposure", {"gate": "a_gate"})]
+
+        unique = [user_id for result in _run_threads(expose) for user_id in result]
+        self.assertEqual(sorted(unique), sorted(user.user_id for user in users))
+
+    def test_ttl_set_adds_once(self):
+        shutdown = threading.Event()
+        self.addCleanup(shutdown.set)
+        ttl_set = TTLSet(shutdown)
+
+        added = _run_threads(lambda _index: [key for key in range(500) if ttl_set.add_if_absent(key)])
+
+        self.assertEqual(sorted(key for keys in added for key in keys), list(range(500)))
+        self.assertTrue(ttl_set.contains(42))
+        ttl_set.reset()
+        self.assertFalse(ttl_set.contains(42))
+
+    def test_diagnostics_markers_stay_bounded(self):
+        diagnostics = Diagnostics()
+        taken = []
+
+        def add(index):
+            for i in range(200):
+                diagnostics.add_marker(Marker().api_call(Key.CHECK_GATE).start({"markerID": f"{index}_{i}"}))
+                if index == 0 and i % 50 == 0:
+                    taken.append(diagnostics.take_markers(Context.API_CALL))
+
+        _run_threads(add)
+        taken.append(diagnostics.take_markers(Context.API_CALL))
+
+        self.assertEqual(diagnostics.get_marker_count(Context.API_CALL), 0)
+        self.assertTrue(all(len(markers) <= 50 for markers in taken))
+        marker_ids = [marker.markerID for markers in taken for marker in markers]
+        self.assertEqual(len(set(marker_ids)), len(marker_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
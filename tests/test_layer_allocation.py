@@ -0,0 +1,125 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from spec_builders import condition, named_rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                       '../testdata/layer_exposures_download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+
+
+def _bucket_condition(operator, target, salt, id_type="userID"):
+    return condition("user_bucket", operator, target, id_type=id_type, salt=salt)
+
+
+def _spec(name, entity, rules, id_type="userID"):
+    return spec(name, "dynamic_config", rules, {"rule": "default"}, id_type=id_type, entity=entity,
+                salt=name + "_salt", explicitParameters=["rule"] if entity == "experiment" else None)
+
+
+def _experiment(name, layer_salt, buckets):
+    return _spec(name, "experiment", [
+        named_rule("layerAssignment", [_bucket_condition("none", buckets, layer_salt)], pass_percentage=0),
+        named_rule(f"{name}_control", [_bucket_condition("lt", 500, name)], pass_percentage=50),
+        named_rule(f"{name}_test", [condition("public")]),
+    ])
+
+
+CONFIG_SPECS["dynamic_configs"] = CONFIG_SPECS["dynamic_configs"] + [
+    _experiment("exp_a", "layer_salt", list(range(0, 300))),
+    _experiment("exp_b", "layer_salt", list(range(300, 550))),
+]
+CONFIG_SPECS["layer_configs"] = CONFIG_SPECS["layer_configs"] + [
+    _spec("bucketed_layer", "layer", [
+        named_rule("alloc_a", [_bucket_condition("any", list(range(0, 300)), "layer_salt")], delegate="exp_a"),
+        named_rule("alloc_b", [_bucket_condition("any", list(range(300, 550)), "layer_salt"), condition("public")],
+                   delegate="exp_b", sampling_rate=101),
+        named_rule("holdback", [_bucket_condition("lt", 800, "layer_salt")], pass_percentage=40),
+        named_rule("missing_delegate", [_bucket_condition("gte", 950, "layer_salt")], delegate="not_an_experiment"),
+    ]),
+    _spec("company_layer", "layer", [
+        named_rule("company_alloc", [_bucket_condition("none", list(range(0, 500)), "company_salt", "companyID")],
+                   delegate="exp_a", id_type="companyID"),
+    ], id_type="companyID"),
+    _spec("targeted_layer", "layer", [
+        named_rule("employees", [_bucket_condition("any", list(range(0, 500)), "layer_salt"),
+                                 condition("user_field", "str_contains_any", ["@statsig.com"], "email")],
+                   delegate="exp_a"),
+    ]),
+    _spec("two_salts_layer", "layer", [
+        named_rule("first", [_bucket_condition("any", list(range(0, 500)), "salt_1")]),
+        named_rule("second", [_bucket_condition("any", list(range(0, 500)), "salt_2")]),
+    ]),
+]
+
+LAYERS = [layer["name"] for layer in CONFIG_SPECS["layer_configs"]] + ["not_a_layer"]
+
+USERS = [StatsigUser(f"user_{i}", email="someone@statsig.com" if i % 2 else None,
+                     custom_ids={"companyID": f"company_{i}"} if i % 3 else None) for i in range(1500)]
+
+_COMPARED_FIELDS = ("boolean_value", "json_value", "rule_id", "group_name", "is_experiment_group", "id_type",
+                    "secondary_exposures", "undelegated_secondary_exposures", "explicit_parameters",
+                    "allocated_experiment", "sample_rate", "analytical_condition", "seen_analytical_gates")
+
+
+class TestLayerAllocation(unittest.TestCase):
+    def _start(self):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _evaluate(self, server):
+        results = []
+        for layer in LAYERS:
+            for user in USERS:
+                result = server._evaluator.get_layer(user, layer)
+                results.append((layer, user.user_id, {field: getattr(result, field) for field in _COMPARED_FIELDS},
+                                result.evaluation_details.reason))
+        return results
+
+    def test_tables_are_built_for_simple_layers_only(self):
+        spec_store = self._start()._spec_store
+        for layer in ("explicit_vs_implicit_parameter_layer", "bucketed_layer", "company_layer"):
+            self.assertIsNotNone(spec_store.get_compiled_layer(layer).allocation, layer)
+        for layer in ("unallocated_layer", "targeted_layer", "two_salts_layer"):
+            self.assertIsNone(spec_store.get_compiled_layer(layer).allocation, layer)
+        self.assertIsNone(spec_store.get_compiled_config("exp_a").allocation)
+
+    def test_matches_rule_interpreter(self):
+        allocated = self._evaluate(self._start())
+        with patch("statsig.compiled_spec.build_allocation_table", return_value=None):
+            interpreted = self._evaluate(self._start())
+        self.assertEqual(len(allocated), len(interpreted))
+        for got, want in zip(allocated, interpreted):
+            self.assertEqual(got, want)
+
+        rule_ids = {result[2]["rule_id"] for result in allocated if result[0] == "bucketed_layer"}
+        self.assertEqual(rule_ids, {"exp_a_control", "exp_a_test", "exp_b_control", "exp_b_test", "holdback",
+                                    "missing_delegate", "default"})
+
+    def test_layer_exposures_match_rule_interpreter(self):
+        def exposures(server):
+            events = []
+            with patch.object(server._logger, "log", side_effect=lambda event: events.append(event.to_dict())):
+                for user in USERS[:50]:
+                    for layer in LAYERS:
+                        server.get_layer(user, layer).get("rule", None)
+            for event in events:
+                event.pop("time", None)
+                for key in ("configSyncTime", "initTime", "serverTime"):
+                    event["metadata"].pop(key, None)
+            return events
+
+        allocated = exposures(self._start())
+        self.assertGreater(len(allocated), 0)
+        with patch("statsig.compiled_spec.build_allocation_table", return_value=None):
+            self.assertEqual(exposures(self._start()), allocated)
+
+
+if __name__ == '__main__':
+    unittest.main()
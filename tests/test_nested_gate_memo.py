@@ -0,0 +1,138 @@
+import json
+import unittest
+from collections import Counter
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        spec("segment:holdout", "feature_gate", [
+            rule("holdout_rule", [condition("user_field", "any", ["held@out.com"], "email")])], False),
+        spec("employees", "feature_gate", [
+            rule("employees_rule", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")])],
+             False),
+        spec("new_feature", "feature_gate", [
+            rule("holdout", [condition("pass_gate", target="segment:holdout")], False),
+            rule("employees", [condition("pass_gate", target="employees")]),
+            rule("either", [condition("multi_pass_gate", target=["segment:holdout", "employees"])]),
+        ], False),
+        spec("segment:staff", "feature_gate", [
+            rule("staff_list", [condition("user_field", "any", ["staff@statsig.com"], "email")])], False),
+        spec("staff", "feature_gate", [rule("staff_rule", [condition("pass_gate", target="segment:staff")])], False),
+        spec("not_staff", "feature_gate", [
+            rule("neither", [condition("multi_fail_gate", target=["staff", "segment:holdout"])])], False),
+    ],
+    dynamic_configs=[
+        spec("experiment", "dynamic_config", [
+            rule("holdout", [condition("fail_gate", target="segment:holdout"),
+                             condition("fail_gate", target="segment:holdout")], {"a": 1}),
+            rule("employees", [condition("pass_gate", target="employees")], {"a": 2}),
+        ], {"a": 0}),
+        spec("staff_experiment", "dynamic_config", [
+            rule("staff", [condition("multi_pass_gate", target=["segment:holdout", "staff"]),
+                           condition("pass_gate", target="staff")], {"a": 1}),
+        ], {"a": 0}),
+    ],
+)
+
+
+class _CountingDict(dict):
+    def __init__(self, items, lookups: Counter):
+        super().__init__(items)
+        self.lookups = lookups
+
+    def get(self, key, default=None):
+        self.lookups[key] += 1
+        return super().get(key, default)
+
+
+class TestNestedGateMemo(unittest.TestCase):
+    def setUp(self):
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.lookups = Counter()
+        spec_store = self.server._spec_store
+        spec_store._snapshot = spec_store.snapshot()._replace(
+            compiled_gates=_CountingDict(spec_store.snapshot().compiled_gates, self.lookups))
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def test_nested_gates_evaluated_once_per_call(self):
+        user = StatsigUser("123", email="someone@statsig.com")
+        result = self.server._evaluator.check_gate(user, "new_feature")
+
+        self.assertTrue(result.boolean_value)
+        self.assertEqual(result.rule_id, "employees")
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "employees", "gateValue": "true", "ruleID": "employees_rule"},
+        ])
+        self.assertEqual(self.lookups["segment:holdout"], 1)
+        self.assertEqual(self.lookups["employees"], 1)
+
+    def test_repeated_conditions_keep_exposures(self):
+        user = StatsigUser("123", email="held@out.com")
+        result = self.server._evaluator.get_config(user, "experiment")
+
+        self.assertEqual(result.json_value, {"a": 0})
+        self.assertEqual(result.rule_id, "default")
+        self.assertEqual(self.lookups["segment:holdout"], 1)
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "employees", "gateValue": "false", "ruleID": "default"},
+        ])
+
+    def test_memo_shared_across_evaluate_all(self):
+        user = StatsigUser("123", email="someone@statsig.com")
+        values = self.server.evaluate_all(user)
+
+        self.assertTrue(values["feature_gates"]["new_feature"]["value"])
+        self.assertEqual(values["dynamic_configs"]["experiment"]["value"], {"a": 1})
+        # once at the top level, once nested
+        self.assertEqual(self.lookups["employees"], 2)
+        self.assertEqual(self.lookups["segment:holdout"], 2)
+
+    def test_multi_gate_conditions_share_memo(self):
+        user = StatsigUser("123", email="staff@statsig.com")
+        result = self.server._evaluator.get_config(user, "staff_experiment")
+
+        self.assertEqual(result.json_value, {"a": 1})
+        self.assertEqual(result.rule_id, "staff")
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "staff", "gateValue": "true", "ruleID": "staff_rule"},
+        ])
+        self.assertEqual(self.lookups["staff"], 1)
+        self.assertEqual(self.lookups["segment:staff"], 1)
+
+        result = self.server._evaluator.check_gate(user, "not_staff")
+        self.assertTrue(result.boolean_value)
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "staff", "gateValue": "true", "ruleID": "staff_rule"},
+        ])
+
+    def test_multi_gate_conditions_respect_overrides(self):
+        user = StatsigUser("123", email="staff@statsig.com")
+        self.server.override_gate("staff", False)
+
+        result = self.server._evaluator.get_config(user, "staff_experiment")
+        self.assertEqual(result.json_value, {"a": 0})
+        self.assertEqual(result.rule_id, "default")
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "staff", "gateValue": "false", "ruleID": "override"},
+        ])
+
+        result = self.server._evaluator.check_gate(user, "not_staff")
+        self.assertTrue(result.boolean_value)
+        self.assertEqual(result.secondary_exposures, [
+            {"gate": "staff", "gateValue": "false", "ruleID": "override"},
+        ])
+        self.assertEqual(self.lookups["staff"], 0)
+
+        self.server.remove_gate_override("staff")
+        result = self.server._evaluator.get_config(user, "staff_experiment")
+        self.assertEqual(result.json_value, {"a": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
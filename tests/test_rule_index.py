@@ -0,0 +1,102 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, named_rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.compiled_spec import _IndexedRuleRun
+
+
+def _tenant_rules(start, count):
+    rules = []
+    for i in range(start, start + count):
+        if i % 4 == 0:
+            tenant_condition = condition("unit_id", "any", [f"user_{i}", f"USER_{i + 1}"])
+        elif i % 4 == 1:
+            tenant_condition = condition("user_field", "any", [f"Tenant_{i}@example.com"], field="email")
+        elif i % 4 == 2:
+            tenant_condition = condition("user_field", "any_case_sensitive", [f"Tier_{i % 7}", i], field="tier")
+        else:
+            tenant_condition = condition("unit_id", "any", [f"company_{i}"], id_type="companyID")
+        rules.append(named_rule(f"tenant_{i}", [tenant_condition], 50 if i % 5 == 0 else 100,
+                                sampling_rate=101 if i % 3 == 0 else None))
+    return rules
+
+
+CONFIG_SPECS = config_specs(
+    dynamic_configs=[spec("tenant_config", "dynamic_config", _tenant_rules(0, 600) + [
+        named_rule("employees", [condition("user_field", "str_contains_any", ["@statsig.com"], field="email")]),
+        named_rule("short_run_0", [condition("unit_id", "any", ["user_3"])]),
+        named_rule("short_run_1", [condition("unit_id", "any", ["user_4"])], pass_percentage=0),
+        named_rule("holdout", [condition("user_bucket", "lt", 20, id_type="userID")], pass_percentage=0),
+    ] + _tenant_rules(600, 900) + [
+        named_rule("half", [condition("user_bucket", "lt", 500, id_type="userID")], sampling_rate=201),
+    ], {"rule": "default"})],
+    time=1,
+)
+
+USERS = [StatsigUser(f"user_{i}" if i % 6 else f"USER_{i}",
+                     email=f"tenant_{i}@EXAMPLE.com" if i % 3 else "someone@statsig.com",
+                     custom={"tier": f"Tier_{i % 9}" if i % 2 else i},
+                     custom_ids={"companyID": f"company_{i * 3}"} if i % 4 else None) for i in range(1600)] + \
+        [StatsigUser("nobody"), StatsigUser(None, custom_ids={"companyID": "company_7"})]
+
+_COMPARED_FIELDS = ("boolean_value", "json_value", "rule_id", "group_name", "is_experiment_group", "id_type",
+                    "secondary_exposures", "sample_rate", "analytical_condition")
+
+
+class TestRuleIndex(unittest.TestCase):
+    def _start(self):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _evaluate(self, server):
+        results = []
+        for user in USERS:
+            result = server._evaluator.get_config(user, "tenant_config")
+            results.append((user.user_id, {field: getattr(result, field) for field in _COMPARED_FIELDS}))
+        return results
+
+    def test_long_runs_are_indexed(self):
+        spec = self._start()._spec_store.get_compiled_config("tenant_config")
+        runs = [entry for entry in spec.rule_index if isinstance(entry, _IndexedRuleRun)]
+        self.assertEqual([len(run.rules) for run in runs], [600, 900])
+        self.assertEqual(len(spec.rule_index), 2 + 5)
+        self.assertEqual(len(runs[0].lookups), 4)
+
+    def test_matches_rule_interpreter(self):
+        indexed = self._evaluate(self._start())
+        with patch("statsig.compiled_spec.build_rule_index", return_value=None):
+            interpreted = self._evaluate(self._start())
+        self.assertEqual(len(indexed), len(interpreted))
+        for got, want in zip(indexed, interpreted):
+            self.assertEqual(got, want)
+
+        rule_ids = {fields["rule_id"] for _user, fields in indexed}
+        self.assertIn("employees", rule_ids)
+        self.assertIn("half", rule_ids)
+        self.assertIn("default", rule_ids)
+        self.assertGreater(len([rule_id for rule_id in rule_ids if rule_id.startswith("tenant_")]), 100)
+
+    def test_first_matching_rule_wins(self):
+        evaluator = self._start()._evaluator
+
+        def rule_id(user):
+            return evaluator.get_config(user, "tenant_config").rule_id
+
+        # tenant_0 lists USER_1 with a casefolded `any`, ahead of tenant_1's email
+        self.assertEqual(rule_id(StatsigUser("user_1", email="tenant_1@example.com")), "tenant_0")
+        self.assertEqual(rule_id(StatsigUser("x", email="TENANT_1@example.com")), "tenant_1")
+        # any_case_sensitive matches the exact string only, and numbers as strings
+        self.assertEqual(rule_id(StatsigUser("x", custom={"tier": "Tier_2"})), "tenant_2")
+        self.assertEqual(rule_id(StatsigUser("x", custom={"tier": 6})), "tenant_6")
+        self.assertFalse(rule_id(StatsigUser("x", custom={"tier": "tier_2"})).startswith("tenant_"))
+        # the short run after the first indexed run is still checked in order
+        self.assertEqual(rule_id(StatsigUser("user_3")), "short_run_0")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import unittest
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.compiled_spec import _CompiledRule
+
+CONFIG_SPECS = config_specs(feature_gates=[
+    spec("employee_gate", "feature_gate", [
+        rule("employee_gate_rule", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")])], False),
+    spec("beta_gate", "feature_gate", [rule("beta_gate_rule", [condition("user_field", "any", ["beta"], "plan")])],
+         False),
+    spec("mixed_gate", "feature_gate", [rule("mixed_gate_rule", [
+        condition("user_field", "any", ["US"], "country"),
+        condition("pass_gate", target="employee_gate"),
+        condition("user_field", "gt", 10, "level"),
+        condition("fail_gate", target="beta_gate"),
+    ])], False),
+])
+
+
+class TestShortCircuitEvaluation(unittest.TestCase):
+    def _start(self, **kwargs):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, **kwargs))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_matches_full_evaluation(self):
+        full = self._start()
+        short_circuit = self._start(short_circuit_rule_evaluation=True)
+        cost_ordered = self._start(short_circuit_rule_evaluation=True, order_conditions_by_cost=True)
+
+        users = [
+            StatsigUser("a", email="a@statsig.com", country="US", custom={"level": 11}),
+            StatsigUser("b", email="b@example.com", country="US", custom={"level": 11}),
+            StatsigUser("c", email="c@statsig.com", country="CA", custom={"level": 3, "plan": "beta"}),
+            StatsigUser("d", country="CA"),
+        ]
+        for user in users:
+            expected = full._evaluator.check_gate(user, "mixed_gate")
+            for server in (short_circuit, cost_ordered):
+                actual = server._evaluator.check_gate(user, "mixed_gate")
+                self.assertEqual(expected.boolean_value, actual.boolean_value)
+                self.assertEqual(expected.rule_id, actual.rule_id)
+                self.assertEqual(expected.secondary_exposures, actual.secondary_exposures)
+                self.assertEqual(expected.seen_analytical_gates, actual.seen_analytical_gates)
+
+    def test_skips_conditions_after_failure(self):
+        user = StatsigUser("a", country="CA", custom={"level": "not a number"})
+
+        full = self._start()
+        self.assertEqual(full._evaluator.check_gate(user, "mixed_gate").rule_id, "error")
+
+        short_circuit = self._start(short_circuit_rule_evaluation=True)
+        result = short_circuit._evaluator.check_gate(user, "mixed_gate")
+        self.assertFalse(result.boolean_value)
+        self.assertEqual(result.rule_id, "default")
+        self.assertEqual([e["gate"] for e in result.secondary_exposures], ["employee_gate", "beta_gate"])
+
+    def test_cost_order_keeps_gate_conditions_in_place(self):
+        compiled = _CompiledRule({"id": "rule", "conditions": [
+            condition("ua_based", "any", ["Chrome"], "browser_name"),
+            condition("pass_gate", target="gate_a"),
+            condition("user_field", "any", ["US"], "country"),
+            condition("fail_gate", target="gate_b"),
+        ]})
+        self.assertEqual([c.condition_type for c in compiled.cost_ordered_conditions],
+                         ["USER_FIELD", "UA_BASED", "PASS_GATE", "FAIL_GATE"])
+
+        compiled = _CompiledRule({"id": "rule", "conditions": [
+            condition("pass_gate", target="gate_a"),
+            condition("ua_based", "any", ["Chrome"], "browser_name"),
+            condition("user_field", "any", ["US"], "country"),
+        ]})
+        self.assertEqual([c.condition_type for c in compiled.cost_ordered_conditions],
+                         ["PASS_GATE", "USER_FIELD", "UA_BASED"])
+
+
+if __name__ == '__main__':
+    unittest.main()
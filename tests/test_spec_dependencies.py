@@ -0,0 +1,116 @@
+import json
+import unittest
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer
+from statsig.spec_store import EntityType
+
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        spec("segment:beta", "feature_gate", [
+            rule("beta_list", [condition("unit_id", "in_segment_list", "beta_users", id_type="companyID")])],
+             False),
+        spec("employees", "feature_gate", [
+            rule("employees_rule", [condition("user_field", "str_ends_with_any", ["@statsig.com"], "email")])],
+             False),
+        spec("mobile", "feature_gate", [
+            rule("ios", [condition("ua_based", "any", ["iOS"], "os_name")]),
+            rule("tier", [condition("environment_field", "any", ["production"], "tier")]),
+        ], False),
+        spec("new_feature", "feature_gate", [
+            rule("beta", [condition("pass_gate", target="segment:beta")]),
+            rule("internal", [condition("multi_pass_gate", target=["employees", "mobile"])]),
+        ], False),
+        spec("disabled", "feature_gate", [
+            rule("employees", [condition("pass_gate", target="employees")])], False, enabled=False),
+    ],
+    dynamic_configs=[
+        spec("experiment", "dynamic_config", [
+            rule("launched", [condition("current_time", "after", 0)], {"a": 1}),
+            rule("control", [condition("user_field", "any", ["US"], "Country")], {"a": 2},
+                 pass_percentage=50, id_type="stableID"),
+        ], {"a": 0}),
+        spec("experiment_override", "dynamic_config", [
+            rule("app", [condition("target_app", "any", ["app"])], {"a": 3}),
+        ], {"a": 0}),
+    ],
+    layer_configs=[
+        spec("layer", "layer", [
+            rule("allocated", [condition("pass_gate", target="new_feature")], {}, delegate="experiment"),
+        ], {}),
+    ],
+    overrides={
+        "experiment": [{"new_config_name": "experiment_override", "rules": [{"rule_name": "holdout"}]}],
+    },
+    override_rules={
+        "holdout": rule("holdout", [condition("user_field", "any", ["holdout"], "plan")]),
+    },
+)
+
+
+class TestSpecDependencies(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StatsigServer()
+        cls.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True))
+        cls.spec_store = cls.server._spec_store
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def test_direct_dependencies(self):
+        deps = self.spec_store.get_spec_dependencies(EntityType.GATE, "employees")
+        self.assertEqual(deps.user_fields, {"email"})
+        self.assertEqual(deps.custom_fields, {"email"})
+        self.assertEqual(deps.nested_gates, frozenset())
+        self.assertEqual(deps.condition_count, 1)
+
+        deps = self.spec_store.get_spec_dependencies(EntityType.GATE, "mobile")
+        self.assertEqual(deps.user_fields, {"user_agent"})
+        self.assertEqual(deps.custom_fields, {"os_name", "userAgent", "useragent"})
+        self.assertEqual(deps.environment_fields, {"tier"})
+
+        deps = self.spec_store.get_spec_dependencies(EntityType.GATE, "segment:beta")
+        self.assertEqual(deps.user_fields, frozenset())
+        self.assertEqual(deps.unit_id_types, {"companyID", "companyid"})
+        self.assertEqual(deps.id_lists, {"beta_users"})
+
+    def test_follows_nested_gates(self):
+        deps = self.spec_store.get_spec_dependencies(EntityType.GATE, "new_feature")
+        self.assertEqual(deps.nested_gates, {"segment:beta", "employees", "mobile"})
+        self.assertEqual(deps.user_fields, {"email", "user_agent"})
+        self.assertEqual(deps.unit_id_types, {"companyID", "companyid"})
+        self.assertEqual(deps.id_lists, {"beta_users"})
+        self.assertEqual(deps.environment_fields, {"tier"})
+        self.assertEqual(deps.condition_count, 6)
+        self.assertFalse(deps.uses_current_time)
+
+    def test_follows_delegates_and_override_mappings(self):
+        deps = self.spec_store.get_spec_dependencies(EntityType.CONFIG, "experiment")
+        self.assertTrue(deps.uses_current_time)
+        self.assertTrue(deps.uses_target_app)
+        self.assertEqual(deps.user_fields, {"country"})
+        self.assertEqual(deps.custom_fields, {"Country", "country", "plan"})
+        self.assertEqual(deps.unit_id_types, {"stableID", "stableid"})
+
+        deps = self.spec_store.get_spec_dependencies(EntityType.LAYER, "layer")
+        self.assertEqual(deps.delegated_configs, {"experiment"})
+        self.assertIn("new_feature", deps.nested_gates)
+        self.assertTrue(deps.uses_current_time)
+        self.assertEqual(deps.user_fields, {"country", "email", "user_agent"})
+
+    def test_disabled_and_unknown_specs(self):
+        deps = self.spec_store.get_spec_dependencies(EntityType.GATE, "disabled")
+        self.assertEqual(deps.nested_gates, frozenset())
+        self.assertEqual(deps.condition_count, 0)
+        self.assertIsNone(self.spec_store.get_spec_dependencies(EntityType.GATE, "not_a_gate"))
+        self.assertIsNone(self.spec_store.get_spec_dependencies(EntityType.CONFIG, "employees"))
+        self.assertEqual(set(self.spec_store.get_all_spec_dependencies(EntityType.CONFIG)),
+                         {"experiment", "experiment_override"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.evaluation_details import DataSource, EvaluationReason
+from statsig.utils import HashingAlgorithm
+
+
+def _experiment(name):
+    return spec(name, "dynamic_config", [
+        rule(f"{name}_test", [condition("public")], {"color": name}, name="test", salt="test", isExperimentGroup=True),
+    ], {}, entity="experiment", isActive=True, explicitParameters=["color"])
+
+
+def _config_specs(version, time):
+    experiment = f"exp_v{version}"
+    return config_specs(
+        feature_gates=[spec(f"gate_v{version}", "feature_gate", [rule("on", [condition("public")])], False,
+                            salt="gate")],
+        dynamic_configs=[_experiment(experiment)],
+        layer_configs=[spec("checkout_layer", "dynamic_config", [
+            rule("alloc", [condition("unit_id", "not_in_segment_list", "blocked_users")], {"color": "layer"},
+                 delegate=experiment),
+        ], {"color": "none"}, entity="layer", salt="layer")],
+        layers={"checkout_layer": [experiment]},
+        time=time,
+    )
+
+
+class TestSpecSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.server = StatsigServer()
+        self.server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(_config_specs(1, 100)), disable_diagnostics=True))
+        self.addCleanup(self.server.shutdown)
+        self.spec_store = self.server._spec_store
+        self.user = StatsigUser("user_1")
+
+    def _sync(self, version, time):
+        self.spec_store._process_specs(_config_specs(version, time), DataSource.NETWORK)
+
+    def test_sync_publishes_a_new_snapshot(self):
+        before = self.spec_store.snapshot()
+        self._sync(2, 200)
+        after = self.spec_store.snapshot()
+
+        self.assertIsNot(before, after)
+        self.assertEqual(list(before.configs), ["exp_v1"])
+        self.assertEqual(before.time, 100)
+        self.assertEqual(list(after.configs), ["exp_v2"])
+        self.assertEqual((after.time, after.source), (200, DataSource.NETWORK))
+        self.assertEqual(self.spec_store.last_update_time(), 200)
+        self.assertIs(self.spec_store.get_all_configs(), after.configs)
+
+    def test_evaluation_reads_one_snapshot_across_a_sync(self):
+        get_id_list = self.spec_store.get_id_list
+
+        def sync_mid_evaluation(list_name):
+            self._sync(2, 200)
+            return get_id_list(list_name)
+
+        # the id list lookup runs after the layer spec was read and before its delegate is
+        with patch.object(self.spec_store, "get_id_list", side_effect=sync_mid_evaluation):
+            layer = self.server.get_layer(self.user, "checkout_layer")
+
+        self.assertEqual(layer.get("color", None), "exp_v1")
+        self.assertEqual(layer.rule_id, "exp_v1_test")
+        self.assertEqual(self.server.get_layer(self.user, "checkout_layer").get("color", None), "exp_v2")
+
+    def test_session_keeps_its_snapshot(self):
+        with self.server.session(self.user) as session:
+            self.assertTrue(session.check_gate("gate_v1"))
+            self._sync(2, 200)
+            self.assertEqual(session.get_layer("checkout_layer").get("color", None), "exp_v1")
+            gate = session.get_feature_gate("gate_v2")
+            self.assertFalse(gate.value)
+            self.assertEqual(gate.evaluation_details.reason, EvaluationReason.unrecognized)
+
+        with self.server.session(self.user) as session:
+            self.assertTrue(session.check_gate("gate_v2"))
+            self.assertEqual(session.get_layer("checkout_layer").get("color", None), "exp_v2")
+
+    def test_client_initialize_response_reads_one_snapshot(self):
+        get_id_list = self.spec_store.get_id_list
+
+        def sync_mid_response(list_name):
+            if self.spec_store.last_update_time() == 100:
+                self._sync(2, 200)
+            return get_id_list(list_name)
+
+        with patch.object(self.spec_store, "get_id_list", side_effect=sync_mid_response):
+            response = self.server.get_client_initialize_response(self.user, hash=HashingAlgorithm.NONE)
+
+        self.assertEqual(response["time"], 100)
+        self.assertEqual(list(response["feature_gates"]), ["gate_v1"])
+        self.assertEqual(response["layer_configs"]["checkout_layer"]["allocated_experiment_name"], "exp_v1")
+        self.assertEqual(response["layer_configs"]["checkout_layer"]["value"], {"color": "exp_v1"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from gzip_helpers import GzipHelpers
+from network_stub import NetworkStub
+from statsig import StatsigOptions, StatsigServer, StatsigSession, StatsigUser
+from statsig.batch_event_queue import EventBatchProcessor
+from statsig.evaluator import _Evaluator
+from statsig.statsig_errors import StatsigValueError
+
+with open(os.path.join(os.path.abspath(os.path.dirname(__file__)),
+                       '../testdata/download_config_specs.json')) as r:
+    CONFIG_SPECS = json.loads(r.read())
+
+GATES = [gate["name"] for gate in CONFIG_SPECS["feature_gates"]] + ["not_a_gate"]
+CONFIGS = [config["name"] for config in CONFIG_SPECS["dynamic_configs"]] + ["not_a_config"]
+LAYERS = [layer["name"] for layer in CONFIG_SPECS["layer_configs"]] + ["not_a_layer"]
+
+USERS = [StatsigUser(f"user_{i}", email=email, ip="24.5.0.0", custom_ids={"companyID": f"company_{i}"})
+         for i, email in enumerate(["someone@statsig.com", None, "someone@gmail.com"])]
+
+_network_stub = NetworkStub("http://test-statsig-session")
+
+
+def _check_everything(checks):
+    results = []
+    for _ in range(3):
+        for gate in GATES:
+            results.append(checks.get_feature_gate(gate).value)
+        for config in CONFIGS:
+            results.append(checks.get_config(config).value)
+            results.append(checks.get_experiment(config).rule_id)
+        for layer in LAYERS:
+            layer_result = checks.get_layer(layer)
+            results.append((layer_result.rule_id, layer_result.get_values()))
+            for parameter in layer_result.get_values():
+                layer_result.get(parameter)
+    return results
+
+
+class _ServerChecks:
+    def __init__(self, server, user):
+        self.server = server
+        self.user = user
+
+    def __getattr__(self, name):
+        method = getattr(self.server, name)
+        return lambda *args, **kwargs: method(self.user, *args, **kwargs)
+
+
+@patch('requests.Session.request', side_effect=_network_stub.mock)
+class TestStatsigSession(unittest.TestCase):
+    _events = []
+
+    @classmethod
+    def setUpClass(cls):
+        _network_stub.reset()
+        _network_stub.stub_request_with_value("download_config_specs/.*", 200, CONFIG_SPECS)
+
+        def log_event_callback(url: str, **kwargs):
+            cls._events.extend(GzipHelpers.decode_body(kwargs)["events"])
+
+        _network_stub.stub_request_with_function("log_event", 202, log_event_callback)
+
+    def setUp(self):
+        TestStatsigSession._events = []
+
+    def _start(self, **kwargs):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            api=_network_stub.host, disable_diagnostics=True, tier="staging", **kwargs))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def _exposures(self):
+        return [json.dumps([event["eventName"], event["user"], event["secondaryExposures"],
+                            {key: value for key, value in event["metadata"].items()
+                             if key not in ("serverTime", "initTime")}], sort_keys=True)
+                for event in TestStatsigSession._events if event["eventName"] != "statsig::diagnostics"]
+
+    def test_matches_server_calls_and_exposures(self, mock_request):
+        server = self._start()
+        expected = [_check_everything(_ServerChecks(server, user)) for user in USERS]
+        server.shutdown()
+        expected_exposures = self._exposures()
+
+        TestStatsigSession._events = []
+        server = self._start()
+        with patch.object(EventBatchProcessor, "add_event", wraps=server._logger.event_batch_processor.add_event) \
+                as add_event:
+            for user, want in zip(USERS, expected):
+                with server.session(user) as session:
+                    self.assertEqual(_check_everything(session), want)
+            add_event.assert_not_called()
+        server.shutdown()
+
+        self.assertGreater(len(expected_exposures), 0)
+        self.assertEqual(self._exposures(), expected_exposures)
+
+    def test_evaluates_each_name_once(self, mock_request):
+        server = self._start()
+        with patch.object(_Evaluator, "check_gate", autospec=True, side_effect=_Evaluator.check_gate) as check_gate, \
+                patch.object(_Evaluator, "get_config", autospec=True, side_effect=_Evaluator.get_config) as get_config:
+            session = server.session(USERS[0])
+            for _ in range(5):
+                session.check_gate("on_for_statsig_email")
+                session.get_config("test_config")
+                session.get_experiment("test_config")
+            session.close()
+        self.assertEqual(check_gate.call_count, 1)
+        self.assertEqual(get_config.call_count, 1)
+
+    def test_results_are_pinned_for_the_session(self, mock_request):
+        server = self._start()
+        session = server.session(USERS[0])
+        self.assertTrue(session.check_gate("on_for_statsig_email"))
+        server.override_gate("on_for_statsig_email", False)
+        self.assertTrue(session.check_gate("on_for_statsig_email"))
+        self.assertFalse(server.session(USERS[0]).check_gate("on_for_statsig_email"))
+
+    def test_exposures_flush_on_close(self, mock_request):
+        server = self._start()
+        with patch.object(server._logger, "log_exposures", wraps=server._logger.log_exposures) as log_exposures:
+            session = server.session(USERS[0])
+            session.check_gate("always_on_gate")
+            session.check_gate("always_on_gate")
+            session.get_config("test_config", log_exposure=False)
+            log_exposures.assert_not_called()
+            session.close()
+            self.assertEqual([[exposure.name for exposure in call.args[1]] for call in log_exposures.call_args_list],
+                             [["always_on_gate"]])
+
+            # once closed, exposures are logged as they happen
+            session.check_gate("on_for_statsig_email")
+            session.check_gate("always_on_gate")
+            self.assertEqual(log_exposures.call_args_list[-1].args[1][0].name, "on_for_statsig_email")
+            self.assertEqual(log_exposures.call_count, 2)
+
+    def test_invalid_inputs(self, mock_request):
+        server = self._start()
+        with self.assertRaises(StatsigValueError):
+            server.session(None)
+        session = server.session(USERS[0])
+        self.assertIsInstance(session, StatsigSession)
+        self.assertFalse(session.check_gate(""))
+        self.assertEqual(session.get_config("").value, {})
+        self.assertEqual(session.get_layer("").get_values(), {})
+
+    def test_evaluation_callback(self, mock_request):
+        seen = []
+        server = self._start(evaluation_callback=seen.append)
+        session = server.session(USERS[0])
+        session.check_gate("always_on_gate")
+        session.check_gate("always_on_gate")
+        session.get_layer("a_layer")
+        self.assertEqual([result.name for result in seen], ["always_on_gate", "always_on_gate", "a_layer"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.evaluation_details import EvaluationReason
+from statsig.evaluation_operators import is_unsafe_pattern
+
+
+def _gate(name, pattern, field="email"):
+    return spec(name, "feature_gate", [rule(name + "_rule", [condition("user_field", "str_matches", pattern, field)])],
+                False)
+
+
+CONFIG_SPECS = config_specs(
+    feature_gates=[
+        _gate("email_domain", r"@statsig\.(com|io)$"),
+        _gate("invalid_pattern", r"(unclosed"),
+        _gate("nested_repeat", r"^(\w+\s?)*$", "name"),
+    ],
+    dynamic_configs=[spec("config", "dynamic_config", [], {"a": 0})],
+    overrides={
+        "config": [{"new_config_name": "config", "rules": [{"rule_name": "invalid_override"}]}],
+    },
+    override_rules={
+        "invalid_override": rule("invalid_override", [condition("user_field", "str_matches", "[", "email")]),
+    },
+)
+
+
+class TestStrMatches(unittest.TestCase):
+    def _start(self, **kwargs):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, **kwargs))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_patterns_compiled_once(self):
+        server = self._start()
+        condition = server._spec_store.get_compiled_gate("email_domain").rules[0].conditions[0]
+        self.assertIsNotNone(condition.pattern)
+
+        self.assertTrue(server.check_gate(StatsigUser("a", email="a@statsig.io"), "email_domain"))
+        self.assertFalse(server.check_gate(StatsigUser("a", email="a@statsig.io.example"), "email_domain"))
+        self.assertFalse(server.check_gate(StatsigUser("a"), "email_domain"))
+
+    def test_invalid_pattern_marks_spec_unsupported(self):
+        server = self._start()
+        self.assertIn("invalid_pattern", server._spec_store.unsupported_configs)
+        result = server._evaluator.check_gate(StatsigUser("a", email="(unclosed"), "invalid_pattern")
+        self.assertFalse(result.boolean_value)
+        self.assertEqual(result.evaluation_details.reason, EvaluationReason.unsupported)
+
+    def test_invalid_override_rule_is_skipped(self):
+        server = self._start()
+        self.assertNotIn("invalid_override", server._spec_store.get_compiled_override_rules())
+        result = server._evaluator.get_config(StatsigUser("a", email="a@statsig.com"), "config")
+        self.assertEqual(result.json_value, {"a": 0})
+        self.assertEqual(result.rule_id, "default")
+
+    def test_guard_rejects_unsafe_patterns(self):
+        user = StatsigUser("a", custom={"name": "some name"})
+        self.assertTrue(self._start().check_gate(user, "nested_repeat"))
+
+        guarded = self._start(guard_str_matches_patterns=True)
+        self.assertIn("nested_repeat", guarded._spec_store.unsupported_configs)
+        self.assertFalse(guarded.check_gate(user, "nested_repeat"))
+        self.assertTrue(guarded.check_gate(StatsigUser("a", email="a@statsig.com"), "email_domain"))
+
+    def test_unsafe_pattern_detection(self):
+        for pattern in (r"(a+)+$", r"(a*)*", r"(?:a+|b)+", r"(a)\1", "x" * 1001):
+            self.assertTrue(is_unsafe_pattern(pattern), pattern)
+        for pattern in (r"abc.*def", r".*@statsig\.com$", r"(x{1,3})+", r"^\d{3}-\d{4}$"):
+            self.assertFalse(is_unsafe_pattern(pattern), pattern)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import string
+import unittest
+
+import spec_builders
+from statsig.compiled_spec import _CompiledCondition
+from statsig.evaluation_operators import OPERATORS, STRING_MATCHER_OPERATORS
+from statsig.string_matchers import AFFIX_SET_MIN_TARGETS, AHO_CORASICK_MIN_TARGETS, _AhoCorasick
+
+
+def _condition(operator, target):
+    return _CompiledCondition(spec_builders.condition("user_field", operator, target, "email"))
+
+
+class TestStringMatchers(unittest.TestCase):
+    def test_aho_corasick(self):
+        automaton = _AhoCorasick(["he", "she", "his", "hers"])
+        for text in ("ushers", "this", "ahishers", "she"):
+            self.assertTrue(automaton.search(text), text)
+        for text in ("", "h", "shx", "hi s"):
+            self.assertFalse(automaton.search(text), text)
+
+        self.assertTrue(_AhoCorasick(["abcd", "bc"]).search("xabcx"))
+        self.assertTrue(_AhoCorasick(["abcd", ""]).search("x"))
+        self.assertFalse(_AhoCorasick([]).search("x"))
+
+    def test_matches_generic_loop(self):
+        rng = random.Random(7)
+        alphabet = "abcAB.@ẞß"
+
+        def random_string(max_length):
+            return "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+        for operator in STRING_MATCHER_OPERATORS:
+            for size in (0, 1, 5, AHO_CORASICK_MIN_TARGETS + 10, AFFIX_SET_MIN_TARGETS + 10):
+                targets = [random_string(4) for _ in range(size)] + [None, 12]
+                condition = _condition(operator, targets)
+                self.assertIsNotNone(condition.string_matcher)
+                self.assertIs(condition.compare, STRING_MATCHER_OPERATORS[operator])
+                for value in [random_string(10) for _ in range(200)] + [None, 123, "X12Y"]:
+                    self.assertEqual(condition.compare(value, condition), OPERATORS[operator](value, condition),
+                                     (operator, targets, value))
+
+    def test_non_list_targets_keep_generic_loop(self):
+        condition = _condition("str_contains_any", "abc")
+        self.assertIsNone(condition.string_matcher)
+        self.assertIs(condition.compare, OPERATORS["str_contains_any"])
+        self.assertTrue(condition.compare("xxbxx", condition))
+
+        condition = _condition("str_starts_with_any", [""] + [str(i) for i in range(100)])
+        self.assertTrue(condition.compare("abc", condition))
+
+        condition = _condition("str_starts_with_any", None)
+        self.assertFalse(condition.compare("abc", condition))
+
+    def test_case_insensitive(self):
+        condition = _condition("str_ends_with_any", ["@Statsig.COM"] + [str(i) for i in range(100)])
+        self.assertTrue(condition.compare("Someone@statsig.com", condition))
+        condition = _condition("str_contains_any", ["STRASSE"] + list(string.digits * 5))
+        self.assertTrue(condition.compare("Hauptstraße", condition))
+
+
+if __name__ == '__main__':
+    unittest.main()
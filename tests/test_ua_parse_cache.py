@@ -0,0 +1,117 @@
+import json
+import time
+import unittest
+from collections import defaultdict
+from typing import Any, Dict, Optional
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.interface_observability_client import ObservabilityClient
+
+CHROME_MAC = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) " \
+             "Chrome/120.0.0.0 Safari/537.36"
+SAFARI_IOS = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) " \
+             "Version/17.1 Mobile/15E148 Safari/604.1"
+
+
+def _ua_condition(operator, target, field):
+    return condition("ua_based", operator, target, field)
+
+
+CONFIG_SPECS = config_specs(feature_gates=[
+    spec("modern_chrome_on_mac", "feature_gate", [
+        rule("rule", [
+            _ua_condition("any", ["Mac OS X"], "os_name"),
+            _ua_condition("version_gte", "10.15.0", "os_version"),
+            _ua_condition("any", ["Chrome"], "browser_name"),
+            _ua_condition("version_gte", "100.0.0", "browser_version"),
+        ])], False, salt="salt"),
+])
+
+
+class MockObservabilityClient(ObservabilityClient):
+    def __init__(self):
+        self.logs = defaultdict(list)
+
+    def increment(self, metric_name: str, value: int = 1, tags: Optional[Dict[str, Any]] = None) -> None:
+        self.logs[metric_name].append(value)
+
+    def gauge(self, metric_name: str, value: float, tags: Optional[Dict[str, Any]] = None) -> None:
+        self.logs[metric_name].append(value)
+
+
+class TestUAParseCache(unittest.TestCase):
+    def _start(self, **kwargs):
+        kwargs.setdefault("ua_parse_cache_size", 1000)
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(
+            local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS), disable_diagnostics=True, **kwargs))
+        self.addCleanup(server.shutdown)
+
+        evaluator = server._evaluator
+        evaluator.initialize()
+        self.parse_calls = []
+        parse = evaluator._ua_parser.Parse
+
+        class CountingParser:
+            @staticmethod
+            def Parse(ua):
+                self.parse_calls.append(ua)
+                return parse(ua)
+
+        evaluator._ua_parser = CountingParser
+        return server
+
+    def test_parses_each_user_agent_once(self):
+        server = self._start()
+        for _ in range(3):
+            self.assertTrue(server.check_gate(StatsigUser("a", user_agent=CHROME_MAC), "modern_chrome_on_mac"))
+            self.assertFalse(server.check_gate(StatsigUser("b", user_agent=SAFARI_IOS), "modern_chrome_on_mac"))
+        self.assertEqual(self.parse_calls, [CHROME_MAC, SAFARI_IOS])
+
+    def test_disabled_cache_parses_every_condition(self):
+        server = self._start(ua_parse_cache_size=0)
+        self.assertTrue(server.check_gate(StatsigUser("a", user_agent=CHROME_MAC), "modern_chrome_on_mac"))
+        self.assertEqual(self.parse_calls, [CHROME_MAC] * 4)
+
+    def test_disabled_by_default(self):
+        self.assertEqual(StatsigOptions().ua_parse_cache_size, 0)
+        self.assertNotIn("ua_parse_cache_size", StatsigOptions().get_logging_copy())
+
+    def test_evicts_least_recently_used(self):
+        server = self._start(ua_parse_cache_size=1)
+        for ua in (CHROME_MAC, SAFARI_IOS, CHROME_MAC):
+            server.check_gate(StatsigUser("a", user_agent=ua), "modern_chrome_on_mac")
+        self.assertEqual(self.parse_calls, [CHROME_MAC, SAFARI_IOS, CHROME_MAC])
+
+    def test_unhashable_user_agent(self):
+        server = self._start()
+        self.assertFalse(server.check_gate(StatsigUser("a", custom={"userAgent": [CHROME_MAC]}),
+                                           "modern_chrome_on_mac"))
+
+    def test_reports_hit_rate(self):
+        ob_client = MockObservabilityClient()
+        server = self._start(observability_client=ob_client)
+        server.check_gate(StatsigUser("a", user_agent=CHROME_MAC), "modern_chrome_on_mac")
+        server.shutdown()
+
+        self.assertEqual(ob_client.logs["statsig.sdk.ua_parse_cache.hit_count"], [3])
+        self.assertEqual(ob_client.logs["statsig.sdk.ua_parse_cache.miss_count"], [1])
+        self.assertEqual(ob_client.logs["statsig.sdk.ua_parse_cache.size"], [1])
+
+    def test_hit_rate_is_reported_in_the_background(self):
+        ob_client = MockObservabilityClient()
+        with patch("statsig.statsig_server.CACHE_METRICS_FLUSH_INTERVAL", 0.01):
+            server = self._start(observability_client=ob_client)
+            for _ in range(500):
+                server.check_gate(StatsigUser("a", user_agent=CHROME_MAC), "modern_chrome_on_mac")
+            deadline = time.time() + 5
+            while not ob_client.logs["statsig.sdk.ua_parse_cache.hit_count"] and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertGreater(len(ob_client.logs["statsig.sdk.ua_parse_cache.hit_count"]), 0)
+        self.assertTrue(server._cache_metrics_thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
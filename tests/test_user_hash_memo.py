@@ -0,0 +1,45 @@
+import hashlib
+import json
+import unittest
+from struct import unpack
+from unittest.mock import patch
+
+from spec_builders import condition, config_specs, rule, spec
+from statsig import StatsigOptions, StatsigServer, StatsigUser
+from statsig.utils import sha256_hash
+
+
+def _holdout_rule(id):
+    return rule(id, [condition("user_bucket", "lt", 0, salt="holdout")], {"rule": id})
+
+
+CONFIG_SPECS = config_specs(dynamic_configs=[
+    spec("ladder", "dynamic_config", [_holdout_rule(f"rung_{i}") for i in range(10)] + [
+        rule("launched", [condition("public")], {"launched": True}, pass_percentage=50)], {}, entity="experiment"),
+])
+
+
+class TestUserHashMemo(unittest.TestCase):
+    def test_sha256_hash_reads_first_eight_bytes(self):
+        for key in ("", "salt.rule.user_1", "ünïcode", 123):
+            digest = hashlib.sha256(str(key).encode("utf-8")).digest()
+            self.assertEqual(sha256_hash(key), unpack(">Q", digest[:8])[0])
+
+    def test_hashes_each_input_once_per_evaluation(self):
+        server = StatsigServer()
+        server.initialize("secret-key", StatsigOptions(local_mode=True, bootstrap_values=json.dumps(CONFIG_SPECS),
+                                                       disable_diagnostics=True))
+        self.addCleanup(server.shutdown)
+        user = StatsigUser("user_1")
+        with patch("statsig.evaluator.sha256_hash", wraps=sha256_hash) as hashed:
+            config = server.get_config(user, "ladder", log_exposure=False)
+            self.assertEqual(sorted(call.args[0] for call in hashed.call_args_list),
+                             ["holdout.user_1", "ladder.launched.user_1"])
+            server.get_config(user, "ladder", log_exposure=False)
+            self.assertEqual(hashed.call_count, 4)
+        self.assertEqual(config.rule_id, "launched")
+        self.assertEqual(config.value == {"launched": True}, sha256_hash("ladder.launched.user_1") % 10000 < 5000)
+
+
+if __name__ == '__main__':
+    unittest.main()